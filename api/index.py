@@ -1,44 +1,55 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.routers import (
-    liquefaction_api,
-    tsunami_api,
-    soft_story_api,
-    health_api,
-)
 from backend.api.config import settings
-import sentry_sdk
+from backend.api.lazy_routers import include_routers
+from backend.api import metrics
+from backend.api.logging_config import RequestLoggingMiddleware, setup_logging
 import logging
 import os
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Set up logging: records are written by a background thread, as JSON
+# unless LOG_JSON=false
+setup_logging(settings.log_level, json_format=settings.log_json)
 logger = logging.getLogger(__name__)
 
-# Initialize Sentry
-sentry_sdk.init(
-    dsn=settings.sentry_dsn,
-    # Add request headers and IP for users,
-    # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
-    send_default_pii=False,
-)
+# Initialize Sentry. Without a DSN Sentry is disabled, so sentry_sdk is
+# not even imported, which saves its import time on cold starts
+if settings.sentry_dsn:
+    import sentry_sdk
+
+    sentry_sdk.init(
+        dsn=settings.sentry_dsn,
+        # Add request headers and IP for users,
+        # see https://docs.sentry.io/platforms/python/data-management/data-collected/ for more info
+        send_default_pii=False,
+        # Performance tracing is opt-in; the SQLAlchemy integration adds
+        # the spans of the database queries
+        traces_sample_rate=settings.sentry_traces_sample_rate or None,
+    )
+    if settings.sentry_traces_sample_rate:
+        metrics.enable_tracing()
 
 ### Create FastAPI instance with custom docs and openapi url
 app = FastAPI(docs_url="/docs", openapi_url="/openapi.json", redirect_slashes=False)
 
 # Log startup information
-logger.info(f"Starting FastAPI application")
-logger.info(f"Environment: {settings.environment}")
-logger.info(f"PORT environment variable: {os.getenv('PORT', 'not set')}")
+logger.info("Starting FastAPI application")
+logger.info("Environment: %s", settings.environment)
+logger.info("PORT environment variable: %s", os.getenv("PORT", "not set"))
 
-app.include_router(liquefaction_api.router)
-app.include_router(tsunami_api.router)
-app.include_router(soft_story_api.router)
-app.include_router(health_api.router)
+# Router module of each URL prefix. With LAZY_ROUTERS, a router is only
+# imported on the first request under its prefix, see lazy_routers.py
+ROUTERS = {
+    "/api/liquefaction-zones": "backend.api.routers.liquefaction_api",
+    "/api/tsunami-zones": "backend.api.routers.tsunami_api",
+    "/api/soft-stories": "backend.api.routers.soft_story_api",
+    "/api/hazards": "backend.api.routers.hazards_api",
+    "/api/tiles": "backend.api.routers.tiles_api",
+    "/api/health": "backend.api.routers.health_api",
+    "/api/metrics": "backend.api.routers.metrics_api",
+}
+include_routers(app, ROUTERS, lazy=settings.lazy_routers)
 
 origins = [
     "http://localhost",
@@ -46,18 +57,6 @@ origins = [
     "https://datasci-earthquake-prod.up.railway.app"
 ]
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"Incoming request: {request.method} {request.url.path}")
-    try:
-        response = await call_next(request)
-        logger.info(f"Response status: {response.status_code} for {request.method} {request.url.path}")
-        return response
-    except Exception as e:
-        logger.error(f"Error handling request {request.method} {request.url.path}: {str(e)}", exc_info=True)
-        raise
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -66,6 +65,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request logging middleware, setting the request ID of the records
+app.add_middleware(RequestLoggingMiddleware, sample_rates=settings.log_sample_rates)
+
+# Outermost middleware, so that the metrics cover the whole request
+app.add_middleware(metrics.MetricsMiddleware)
+
 
 # Root endpoint for basic connectivity check
 @app.get("/")
@@ -78,8 +83,11 @@ def root():
 # Global exception handler (ensures flush before serverless exit)
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    sentry_sdk.capture_exception(exc)
-    sentry_sdk.flush(timeout=2.0)
+    if settings.sentry_dsn:
+        import sentry_sdk
+
+        sentry_sdk.capture_exception(exc)
+        sentry_sdk.flush(timeout=2.0)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error"},
@@ -0,0 +1,487 @@
+"""
+Caches for API responses, invalidated when the underlying table changes
+"""
+
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Sequence, TypeVar, Union
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.api.config import settings
+from backend.api.metrics import record_cache_lookup, time_serialization
+from backend.api.models.base import ModelType
+import logging
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ViewType = TypeVar("ViewType", bound=BaseModel)
+
+
+async def table_version(
+    db: AsyncSession, table: type[ModelType], where: Any = None
+) -> tuple:
+    """
+    Returns (max(update_timestamp), count) of a table
+
+    The pair changes whenever a row is inserted, updated or deleted, so
+    it can be used as a cache key for anything derived from the table.
+
+    Args:
+        db (AsyncSession): The database session
+        table: SQLAlchemy model with an `update_timestamp` column
+        where: Optional filter restricting the rows taken into account
+    """
+    stmt = select(func.max(getattr(table, "update_timestamp")), func.count())
+    if where is not None:
+        stmt = stmt.where(where)
+    return tuple((await db.execute(stmt)).one())
+
+
+@dataclass(frozen=True)
+class EncodedResponse:
+    """A response body pre-encoded once in every supported content encoding"""
+
+    version: tuple
+    etag: str
+    last_modified: Optional[datetime]
+    bodies: dict[str, bytes]
+
+    @classmethod
+    def from_body(cls, body: bytes, version: tuple) -> "EncodedResponse":
+        bodies = {"identity": body, "gzip": gzip.compress(body)}
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body)
+        last_modified = version[0]
+        if last_modified is not None and last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return cls(
+            version=version,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            last_modified=last_modified,
+            bodies=bodies,
+        )
+
+    def _is_not_modified(self, request: Request) -> bool:
+        """Evaluates the conditional headers of `request`"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have a resolution of one second
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+    def _negotiate_encoding(self, request: Request) -> str:
+        """Picks the best encoding accepted by the client"""
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in request.headers.get("accept-encoding", "").split(",")
+        }
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.bodies:
+                return encoding
+        return "identity"
+
+    def to_response(self, request: Request, media_type: str) -> Response:
+        """
+        Builds the response for `request`, either a 304 Not Modified or
+        the body in the best encoding accepted by the client
+        """
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(
+                self.last_modified.astimezone(timezone.utc), usegmt=True
+            )
+
+        if self._is_not_modified(request):
+            return Response(status_code=304, headers=headers)
+
+        encoding = self._negotiate_encoding(request)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.bodies[encoding], media_type=media_type, headers=headers
+        )
+
+
+class CollectionCache:
+    """
+    Caches the serialized bytes of full-collection responses.
+
+    Entries are keyed by name and are valid as long as the version of
+    the table they were built from does not change, so a request for an
+    unchanged collection costs one aggregate query instead of loading,
+    converting and validating every row.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[str, EncodedResponse] = {}
+
+    def clear(self) -> None:
+        """Drops every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    async def get_response(
+        self,
+        request: Request,
+        db: AsyncSession,
+        key: str,
+        table: type[ModelType],
+        build: Callable[[], Awaitable[Union[BaseModel, bytes]]],
+        media_type: str = "application/json",
+    ) -> Response:
+        """
+        Returns the cached response for `key`, building it first if
+        the cache is empty or `table` changed since it was built
+
+        Args:
+            request (Request): The incoming request, used for conditional
+                headers and content negotiation
+            db (AsyncSession): The database session
+            key (str): Name of the cache entry
+            table: SQLAlchemy model the collection is built from
+            build: Coroutine function building the collection, either as
+                a model or as already
+                encoded JSON; exceptions it raises (e.g. a 404
+                HTTPException) are propagated and nothing is cached
+            media_type (str): Media type of the response
+        """
+        version = await table_version(db, table)
+        entry = self._entries.get(key)
+        if entry is not None and entry.version != version:
+            entry = None
+        record_cache_lookup("collection", entry is not None)
+        if entry is None:
+            collection = await build()
+            with time_serialization(key):
+                body = (
+                    collection.model_dump_json(by_alias=True).encode()
+                    if isinstance(collection, BaseModel)
+                    else collection
+                )
+                entry = EncodedResponse.from_body(body, version)
+            with self._lock:
+                self._entries[key] = entry
+            logger.info("Cached %s collection (%d bytes)", key, len(body))
+        return entry.to_response(request, media_type)
+
+
+class TileCache:
+    """
+    Bounded LRU cache of encoded vector tiles.
+
+    Tiles of a layer are valid as long as the version of the layer's
+    table does not change. Since a map view requests many tiles at
+    once, the version of a layer is checked at most once every
+    `refresh_seconds` rather than once per tile.
+
+    Args:
+        max_entries: Maximum number of tiles kept in memory
+        refresh_seconds: Minimum delay between two version checks of a layer
+    """
+
+    def __init__(self, max_entries: int, refresh_seconds: int):
+        self.max_entries = max_entries
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, EncodedResponse] = OrderedDict()
+        # layer -> (version, monotonic time of the check)
+        self._versions: dict[str, tuple[tuple, float]] = {}
+
+    def clear(self) -> None:
+        """Drops every cached tile and layer version"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    async def _layer_version(
+        self, db: AsyncSession, layer: str, table: type[ModelType], where: Any
+    ) -> tuple:
+        """Returns the version of `layer`, checking the table if it is stale"""
+        now = time.monotonic()
+        known = self._versions.get(layer)
+        if known is not None and now - known[1] < self.refresh_seconds:
+            return known[0]
+        version = await table_version(db, table, where)
+        self._versions[layer] = (version, now)
+        return version
+
+    async def get_response(
+        self,
+        request: Request,
+        db: AsyncSession,
+        layer: str,
+        tile: tuple[int, int, int],
+        table: type[ModelType],
+        build: Callable[[], Awaitable[bytes]],
+        where: Any = None,
+        media_type: str = "application/vnd.mapbox-vector-tile",
+    ) -> Response:
+        """
+        Returns the cached response for a tile, building it first if it
+        is not cached or the layer changed since it was built
+
+        Args:
+            request (Request): The incoming request, used for conditional
+                headers and content negotiation
+            db (AsyncSession): The database session
+            layer (str): Name of the layer
+            tile (tuple): (z, x, y) coordinates of the tile
+            table: SQLAlchemy model the layer is built from
+            build: Coroutine function building the encoded tile
+            where: Optional filter restricting the rows of the layer
+            media_type (str): Media type of the response
+        """
+        version = await self._layer_version(db, layer, table, where)
+        key = (layer, *tile)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and entry.version != version:
+            entry = None
+        record_cache_lookup("tile", entry is not None)
+        if entry is None:
+            body = await build()
+            with time_serialization(layer):
+                entry = EncodedResponse.from_body(body, version)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry.to_response(request, media_type)
+
+
+class PointLookupStore(ABC):
+    """
+    Storage of the point lookup results, as JSON, with the version of the
+    tables they were computed from and their expiry time
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[tuple[str, str, float]]:
+        """Returns the (version, value, expires_at) stored for `key`"""
+
+    @abstractmethod
+    def set(self, key: str, version: str, value: str, expires_at: float) -> None:
+        """Stores a result, replacing that of the same key"""
+
+    def clear(self) -> None:
+        pass
+
+
+class MemoryPointLookupStore(PointLookupStore):
+    """
+    Bounded LRU store kept in the memory of the process
+
+    Args:
+        max_entries: Maximum number of results kept
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[tuple[str, str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, version: str, value: str, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (version, value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLitePointLookupStore(PointLookupStore):
+    """
+    Store in a SQLite file, shared by the workers of a host so that a
+    result computed by one worker is a hit for the others. Expired and
+    outdated results are replaced when computed again, the file is not
+    bounded otherwise.
+
+    Args:
+        path: Path of the SQLite file, created if missing
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=1)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS point_lookups ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+            "value TEXT NOT NULL, expires_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def get(self, key: str) -> Optional[tuple[str, str, float]]:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT version, value, expires_at FROM point_lookups WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def set(self, key: str, version: str, value: str, expires_at: float) -> None:
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO point_lookups VALUES (?, ?, ?, ?)",
+                    (key, version, value, expires_at),
+                )
+        except sqlite3.OperationalError:
+            # Another worker holds the write lock; the result is only
+            # not shared this time
+            logger.warning("Could not store point lookup %s", key, exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM point_lookups")
+
+
+class PointLookupCache:
+    """
+    Caches the results of the point lookup endpoints by coordinates.
+
+    Coordinates are quantized to `precision` degrees, so that repeated
+    searches of the same address share a result. Results are valid until
+    they expire or the version of one of the tables they were computed
+    from changes; as in TileCache, the version of a table is checked at
+    most once every `refresh_seconds`.
+
+    Args:
+        store: Storage of the results
+        precision: Size in degrees of the cells sharing a result
+        ttl_seconds: Time after which a result is computed again
+        refresh_seconds: Minimum delay between two version checks of a table
+        enabled: Whether to cache the results; lookups are always
+            computed otherwise
+    """
+
+    def __init__(
+        self,
+        store: PointLookupStore,
+        precision: float,
+        ttl_seconds: float,
+        refresh_seconds: float,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.store = store
+        self.precision = precision
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        # table name -> (version, monotonic time of the check)
+        self._versions: dict[str, tuple[tuple, float]] = {}
+
+    def clear(self) -> None:
+        """Drops every cached result and table version"""
+        self.store.clear()
+        self._versions.clear()
+
+    def key(self, lookup: str, lon: float, lat: float) -> str:
+        return f"{lookup}:{round(lon / self.precision)}:{round(lat / self.precision)}"
+
+    async def _table_version(self, db: AsyncSession, table: type[ModelType]) -> tuple:
+        now = time.monotonic()
+        known = self._versions.get(table.__tablename__)
+        if known is not None and now - known[1] < self.refresh_seconds:
+            return known[0]
+        version = await table_version(db, table)
+        self._versions[table.__tablename__] = (version, now)
+        return version
+
+    async def get_or_compute(
+        self,
+        db: AsyncSession,
+        lookup: str,
+        lon: float,
+        lat: float,
+        tables: Sequence[type[ModelType]],
+        view: type[ViewType],
+        compute: Callable[[], Awaitable[ViewType]],
+    ) -> ViewType:
+        """
+        Returns the cached result of a lookup at a point, computing it
+        first if it is not cached, expired, or computed from older tables
+
+        Args:
+            db (AsyncSession): The database session
+            lookup (str): Name of the lookup
+            lon (float): Longitude of the point
+            lat (float): Latitude of the point
+            tables: SQLAlchemy models the result is computed from
+            view: Pydantic model of the result
+            compute: Coroutine function computing the result; exceptions
+                it raises are propagated and nothing is cached
+        """
+        if not self.enabled:
+            return await compute()
+
+        versions = [await self._table_version(db, table) for table in tables]
+        version = json.dumps(versions, default=str)
+        key = self.key(lookup, lon, lat)
+        entry = self.store.get(key)
+        if entry is not None and (entry[0] != version or entry[2] <= time.time()):
+            entry = None
+        record_cache_lookup("point", entry is not None)
+        if entry is not None:
+            return view.model_validate_json(entry[1])
+
+        result = await compute()
+        self.store.set(
+            key, version, result.model_dump_json(), time.time() + self.ttl_seconds
+        )
+        return result
+
+
+collection_cache = CollectionCache()
+
+point_cache = PointLookupCache(
+    store=(
+        SQLitePointLookupStore(Path(settings.point_cache_sqlite_path))
+        if settings.point_cache_sqlite_path
+        else MemoryPointLookupStore(settings.point_cache_max_entries)
+    ),
+    precision=settings.point_cache_precision,
+    ttl_seconds=settings.point_cache_ttl_seconds,
+    refresh_seconds=settings.point_cache_refresh_seconds,
+    enabled=settings.point_cache_enabled,
+)
@@ -42,8 +42,56 @@ class Settings(BaseSettings):
     environment: str = "local"
     next_public_cdn_url: str
     sentry_dsn: str
+    # Fraction of the requests traced in Sentry, with spans around their
+    # database queries and serialization; tracing is off at 0
+    sentry_traces_sample_rate: float = 0.0
     next_public_posthog_host: str
     next_public_posthog_key: str
+    # Answer point-in-zone lookups from in-memory STRtree indexes instead
+    # of the database; see backend/api/spatial_index.py
+    in_memory_spatial_index: bool = False
+    # Minimum delay between two checks for changes in the indexed tables
+    spatial_index_refresh_seconds: int = 300
+    # Build full-collection GeoJSON responses in PostGIS (ST_AsGeoJSON +
+    # json_agg) instead of converting each row in Python
+    postgis_geojson: bool = False
+    # Decimal digits of the coordinates of PostGIS-built GeoJSON
+    geojson_max_decimal_digits: int = 9
+    # Maximum number of vector tiles kept in memory
+    tile_cache_max_entries: int = 4096
+    # Minimum delay in seconds between two checks for changes in a tile layer
+    tile_cache_refresh_seconds: int = 60
+    # Import each API router on the first request under its prefix instead
+    # of at startup, to shorten serverless cold starts
+    lazy_routers: bool = False
+    # Connection pooling of the database engines: "queue" for long-running
+    # servers, "pooler" for no pool in the process and Neon's pooled
+    # endpoint, or "serverless" for a small pool kept alive by TCP
+    # keepalives; see backend/database/session.py
+    db_pool_mode: str = "queue"
+    # Connections kept by each engine in the "serverless" pool mode
+    serverless_pool_size: int = 2
+    # Cache the results of the point lookup endpoints by coordinates
+    point_cache_enabled: bool = True
+    # Size in degrees of the coordinate cells sharing a cached lookup result
+    point_cache_precision: float = 1e-6
+    # Maximum number of lookup results kept in memory
+    point_cache_max_entries: int = 10000
+    # Seconds after which a cached lookup result is computed again
+    point_cache_ttl_seconds: int = 3600
+    # Minimum delay in seconds between two checks for changes in a lookup table
+    point_cache_refresh_seconds: int = 60
+    # SQLite file sharing the lookup results between the workers of a host,
+    # instead of keeping them in the memory of each worker
+    point_cache_sqlite_path: str = ""
+    # Level of the API logs
+    log_level: str = "INFO"
+    # Write the API logs as JSON records instead of plain text
+    log_json: bool = True
+    # Fraction of the requests whose INFO and DEBUG logs are kept, by URL
+    # prefix, e.g. {"/api/hazards/at-point": 0.1}; warnings and errors
+    # are always kept
+    log_sample_rates: dict[str, float] = {}
 
     model_config = SettingsConfigDict(
         env_file=ENV_FILE,
@@ -0,0 +1,83 @@
+"""
+Builds GeoJSON FeatureCollections inside PostGIS with ST_AsGeoJSON and
+json_agg, so that the API can return them without converting each row
+in Python
+"""
+
+from itertools import chain
+from typing import Any, Optional
+from sqlalchemy import JSON, Text, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# PostGIS' own default for ST_AsGeoJSON
+DEFAULT_MAX_DECIMAL_DIGITS = 9
+
+
+def _key(name: str):
+    """Renders a JSON key as an SQL string literal rather than a bind parameter"""
+    return literal_column(f"'{name}'")
+
+
+def feature_collection_query(
+    geometry: Any,
+    properties: dict[str, Any],
+    where: Any = None,
+    max_decimal_digits: int = DEFAULT_MAX_DECIMAL_DIGITS,
+):
+    """
+    Builds a statement returning a whole FeatureCollection as one text value
+
+    Args:
+        geometry: Geometry column of the features
+        properties: Maps each property name to the column it is read from
+        where: Optional filter restricting the features
+        max_decimal_digits: Number of decimal digits of the coordinates
+
+    Returns:
+        A SQLAlchemy selectable yielding a single (geojson, count) row
+    """
+    feature = func.json_build_object(
+        _key("type"),
+        _key("Feature"),
+        _key("geometry"),
+        cast(func.ST_AsGeoJSON(geometry, max_decimal_digits), JSON),
+        _key("properties"),
+        func.json_build_object(
+            *chain.from_iterable(
+                (_key(name), column) for name, column in properties.items()
+            )
+        ),
+    )
+    collection = func.json_build_object(
+        _key("type"),
+        _key("FeatureCollection"),
+        _key("features"),
+        func.coalesce(func.json_agg(feature), literal_column("'[]'::json")),
+    )
+    stmt = select(cast(collection, Text).label("geojson"), func.count().label("count"))
+    if where is not None:
+        stmt = stmt.where(where)
+    return stmt
+
+
+async def fetch_feature_collection(
+    db: AsyncSession,
+    geometry: Any,
+    properties: dict[str, Any],
+    where: Any = None,
+    max_decimal_digits: int = DEFAULT_MAX_DECIMAL_DIGITS,
+) -> Optional[bytes]:
+    """
+    Runs feature_collection_query and returns the encoded FeatureCollection
+
+    Returns:
+        The FeatureCollection as UTF-8 encoded JSON, or None if no
+        feature matches
+    """
+    result = await db.execute(
+        feature_collection_query(geometry, properties, where, max_decimal_digits)
+    )
+    row = result.one()
+    if not row.count:
+        return None
+    return row.geojson.encode()
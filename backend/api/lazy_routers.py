@@ -0,0 +1,93 @@
+"""
+Deferred loading of the API routers, to shorten serverless cold starts
+
+Importing a router pulls in SQLAlchemy, GeoAlchemy2, shapely and the
+router's models and schemas. With lazy loading, the app starts with none
+of them and a router module is imported, and its routes added to the
+app, on the first request under its prefix.
+"""
+
+import importlib
+import threading
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class LazyRouters:
+    """
+    Routers of an app, each included on first use
+
+    Args:
+        app: The app the routers are included in
+        modules: Module of each router, by URL prefix; the modules
+            define their APIRouter as `router`
+    """
+
+    def __init__(self, app: FastAPI, modules: dict[str, str]):
+        self.app = app
+        self._pending = dict(modules)
+        self._lock = threading.Lock()
+
+    def include(self, prefix: str) -> None:
+        """Imports the router of a prefix and adds its routes to the app"""
+        with self._lock:
+            module_name = self._pending.pop(prefix, None)
+            if module_name is None:
+                return
+            module = importlib.import_module(module_name)
+            self.app.include_router(module.router)
+            # Regenerated with the new routes on the next request
+            self.app.openapi_schema = None
+
+    def include_all(self) -> None:
+        for prefix in list(self._pending):
+            self.include(prefix)
+
+    def include_for_path(self, path: str) -> None:
+        """Includes the router whose prefix the path starts with, if any"""
+        for prefix in list(self._pending):
+            if path == prefix or path.startswith(prefix + "/"):
+                self.include(prefix)
+
+
+class LazyRouterMiddleware:
+    """
+    ASGI middleware including the router of each request's path before
+    the request is routed. The OpenAPI schema and docs need all the
+    routers, which are then all included.
+    """
+
+    def __init__(self, app: ASGIApp, routers: LazyRouters):
+        self.app = app
+        self.routers = routers
+        self._all_paths = {
+            path
+            for path in (routers.app.openapi_url, routers.app.docs_url)
+            if path is not None
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            if scope["path"] in self._all_paths:
+                self.routers.include_all()
+            else:
+                self.routers.include_for_path(scope["path"])
+        await self.app(scope, receive, send)
+
+
+def include_routers(app: FastAPI, modules: dict[str, str], lazy: bool) -> None:
+    """
+    Includes the routers of `modules` in the app, right away or on first
+    use when `lazy` is set
+
+    Args:
+        app: The app
+        modules: Module of each router, by URL prefix
+        lazy: Whether to defer importing each router until a request
+            under its prefix
+    """
+    routers = LazyRouters(app, modules)
+    if lazy:
+        app.add_middleware(LazyRouterMiddleware, routers=routers)
+    else:
+        routers.include_all()
@@ -0,0 +1,231 @@
+"""
+Logging of the API: structured, sampled and off the request path
+
+`setup_logging` sends every record through a queue to a listener thread,
+which formats and writes it, so that a request only pays for creating
+the record. Records are formatted lazily: pass the values as arguments
+(`logger.info("Built %s", name)`) rather than as an f-string, and they
+are only interpolated if the record is written.
+
+`RequestLoggingMiddleware` gives each request an ID, logged with every
+record of the request and returned in the X-Request-ID header, and logs
+one record per request. Records below WARNING of the requests under the
+prefixes of LOG_SAMPLE_RATES are only kept for that fraction of the
+requests.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import NamedTuple, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_ID_HEADER = "x-request-id"
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContext(NamedTuple):
+    request_id: str
+    # Whether the records below WARNING of the request are kept
+    sampled: bool
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar(
+    "request_log_context", default=None
+)
+
+
+def current_request_id() -> Optional[str]:
+    context = _request_context.get()
+    return context.request_id if context is not None else None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The previous plain text format, with the request ID if any"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"[{request_id}] {line}" if request_id is not None else line
+
+
+class RequestContextQueueHandler(QueueHandler):
+    """
+    Enqueues records with the ID of the request logging them, dropping
+    the records below WARNING of the requests not sampled
+
+    Unlike QueueHandler, it leaves formatting the message to the listener
+    thread, as the queue does not leave the process.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is not None:
+            if not context.sampled and record.levelno < logging.WARNING:
+                return False
+            record.request_id = context.request_id
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class SampleRates:
+    """
+    Fraction of the requests whose records below WARNING are logged, by
+    URL prefix; the longest matching prefix wins, and requests matching
+    none are all logged
+
+    Args:
+        rates: Fraction between 0 and 1 of each prefix
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        self._rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate(self, path: str) -> float:
+        for prefix, rate in self._rates:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return rate
+        return 1.0
+
+    def sample(self, path: str) -> bool:
+        rate = self.rate(path)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware setting the logging context of each request and
+    logging its method, path, status and duration
+
+    Args:
+        app: The ASGI app
+        sample_rates: Fraction of the requests logged by URL prefix
+    """
+
+    def __init__(self, app: ASGIApp, sample_rates: Optional[dict[str, float]] = None):
+        self.app = app
+        self.sample_rates = SampleRates(sample_rates or {})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _incoming_request_id(scope) or uuid.uuid4().hex
+        path = scope["path"]
+        token = _request_context.set(
+            RequestContext(request_id, self.sample_rates.sample(path))
+        )
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER.encode(), request_id.encode()),
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            logger.exception("Error handling request %s %s", scope["method"], path)
+            raise
+        else:
+            logger.info(
+                "%s %s %s %.1fms",
+                scope["method"],
+                path,
+                status,
+                (time.perf_counter() - start) * 1000,
+            )
+        finally:
+            _request_context.reset(token)
+
+
+def _incoming_request_id(scope: Scope) -> Optional[str]:
+    """The request ID set by a proxy, if it is a sensible one"""
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER.encode():
+            request_id = value.decode("latin-1")
+            if 0 < len(request_id) <= 128 and request_id.isprintable():
+                return request_id
+    return None
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: str = "INFO", json_format: bool = True) -> None:
+    """
+    Sends the records of every logger through a queue to a thread writing
+    them to stderr. Calling it again replaces the previous setup.
+
+    Args:
+        level: Level of the root logger
+        json_format: Whether to write JSON records instead of plain text
+    """
+    global _listener
+    shutdown_logging()
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if json_format else TextFormatter())
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(RequestContextQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+
+def shutdown_logging() -> None:
+    """Writes the queued records and stops the listener thread"""
+    global _listener
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, RequestContextQueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
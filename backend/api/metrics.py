@@ -0,0 +1,346 @@
+"""
+In-process request metrics, exported in the Prometheus text format
+
+The middleware times every request and attributes to its route the time
+spent in database queries, the rows they returned, the time spent
+serializing responses and the bytes sent. Recording a request costs a
+few dictionary lookups and additions, so the metrics are always on.
+
+Sentry performance spans around the database queries and serialization
+are opt-in with SENTRY_TRACES_SAMPLE_RATE.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Route label of the requests matching no route, so that scanned paths
+# do not each create a time series
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Observations counted in cumulative buckets, as in Prometheus"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> Iterator[str]:
+        cumulative = 0
+        separator = "," if labels else ""
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{_braces(labels)} {self.sum}"
+        yield f"{name}_count{_braces(labels)} {self.count}"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def samples(self, name: str, labels: str) -> Iterator[str]:
+        yield f"{name}_total{_braces(labels)} {self.value}"
+
+
+def _braces(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class MetricFamily:
+    """
+    A metric and its children, one per combination of label values
+
+    Args:
+        name: Name of the metric
+        help: Description of the metric
+        labelnames: Names of the labels of the children
+        buckets: Buckets of a histogram; the family is a counter without
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple = (),
+        buckets: Optional[tuple] = None,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.type = "counter" if buckets is None else "histogram"
+        self._lock = threading.Lock()
+        self._children: dict[tuple, Any] = {}
+
+    def labels(self, *values) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    values,
+                    Counter() if self.buckets is None else Histogram(self.buckets),
+                )
+        return child
+
+    def observe(self, value: float, *labels) -> None:
+        child = self.labels(*labels)
+        with self._lock:
+            child.observe(value)
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        child = self.labels(*labels)
+        with self._lock:
+            child.inc(amount)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.type}"
+        with self._lock:
+            for values, child in sorted(self._children.items()):
+                yield from child.samples(
+                    self.name, format_labels(self.labelnames, values)
+                )
+
+
+def render_gauge(
+    name: str, help: str, labelnames: tuple, samples: Iterable[tuple[tuple, float]]
+) -> Iterator[str]:
+    """Renders the values of a gauge computed when the metrics are read"""
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} gauge"
+    for values, value in samples:
+        yield f"{name}{_braces(format_labels(labelnames, values))} {value}"
+
+
+def render_counter(
+    name: str, help: str, labelnames: tuple, samples: Iterable[tuple[tuple, float]]
+) -> Iterator[str]:
+    """Renders the totals of a counter kept outside of the registry"""
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} counter"
+    for values, value in samples:
+        yield f"{name}_total{_braces(format_labels(labelnames, values))} {value}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families: list[MetricFamily] = []
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple, buckets: tuple
+    ) -> MetricFamily:
+        family = MetricFamily(name, help, labelnames, buckets)
+        self.families.append(family)
+        return family
+
+    def counter(self, name: str, help: str, labelnames: tuple) -> MetricFamily:
+        family = MetricFamily(name, help, labelnames)
+        self.families.append(family)
+        return family
+
+    def clear(self) -> None:
+        for family in self.families:
+            family.clear()
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+        lines = [line for family in self.families for line in family.render()]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+response_size = registry.histogram(
+    "http_response_size_bytes",
+    "Size of the response bodies sent",
+    ("route",),
+    BYTES_BUCKETS,
+)
+db_duration = registry.histogram(
+    "http_request_db_seconds",
+    "Time a request spent executing database queries",
+    ("route",),
+    LATENCY_BUCKETS,
+)
+serialization_duration = registry.histogram(
+    "http_request_serialization_seconds",
+    "Time a request spent serializing and encoding its response",
+    ("route",),
+    LATENCY_BUCKETS,
+)
+rows_returned = registry.histogram(
+    "http_request_db_rows",
+    "Rows returned or changed by the database queries of a request",
+    ("route",),
+    ROWS_BUCKETS,
+)
+cache_requests = registry.counter(
+    "cache_requests",
+    "Lookups in the response caches, by result (hit or miss)",
+    ("cache", "result"),
+)
+
+
+@dataclass
+class RequestMetrics:
+    """What the request being handled spent its time on"""
+
+    db_seconds: float = 0.0
+    rows: int = 0
+    queries: int = 0
+    serialization_seconds: float = 0.0
+
+
+# Shared by the tasks and threads of a request, which all see the same
+# RequestMetrics instance
+_current_request: ContextVar[Optional[RequestMetrics]] = ContextVar(
+    "current_request_metrics", default=None
+)
+
+# Set by enable_tracing
+_sentry_sdk = None
+
+
+def enable_tracing() -> None:
+    """Opens Sentry spans around the timed phases of the requests"""
+    global _sentry_sdk
+    import sentry_sdk
+
+    _sentry_sdk = sentry_sdk
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache, "hit" if hit else "miss")
+
+
+@contextmanager
+def time_serialization(description: str = "") -> Iterator[None]:
+    """Attributes the time spent in the block to serializing the response"""
+    span = (
+        _sentry_sdk.start_span(op="serialize", description=description)
+        if _sentry_sdk is not None
+        else None
+    )
+    start = time.perf_counter()
+    try:
+        if span is None:
+            yield
+        else:
+            with span:
+                yield
+    finally:
+        current = _current_request.get()
+        if current is not None:
+            current.serialization_seconds += time.perf_counter() - start
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_times"].pop()
+    current = _current_request.get()
+    if current is not None:
+        current.db_seconds += time.perf_counter() - start
+        current.queries += 1
+        # The number of rows selected, inserted, updated or deleted, as
+        # reported by the driver
+        if cursor.rowcount > 0:
+            current.rows += cursor.rowcount
+
+
+def instrument_engine(engine) -> None:
+    """
+    Attributes the queries executed by a SQLAlchemy engine, sync or async,
+    to the requests executing them
+    """
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the metrics of every HTTP request"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        current = RequestMetrics()
+        token = _current_request.set(current)
+        status = 500
+        body_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, body_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            # Set by FastAPI once the request is routed
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            request_duration.observe(elapsed, scope["method"], path, str(status))
+            response_size.observe(body_bytes, path)
+            if current.queries:
+                db_duration.observe(current.db_seconds, path)
+                rows_returned.observe(current.rows, path)
+            if current.serialization_seconds:
+                serialization_duration.observe(current.serialization_seconds, path)
@@ -11,6 +11,10 @@ from shapely import to_geojson
 from sqlalchemy.ext.hybrid import hybrid_property
 
 
+# Gridcodes 8, 9 and 10 indicate high landslide susceptibility
+HAZARDOUS_GRIDCODES = [8, 9, 10]
+
+
 class LandslideZone(Base):
     """
     All data of the Landslide Zones table from SFData
@@ -0,0 +1,25 @@
+from sqlalchemy import String, DateTime
+from datetime import datetime
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+from sqlalchemy.sql import func
+from backend.api.models.base import Base
+
+
+class RowHash(Base):
+    """
+    Content hash of each row last written by the ETL, per dataset, so that
+    unchanged rows can be skipped on the next run.
+    """
+
+    __tablename__ = "etl_row_hashes"
+
+    dataset_name: Mapped[str] = mapped_column(String, primary_key=True)
+    row_id: Mapped[str] = mapped_column(String, primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(32), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<RowHash(dataset_name='{self.dataset_name}', row_id='{self.row_id}', content_hash='{self.content_hash}')>"
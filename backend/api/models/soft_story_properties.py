@@ -12,6 +12,10 @@ from sqlalchemy.ext.hybrid import hybrid_property
 
 _STRING_LENGTH = 255
 
+STATUS_WORK_COMPLETE_LOWERCASE = (
+    "work complete, cfc issued"  # Work Complete, CFC Issued
+)
+
 
 class SoftStoryProperty(Base):
     """
@@ -0,0 +1,446 @@
+"""Router to check all hazards for a point in a single request"""
+
+from fastapi import Depends, HTTPException, APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, NamedTuple, Optional
+from datetime import datetime
+import json
+from collections import defaultdict
+from ..tags import Tags
+from sqlalchemy import (
+    Float,
+    String,
+    bindparam,
+    cast,
+    func,
+    literal,
+    null,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from geoalchemy2 import functions as geo_func
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Point
+from backend.database.session import get_async_db
+from backend.api.config import settings
+from backend.api.cache import point_cache
+from backend.api.spatial_index import (
+    landslide_zone_index,
+    liquefaction_zone_index,
+    tsunami_zone_index,
+)
+from backend.api.models.tsunami import TsunamiZone
+from backend.api.models.liquefaction_zones import LiquefactionZone
+from backend.api.models.landslide_zones import LandslideZone, HAZARDOUS_GRIDCODES
+from backend.api.models.soft_story_properties import SoftStoryProperty
+from backend.api.routers.soft_story_api import soft_story_exists
+from backend.api.schemas.hazard_schemas import (
+    Coordinates,
+    HazardsAtPointResult,
+    HazardsAtPointView,
+    HazardsBatchRequest,
+    HazardsBatchView,
+)
+from backend.api.schemas.soft_story_schemas import IsSoftStoryPropertyView
+from backend.api.schemas.tsunami_schemas import IsInTsunamiZoneView
+from backend.api.schemas.liquefaction_schemas import InLiquefactionZoneView
+from backend.api.schemas.landslide_schemas import IsInLandslideZoneView
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/hazards",
+    tags=[Tags.HAZARDS],
+)
+
+HAZARD_SOFT_STORY = "soft_story"
+HAZARD_TSUNAMI = "tsunami"
+HAZARD_LIQUEFACTION = "liquefaction"
+HAZARD_LANDSLIDE = "landslide"
+
+# Tolerance in degrees used to match a point to a soft story property
+SOFT_STORY_TOLERANCE = 0.000001
+# Number of points resolved per query when streaming batch results
+BATCH_STREAM_CHUNK_SIZE = 1000
+
+
+class HazardRow(NamedTuple):
+    """A matched hazard, in the shape of a hazards_at_point_query row"""
+
+    hazard: str
+    last_updated: Optional[datetime]
+    detail: Optional[str]
+
+
+def hazards_at_point_query(point, correlate_with=None, hazards=None):
+    """
+    Builds a single statement that looks up every hazard for a point
+
+    Each branch of the UNION ALL returns at most one row of the form
+    (hazard, last_updated, detail), so the whole lookup costs one
+    round trip to the database.
+
+    Args:
+        point: GeoAlchemy point with srid 4326, or a point expression
+            over the columns of `correlate_with`
+        correlate_with: Optional FROM clause of an enclosing query that
+            `point` refers to, used when the statement is embedded as a
+            LATERAL subquery
+        hazards: Optional subset of the hazard names to look up, all of
+            them by default
+
+    Returns:
+        A SQLAlchemy selectable yielding one row per matched hazard
+    """
+    soft_story = (
+        select(
+            literal(HAZARD_SOFT_STORY).label("hazard"),
+            SoftStoryProperty.update_timestamp.label("last_updated"),
+            SoftStoryProperty.status.label("detail"),
+        )
+        .where(
+            geo_func.ST_DWithin(SoftStoryProperty.point, point, SOFT_STORY_TOLERANCE)
+        )
+        .limit(1)
+    )
+    tsunami = (
+        select(
+            literal(HAZARD_TSUNAMI).label("hazard"),
+            TsunamiZone.update_timestamp.label("last_updated"),
+            cast(null(), String).label("detail"),
+        )
+        .where(TsunamiZone.geometry.ST_Intersects(point))
+        .limit(1)
+    )
+    liquefaction = (
+        select(
+            literal(HAZARD_LIQUEFACTION).label("hazard"),
+            LiquefactionZone.update_timestamp.label("last_updated"),
+            LiquefactionZone.liq.label("detail"),
+        )
+        .where(LiquefactionZone.geometry.ST_Intersects(point))
+        .limit(1)
+    )
+    landslide = (
+        select(
+            literal(HAZARD_LANDSLIDE).label("hazard"),
+            LandslideZone.update_timestamp.label("last_updated"),
+            cast(LandslideZone.gridcode, String).label("detail"),
+        )
+        .where(
+            LandslideZone.gridcode.in_(HAZARDOUS_GRIDCODES),
+            LandslideZone.geometry.ST_Intersects(point),
+        )
+        .order_by(LandslideZone.gridcode.desc())
+        .limit(1)
+    )
+    branches = [
+        branch
+        for name, branch in (
+            (HAZARD_SOFT_STORY, soft_story),
+            (HAZARD_TSUNAMI, tsunami),
+            (HAZARD_LIQUEFACTION, liquefaction),
+            (HAZARD_LANDSLIDE, landslide),
+        )
+        if hazards is None or name in hazards
+    ]
+    if correlate_with is not None:
+        branches = [branch.correlate(correlate_with) for branch in branches]
+    return union_all(*(select(branch.subquery()) for branch in branches))
+
+
+def hazards_batch_query(lons: list[float], lats: list[float]):
+    """
+    Builds a single set-based statement that looks up every hazard for
+    a list of points
+
+    The points are unnested from two arrays and joined laterally
+    against hazards_at_point_query, so each hazard table is probed
+    through its GiST index once per point within the same statement.
+
+    Args:
+        lons: Longitudes of the points
+        lats: Latitudes of the points, in the same order as lons
+
+    Returns:
+        A SQLAlchemy selectable yielding (position, hazard,
+        last_updated, detail) rows, where position is the 1-based index
+        of the point in the input lists
+    """
+    points = (
+        func.unnest(
+            bindparam("lons", lons, type_=ARRAY(Float)),
+            bindparam("lats", lats, type_=ARRAY(Float)),
+        )
+        .table_valued("lon", "lat", with_ordinality="position")
+        .render_derived(name="points")
+    )
+    point = func.ST_SetSRID(func.ST_MakePoint(points.c.lon, points.c.lat), 4326)
+    hazards = (
+        hazards_at_point_query(point, correlate_with=points)
+        .subquery()
+        .lateral("hazards")
+    )
+    return (
+        select(points.c.position, hazards)
+        .select_from(points.join(hazards, true()))
+        .order_by(points.c.position)
+    )
+
+
+async def zone_hazard_rows_from_indexes(
+    db: AsyncSession, lon: float, lat: float
+) -> list:
+    """
+    Looks up the zone hazards of a point in the in-memory spatial
+    indexes
+
+    Args:
+        db (AsyncSession): The database session, only used to refresh the indexes
+        lon (float): Longitude of the point
+        lat (float): Latitude of the point
+
+    Returns:
+        (hazard, last_updated, detail) rows, like hazards_at_point_query
+    """
+    rows = []
+    for hazard, index, detail_column in (
+        (HAZARD_TSUNAMI, tsunami_zone_index, None),
+        (HAZARD_LIQUEFACTION, liquefaction_zone_index, "liq"),
+        (HAZARD_LANDSLIDE, landslide_zone_index, "gridcode"),
+    ):
+        zone = await index.find(db, lon, lat)
+        if zone is not None:
+            detail = str(getattr(zone, detail_column)) if detail_column else None
+            rows.append(HazardRow(hazard, zone.update_timestamp, detail))
+    return rows
+
+
+def hazards_view_from_rows(rows) -> HazardsAtPointView:
+    """
+    Builds the composite view model from the rows returned by
+    hazards_at_point_query
+
+    Args:
+        rows: Iterable of (hazard, last_updated, detail) rows
+
+    Returns:
+        HazardsAtPointView with every hazard filled in
+    """
+    found = {row.hazard: row for row in rows}
+
+    soft_story = found.get(HAZARD_SOFT_STORY)
+    tsunami = found.get(HAZARD_TSUNAMI)
+    liquefaction = found.get(HAZARD_LIQUEFACTION)
+    landslide = found.get(HAZARD_LANDSLIDE)
+
+    return HazardsAtPointView(
+        soft_story=IsSoftStoryPropertyView(
+            exists=soft_story_exists(soft_story.detail) if soft_story else None,
+            last_updated=soft_story.last_updated if soft_story else None,
+        ),
+        tsunami=IsInTsunamiZoneView(
+            exists=tsunami is not None,
+            last_updated=tsunami.last_updated if tsunami else None,
+        ),
+        liquefaction=InLiquefactionZoneView(
+            exists=liquefaction is not None,
+            last_updated=liquefaction.last_updated if liquefaction else None,
+            liq=liquefaction.detail if liquefaction else None,
+        ),
+        landslide=IsInLandslideZoneView(
+            exists=landslide is not None,
+            last_updated=landslide.last_updated if landslide else None,
+            gridcode=int(landslide.detail) if landslide else None,
+        ),
+    )
+
+
+@router.get("/at-point", response_model=HazardsAtPointView)
+async def hazards_at_point(
+    lon: Optional[float] = Query(None),
+    lat: Optional[float] = Query(None),
+    ping: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Checks all hazards for a point with a single database query.
+
+    Args:
+        lon (float): Longitude of the point.
+        lat (float): Latitude of the point.
+        ping (bool): Optional ping parameter, used to reduce cold starts.
+        db (AsyncSession): The database session dependency.
+
+    Returns:
+        HazardsAtPointView containing the soft story, tsunami,
+        liquefaction and landslide status of the point.
+
+        If `ping=true` is passed, skips DB call and returns a dummy
+        HazardsAtPointView in which no hazard exists.
+    """
+    if ping:
+        logger.info("Pinging the hazards at-point endpoint")
+        return hazards_view_from_rows([])  # skip DB call
+
+    if lon is None or lat is None:
+        logger.warning("Missing coordinates in non-ping request")
+        raise HTTPException(
+            status_code=400,
+            detail="Both 'lon' and 'lat' must be provided unless ping=true",
+        )
+
+    logger.info("Checking all hazards for coordinates: lon=%s, lat=%s", lon, lat)
+
+    async def find_hazards() -> HazardsAtPointView:
+        point = from_shape(Point(lon, lat), srid=4326)
+        if settings.in_memory_spatial_index:
+            result = await db.execute(
+                hazards_at_point_query(point, hazards=[HAZARD_SOFT_STORY])
+            )
+            rows = result.all() + await zone_hazard_rows_from_indexes(db, lon, lat)
+        else:
+            rows = (await db.execute(hazards_at_point_query(point))).all()
+        return hazards_view_from_rows(rows)
+
+    try:
+        view = await point_cache.get_or_compute(
+            db,
+            "hazards",
+            lon,
+            lat,
+            [SoftStoryProperty, TsunamiZone, LiquefactionZone, LandslideZone],
+            HazardsAtPointView,
+            find_hazards,
+        )
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Hazard check result for coordinates: lon=%s, lat=%s - "
+                "hazards found: %s",
+                lon,
+                lat,
+                [hazard for hazard, status in view if status.exists],
+            )
+
+        return view
+
+    except Exception:
+        logger.exception(
+            "Error checking hazards for coordinates: lon=%s, lat=%s", lon, lat
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred while checking hazards.",
+        )
+
+
+async def resolve_hazards_batch(
+    db: AsyncSession, points: list[Coordinates]
+) -> list[HazardsAtPointResult]:
+    """
+    Resolves the hazards of a list of points with a single query
+
+    Args:
+        db (AsyncSession): The database session
+        points (list[Coordinates]): Points to check
+
+    Returns:
+        The hazards of each point, in the order of `points`
+    """
+    result = await db.execute(
+        hazards_batch_query(
+            [point.lon for point in points], [point.lat for point in points]
+        )
+    )
+    rows = result.all()
+
+    rows_by_position = defaultdict(list)
+    for row in rows:
+        rows_by_position[row.position].append(row)
+
+    return [
+        HazardsAtPointResult(
+            lon=point.lon,
+            lat=point.lat,
+            **dict(hazards_view_from_rows(rows_by_position[position])),
+        )
+        for position, point in enumerate(points, start=1)
+    ]
+
+
+async def _stream_hazards_batch(
+    db: AsyncSession, points: list[Coordinates]
+) -> AsyncIterator[str]:
+    """
+    Yields the hazards of each point as newline-delimited JSON,
+    resolving BATCH_STREAM_CHUNK_SIZE points per query
+
+    The session is closed once the stream is exhausted, since the
+    get_async_db dependency has already exited when the response body is sent.
+    As the 200 status is already sent, an error ends the stream with an
+    {"error": ...} line instead.
+    """
+    try:
+        for start in range(0, len(points), BATCH_STREAM_CHUNK_SIZE):
+            chunk = points[start : start + BATCH_STREAM_CHUNK_SIZE]
+            for result in await resolve_hazards_batch(db, chunk):
+                yield result.model_dump_json() + "\n"
+    except Exception:
+        logger.exception(
+            "Error streaming hazards for a batch of %d points", len(points)
+        )
+        yield (
+            json.dumps(
+                {"error": "An unexpected error occurred while checking hazards."}
+            )
+            + "\n"
+        )
+    finally:
+        await db.close()
+
+
+@router.post("/batch", response_model=HazardsBatchView)
+async def hazards_batch(
+    request: HazardsBatchRequest,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Checks all hazards for a list of points with a single set-based
+    database query.
+
+    Args:
+        request (HazardsBatchRequest): The points to check.
+        stream (bool): If true, results are streamed as newline-delimited
+            JSON, one HazardsAtPointResult per line, instead of being
+            returned in a single HazardsBatchView.
+        db (AsyncSession): The database session dependency.
+
+    Returns:
+        HazardsBatchView containing the hazards of each point, in the
+        order of the request.
+    """
+    points = request.points
+    logger.info("Checking all hazards for %d points (stream=%s)", len(points), stream)
+
+    if stream:
+        return StreamingResponse(
+            _stream_hazards_batch(db, points), media_type="application/x-ndjson"
+        )
+
+    try:
+        results = await resolve_hazards_batch(db, points)
+        logger.info("Batch hazard check completed for %d points", len(results))
+        return HazardsBatchView(results=results)
+
+    except Exception:
+        logger.exception("Error checking hazards for a batch of %d points", len(points))
+        raise HTTPException(
+            status_code=500,
+            detail=f"An unexpected error occurred while checking hazards.",
+        )
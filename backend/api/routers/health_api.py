@@ -2,11 +2,10 @@
 
 from fastapi import APIRouter
 from ..tags import Tags
+from backend.api.config import settings
+from backend.database.pool_metrics import all_pool_metrics
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -16,12 +15,27 @@ router = APIRouter(
 
 
 @router.get("")
-def health_check():
+async def health_check():
     """
     Simple health check endpoint to verify API is running.
 
     Returns:
         dict: Status message indicating the API is healthy.
     """
-    logger.info("Health check endpoint called")
+    logger.debug("Health check endpoint called")
     return {"status": "healthy"}
+
+
+@router.get("/db-pool")
+async def db_pool_metrics():
+    """
+    Connection pool metrics of the database engines created by this
+    process, to size the pools of the DB_POOL_MODE deployment modes.
+
+    Returns:
+        dict: Deployment mode and the metrics of each pool by name.
+    """
+    return {
+        "mode": settings.db_pool_mode,
+        "pools": {metrics.name: metrics.snapshot() for metrics in all_pool_metrics()},
+    }
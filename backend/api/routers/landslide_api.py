@@ -2,8 +2,9 @@
 
 from fastapi import Depends, HTTPException, APIRouter
 from ..tags import Tags
-from sqlalchemy.orm import Session
-from backend.database.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.session import get_async_db
 from ..schemas.landslide_schemas import (
     LandslideFeature,
     LandslideFeatureCollection,
@@ -17,12 +18,12 @@ router = APIRouter(
 
 
 @router.get("/", response_model=LandslideFeatureCollection)
-def get_landslide_zones(db: Session = Depends(get_db)):
+async def get_landslide_zones(db: AsyncSession = Depends(get_async_db)):
     """
     Retrieve all hazardous landslide zones (with gridcode 8, 9, 10) from the database.
 
     Args:
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         LandslideFeatureCollection: A collection of all landslide zones as GeoJSON Features.
@@ -32,8 +33,10 @@ def get_landslide_zones(db: Session = Depends(get_db)):
     """
     # Query the database for all landslide zones
     landslide_zones = (
-        db.query(LandslideZone).filter(LandslideZone.gridcode.in_([8, 9, 10])).all()
-    )
+        await db.scalars(
+            select(LandslideZone).where(LandslideZone.gridcode.in_([8, 9, 10]))
+        )
+    ).all()
 
     # If no zones are found, raise a 404 error
     if not landslide_zones:
@@ -1,12 +1,17 @@
 """Router to handle liquefaction-related API endpoints"""
 
-from fastapi import Depends, HTTPException, APIRouter, Query
+from fastapi import Depends, HTTPException, APIRouter, Query, Request
 from typing import Optional
 from ..tags import Tags
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
-from backend.database.session import get_db
+from backend.database.session import get_async_db
+from backend.api.config import settings
+from backend.api.spatial_index import liquefaction_zone_index
+from backend.api.cache import collection_cache, point_cache
+from backend.api.geojson_sql import fetch_feature_collection
 from ..schemas.liquefaction_schemas import (
     LiquefactionFeature,
     InLiquefactionZoneView,
@@ -15,9 +20,6 @@ from ..schemas.liquefaction_schemas import (
 from backend.api.models.liquefaction_zones import LiquefactionZone
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -27,14 +29,20 @@ router = APIRouter(
 
 
 @router.get("", response_model=LiquefactionFeatureCollection)
-def get_liquefaction_zones(db: Session = Depends(get_db)):
+async def get_liquefaction_zones(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """
     Retrieve all liquefaction zones from the database
 
     Included for backward compatibility
 
+    The serialized collection is cached until the table changes and is
+    served with ETag and Last-Modified headers.
+
     Args:
-        db (Session): The database session dependency.
+        request (Request): The incoming request.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         LiquefactionFeatureCollection: A collection of all liquefaction zones as GeoJSON Features.
@@ -42,26 +50,52 @@ def get_liquefaction_zones(db: Session = Depends(get_db)):
     Raises:
         HTTPException: If no zones are found (404 error).
     """
-    # Query the database for all liquefaction zones
-    liquefaction_zones = db.query(LiquefactionZone).all()
 
-    # If no zones are found, raise a 404 error
-    if not liquefaction_zones:
-        raise HTTPException(status_code=404, detail="No liquefaction zones found")
+    async def build_collection():
+        if settings.postgis_geojson:
+            geojson = await fetch_feature_collection(
+                db,
+                LiquefactionZone.geometry,
+                {
+                    "identifier": LiquefactionZone.identifier,
+                    "liq": LiquefactionZone.liq,
+                    "update_timestamp": LiquefactionZone.update_timestamp,
+                },
+                max_decimal_digits=settings.geojson_max_decimal_digits,
+            )
+            if geojson is None:
+                raise HTTPException(
+                    status_code=404, detail="No liquefaction zones found"
+                )
+            return geojson
+
+        # Query the database for all liquefaction zones
+        liquefaction_zones = (await db.scalars(select(LiquefactionZone))).all()
+
+        # If no zones are found, raise a 404 error
+        if not liquefaction_zones:
+            raise HTTPException(status_code=404, detail="No liquefaction zones found")
+
+        features = [
+            LiquefactionFeature.from_sqlalchemy_model(zone)
+            for zone in liquefaction_zones
+        ]
+        return LiquefactionFeatureCollection(
+            type="FeatureCollection", features=features
+        )
 
-    features = [
-        LiquefactionFeature.from_sqlalchemy_model(zone) for zone in liquefaction_zones
-    ]
-    return LiquefactionFeatureCollection(type="FeatureCollection", features=features)
+    return await collection_cache.get_response(
+        request, db, "liquefaction_zones", LiquefactionZone, build_collection
+    )
 
 
 @router.get("/high-susceptibility", response_model=LiquefactionFeatureCollection)
-def get_high_susceptibility_zones(db: Session = Depends(get_db)):
+async def get_high_susceptibility_zones(db: AsyncSession = Depends(get_async_db)):
     """
     Retrieve all high-susceptibility liquefaction zones from the database.
 
     Args:
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         LiquefactionFeatureCollection: A collection of high-susceptibility liquefaction zones as GeoJSON Features.
@@ -71,8 +105,8 @@ def get_high_susceptibility_zones(db: Session = Depends(get_db)):
     """
     # Query the database for all high-susceptibility liquefaction zones
     high_susceptibility_zones = (
-        db.query(LiquefactionZone).filter(LiquefactionZone.liq == "H").all()
-    )
+        await db.scalars(select(LiquefactionZone).where(LiquefactionZone.liq == "H"))
+    ).all()
 
     # If no zones are found, raise a 404 error
     if not high_susceptibility_zones:
@@ -96,12 +130,12 @@ def get_high_susceptibility_zones(db: Session = Depends(get_db)):
 
 
 @router.get("/very-high-susceptibility", response_model=LiquefactionFeatureCollection)
-def get_very_high_susceptibility_zones(db: Session = Depends(get_db)):
+async def get_very_high_susceptibility_zones(db: AsyncSession = Depends(get_async_db)):
     """
     Retrieve all very-high-susceptibility liquefaction zones from the database.
 
     Args:
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         LiquefactionFeatureCollection: A collection of very-high-susceptibility liquefaction zones as GeoJSON Features.
@@ -111,8 +145,8 @@ def get_very_high_susceptibility_zones(db: Session = Depends(get_db)):
     """
     # Query the database for all very-high-susceptibility liquefaction zones
     very_high_susceptibility_zones = (
-        db.query(LiquefactionZone).filter(LiquefactionZone.liq == "VH").all()
-    )
+        await db.scalars(select(LiquefactionZone).where(LiquefactionZone.liq == "VH"))
+    ).all()
 
     # If no zones are found, raise a 404 error
     if not very_high_susceptibility_zones:
@@ -137,11 +171,11 @@ def get_very_high_susceptibility_zones(db: Session = Depends(get_db)):
 
 
 @router.get("/is-in-liquefaction-zone", response_model=InLiquefactionZoneView)
-def is_in_liquefaction_zone(
+async def is_in_liquefaction_zone(
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     ping: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Check if a point is in a liquefaction zone.
@@ -150,7 +184,7 @@ def is_in_liquefaction_zone(
         lon (float): Longitude of the point.
         lat (float): Latitude of the point.
         ping (bool): Optional ping parameter, used to reduce cold starts.
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         IsInLiquefactionZoneView containing:
@@ -160,7 +194,7 @@ def is_in_liquefaction_zone(
          If `ping=true` is passed, skips DB call and returns a dummy IsInLiquefactionZoneView(exists=False, last_updated=None) instance.
     """
     if ping:
-        logger.info(f"Pinging the is-in-liquefaction-zone endpoint")
+        logger.info("Pinging the is-in-liquefaction-zone endpoint")
         return InLiquefactionZoneView(
             exists=False, last_updated=None, liq=None
         )  # skip DB call
@@ -172,32 +206,54 @@ def is_in_liquefaction_zone(
             detail="Both 'lon' and 'lat' must be provided unless ping=true",
         )
 
-    logger.info(f"Checking liquefaction zone for coordinates: lon={lon}, lat={lat}")
+    logger.info("Checking liquefaction zone for coordinates: lon=%s, lat=%s", lon, lat)
+
+    async def find_zone() -> InLiquefactionZoneView:
+        if settings.in_memory_spatial_index:
+            zone = await liquefaction_zone_index.find(db, lon, lat)
+        else:
+            point = from_shape(Point(lon, lat), srid=4326)
+            zone = (
+                await db.scalars(
+                    select(LiquefactionZone)
+                    .where(LiquefactionZone.geometry.ST_Intersects(point))
+                    .limit(1)
+                )
+            ).first()
+        return InLiquefactionZoneView(
+            exists=zone is not None,
+            last_updated=zone.update_timestamp if zone else None,
+            liq=zone.liq if zone else None,
+        )
 
     try:
-        point = from_shape(Point(lon, lat), srid=4326)
-        zone = (
-            db.query(LiquefactionZone)
-            .filter(LiquefactionZone.geometry.ST_Intersects(point))
-            .first()
+        view = await point_cache.get_or_compute(
+            db,
+            "liquefaction",
+            lon,
+            lat,
+            [LiquefactionZone],
+            InLiquefactionZoneView,
+            find_zone,
         )
-        exists = zone is not None
-        last_updated = zone.update_timestamp if zone else None
-        liq = zone.liq if zone else None
 
         logger.info(
-            f"Liquefaction zone check result for coordinates: lon={lon}, lat={lat} - "
-            f"exists: {exists}, "
-            f"last_updated: {last_updated}"
-            f"liq: {liq}"
+            "Liquefaction zone check result for coordinates: lon=%s, lat=%s - "
+            "exists: %s, last_updated: %s, liq: %s",
+            lon,
+            lat,
+            view.exists,
+            view.last_updated,
+            view.liq,
         )
 
-        return InLiquefactionZoneView(exists=exists, last_updated=last_updated, liq=liq)
+        return view
 
     except Exception:
-        logger.error(
-            f"Error checking liquefaction zone status for coordinates: lon={lon}, lat={lat}",
-            exc_info=True,
+        logger.exception(
+            "Error checking liquefaction zone status for coordinates: lon=%s, lat=%s",
+            lon,
+            lat,
         )
         raise HTTPException(
             status_code=500,
@@ -0,0 +1,73 @@
+"""Router exporting the API metrics in the Prometheus text format"""
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+from ..tags import Tags
+from backend.api.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    registry,
+    render_counter,
+    render_gauge,
+)
+from backend.database.pool_metrics import all_pool_metrics
+
+router = APIRouter(
+    prefix="/api/metrics",
+    tags=[Tags.SYSTEM],
+)
+
+# Pool metrics only increasing since the process started, exported as
+# counters, by snapshot key
+POOL_COUNTERS = {
+    "checkouts": "Connections checked out of the pool",
+    "connects": "Connections opened by the pool",
+    "waits": "Checkouts that waited for a connection",
+    "timeouts": "Checkouts that timed out waiting for a connection",
+    "wait_seconds": "Time checkouts spent waiting for a connection",
+}
+
+# Pool metrics exported as gauges, by snapshot key
+POOL_GAUGES = {
+    "checked_out": "Connections currently checked out",
+    "overflow": "Connections currently open beyond the pool size",
+    "peak_overflow": "Most connections open beyond the pool size at once",
+}
+
+
+def render_pool_metrics() -> str:
+    snapshots = [metrics.snapshot() for metrics in all_pool_metrics()]
+    lines: list[str] = []
+    for metrics, render in (
+        (POOL_COUNTERS, render_counter),
+        (POOL_GAUGES, render_gauge),
+    ):
+        for key, help in metrics.items():
+            lines.extend(
+                render(
+                    f"db_pool_{key}",
+                    help,
+                    ("pool",),
+                    [
+                        ((snapshot["name"],), snapshot[key])
+                        for snapshot in snapshots
+                        if key in snapshot
+                    ],
+                )
+            )
+    return "\n".join(lines) + "\n"
+
+
+@router.get("")
+async def get_metrics():
+    """
+    Request latencies, database time, serialization time, rows returned,
+    response sizes, cache lookups and connection pool metrics of this
+    process, for Prometheus to scrape.
+
+    Returns:
+        Response: The metrics in the Prometheus text exposition format.
+    """
+    return Response(
+        content=registry.render() + render_pool_metrics(),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
@@ -1,25 +1,28 @@
 """CRUD for soft story properties"""
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import Optional
 from ..tags import Tags
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, select
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
-from sqlalchemy.orm import Session
-from backend.database.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.session import get_async_db
+from backend.api.config import settings
+from backend.api.cache import collection_cache, point_cache
+from backend.api.geojson_sql import fetch_feature_collection
 from geoalchemy2 import functions as geo_func
 from backend.api.schemas.soft_story_schemas import (
     SoftStoryFeature,
     SoftStoryFeatureCollection,
     IsSoftStoryPropertyView,
 )
-from backend.api.models.soft_story_properties import SoftStoryProperty
+from backend.api.models.soft_story_properties import (
+    STATUS_WORK_COMPLETE_LOWERCASE,
+    SoftStoryProperty,
+)
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -27,21 +30,42 @@ router = APIRouter(
     tags=[Tags.SOFT_STORY],
 )
 
-STATUS_WORK_COMPLETE_LOWERCASE = (
-    "work complete, cfc issued"  # Work Complete, CFC Issued
-)
 STATUS_NON_COMPLIANT = "non-compliant"
 
 
+def soft_story_exists(status: Optional[str]) -> Optional[bool]:
+    """
+    Maps the status of a soft story property to the `exists` flag
+    reported by the API
+
+    Args:
+        status (str): Status of the soft story property
+
+    Returns:
+        True if the property is non-compliant, False if work is
+        complete, None otherwise
+    """
+    status_lower = status.lower() if status else None
+    if status_lower == STATUS_WORK_COMPLETE_LOWERCASE:
+        return False
+    if status_lower == STATUS_NON_COMPLIANT:
+        return True
+    return None
+
+
 @router.get("", response_model=SoftStoryFeatureCollection)
-def get_soft_stories(db: Session = Depends(get_db)):
+async def get_soft_stories(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Retrieves all soft story properties (of which coordinates are
     known) from the database except the ones for which work is
     complete
 
+    The serialized collection is cached until the table changes and is
+    served with ETag and Last-Modified headers
+
     Args:
-        db (Session): The database session dependency
+        request (Request): The incoming request
+        db (AsyncSession): The database session dependency
 
     Returns:
         SoftStoryFeatureCollection: A collection of all soft story
@@ -50,33 +74,56 @@ def get_soft_stories(db: Session = Depends(get_db)):
     Raises:
         HTTPException: If no zones are found (404 error)
     """
-    soft_stories = (
-        db.query(SoftStoryProperty)
-        .filter(
-            and_(
-                SoftStoryProperty.point.isnot(None),
-                func.lower(SoftStoryProperty.status) != STATUS_WORK_COMPLETE_LOWERCASE,
-            )
-        )
-        .all()
-    )
 
-    # If no soft story properties are found, raise a 404 error
-    if not soft_stories:
-        logger.warning("No soft story properties found in database")
-        raise HTTPException(status_code=404, detail="No soft stories found")
+    not_retrofitted = and_(
+        SoftStoryProperty.point.isnot(None),
+        func.lower(SoftStoryProperty.status) != STATUS_WORK_COMPLETE_LOWERCASE,
+    )
 
-    features = [SoftStoryFeature.from_sqlalchemy_model(story) for story in soft_stories]
-    logger.info(f"Successfully retrieved {len(features)} soft story properties")
-    return SoftStoryFeatureCollection(type="FeatureCollection", features=features)
+    async def build_collection():
+        if settings.postgis_geojson:
+            geojson = await fetch_feature_collection(
+                db,
+                SoftStoryProperty.point,
+                {
+                    "identifier": SoftStoryProperty.identifier,
+                    "update_timestamp": SoftStoryProperty.update_timestamp,
+                    "status": SoftStoryProperty.status,
+                },
+                where=not_retrofitted,
+                max_decimal_digits=settings.geojson_max_decimal_digits,
+            )
+            if geojson is None:
+                logger.warning("No soft story properties found in database")
+                raise HTTPException(status_code=404, detail="No soft stories found")
+            return geojson
+
+        soft_stories = (
+            await db.scalars(select(SoftStoryProperty).where(not_retrofitted))
+        ).all()
+
+        # If no soft story properties are found, raise a 404 error
+        if not soft_stories:
+            logger.warning("No soft story properties found in database")
+            raise HTTPException(status_code=404, detail="No soft stories found")
+
+        features = [
+            SoftStoryFeature.from_sqlalchemy_model(story) for story in soft_stories
+        ]
+        logger.info("Successfully retrieved %d soft story properties", len(features))
+        return SoftStoryFeatureCollection(type="FeatureCollection", features=features)
+
+    return await collection_cache.get_response(
+        request, db, "soft_stories", SoftStoryProperty, build_collection
+    )
 
 
 @router.get("/is-soft-story", response_model=IsSoftStoryPropertyView)
-def is_soft_story(
+async def is_soft_story(
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     ping: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Checks if a point is a soft story property and returns its last update time
@@ -85,7 +132,7 @@ def is_soft_story(
         lon (float): Longitude of the point
         lat (float): Latitude of the point
         ping (bool): Optional ping parameter, used to reduce cold starts
-        db (Session): The database session dependency
+        db (AsyncSession): The database session dependency
 
     Returns:
         IsSoftStoryPropertyView containing:
@@ -95,7 +142,7 @@ def is_soft_story(
         If `ping=true` is passed, skips DB call and returns a dummy IsSoftStoryPropertyView(exists=False, last_updated=None) instance
     """
     if ping:
-        logger.info(f"Pinging the is-soft-story endpoint")
+        logger.info("Pinging the is-soft-story endpoint")
         return IsSoftStoryPropertyView(exists=False, last_updated=None)  # skip DB call
 
     if lon is None or lat is None:
@@ -105,38 +152,52 @@ def is_soft_story(
             detail="Both 'lon' and 'lat' must be provided unless ping=true",
         )
 
-    logger.info(f"Checking soft story status for coordinates: lon={lon}, lat={lat}")
+    logger.info("Checking soft story status for coordinates: lon=%s, lat=%s", lon, lat)
 
-    try:
+    async def find_property() -> IsSoftStoryPropertyView:
         exists = None
         last_updated = None
         point = from_shape(Point(lon, lat), srid=4326)
         property = (
-            db.query(SoftStoryProperty)
-            .filter(geo_func.ST_DWithin(SoftStoryProperty.point, point, 0.000001))
-            .first()
-        )
+            await db.scalars(
+                select(SoftStoryProperty)
+                .where(geo_func.ST_DWithin(SoftStoryProperty.point, point, 0.000001))
+                .limit(1)
+            )
+        ).first()
 
         if property:
             last_updated = property.update_timestamp
-            status_lower = property.status.lower()
-            if status_lower == STATUS_WORK_COMPLETE_LOWERCASE:
-                exists = False
-            elif status_lower == STATUS_NON_COMPLIANT:
-                exists = True
+            exists = soft_story_exists(property.status)
+        return IsSoftStoryPropertyView(exists=exists, last_updated=last_updated)
+
+    try:
+        view = await point_cache.get_or_compute(
+            db,
+            "soft_story",
+            lon,
+            lat,
+            [SoftStoryProperty],
+            IsSoftStoryPropertyView,
+            find_property,
+        )
 
         logger.info(
-            f"Soft story check result for coordinates: lon={lon}, lat={lat} - "
-            f"exists: {exists}, "
-            f"last_updated: {last_updated}"
+            "Soft story check result for coordinates: lon=%s, lat=%s - "
+            "exists: %s, last_updated: %s",
+            lon,
+            lat,
+            view.exists,
+            view.last_updated,
         )
 
-        return IsSoftStoryPropertyView(exists=exists, last_updated=last_updated)
+        return view
 
     except Exception:
-        logger.error(
-            f"Error checking soft story status for coordinates: lon={lon}, lat={lat}",
-            exc_info=True,
+        logger.exception(
+            "Error checking soft story status for coordinates: lon=%s, lat=%s",
+            lon,
+            lat,
         )
         raise HTTPException(
             status_code=500,
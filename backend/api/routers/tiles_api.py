@@ -0,0 +1,84 @@
+"""Router to serve the hazard layers as Mapbox vector tiles"""
+
+from fastapi import Depends, HTTPException, APIRouter, Request
+from ..tags import Tags
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.session import get_async_db
+from backend.api.config import settings
+from backend.api.cache import TileCache
+from backend.api.vector_tiles import TILE_LAYERS, is_valid_tile, tile_query
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/tiles",
+    tags=[Tags.TILES],
+)
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+tile_cache = TileCache(
+    max_entries=settings.tile_cache_max_entries,
+    refresh_seconds=settings.tile_cache_refresh_seconds,
+)
+
+
+@router.get("/{layer}/{z}/{x}/{y}.mvt")
+async def get_tile(
+    request: Request,
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Retrieve a Mapbox vector tile of a hazard layer.
+
+    Tiles are cached until the layer's table changes and are served
+    with ETag and Last-Modified headers. A tile without features has
+    an empty body.
+
+    Args:
+        request (Request): The incoming request.
+        layer (str): One of tsunami, liquefaction, landslide or soft-story.
+        z (int): Zoom level of the tile.
+        x (int): Column of the tile.
+        y (int): Row of the tile.
+        db (AsyncSession): The database session dependency.
+
+    Returns:
+        Response: The encoded tile.
+
+    Raises:
+        HTTPException: If the layer is unknown (404 error) or the tile
+            coordinates are out of range (400 error).
+    """
+    tile_layer = TILE_LAYERS.get(layer)
+    if tile_layer is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tile layer: {layer}")
+
+    if not is_valid_tile(z, x, y):
+        logger.warning("Invalid tile coordinates: z=%s, x=%s, y=%s", z, x, y)
+        raise HTTPException(
+            status_code=400, detail=f"Invalid tile coordinates: {z}/{x}/{y}"
+        )
+
+    async def build_tile() -> bytes:
+        tile = (await db.execute(tile_query(layer, tile_layer, z, x, y))).scalar()
+        logger.info(
+            "Built %s tile %s/%s/%s (%d bytes)", layer, z, x, y, len(tile or b"")
+        )
+        return bytes(tile or b"")
+
+    return await tile_cache.get_response(
+        request,
+        db,
+        layer,
+        (z, x, y),
+        tile_layer.table,
+        build_tile,
+        where=tile_layer.where,
+        media_type=MVT_MEDIA_TYPE,
+    )
@@ -1,10 +1,15 @@
 """Router to get tsunami risk"""
 
-from fastapi import Depends, HTTPException, APIRouter, Query
+from fastapi import Depends, HTTPException, APIRouter, Query, Request
 from typing import Optional
 from ..tags import Tags
-from sqlalchemy.orm import Session
-from backend.database.session import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.session import get_async_db
+from backend.api.config import settings
+from backend.api.spatial_index import tsunami_zone_index
+from backend.api.cache import collection_cache, point_cache
+from backend.api.geojson_sql import fetch_feature_collection
 from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
 from backend.api.schemas.tsunami_schemas import (
@@ -15,9 +20,6 @@ from backend.api.schemas.tsunami_schemas import (
 from backend.api.models.tsunami import TsunamiZone
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -27,12 +29,16 @@ router = APIRouter(
 
 
 @router.get("", response_model=TsunamiFeatureCollection)
-def get_tsunami_zones(db: Session = Depends(get_db)):
+async def get_tsunami_zones(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Retrieve all tsunami hazard zones from the database.
 
+    The serialized collection is cached until the table changes and is
+    served with ETag and Last-Modified headers.
+
     Args:
-        db (Session): The database session dependency.
+        request (Request): The incoming request.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         SoftStoryFeatureCollection: A collection of all tsunami zones as GeoJSON Features.
@@ -40,19 +46,42 @@ def get_tsunami_zones(db: Session = Depends(get_db)):
     Raises:
         HTTPException: If no zones are found (404 error).
     """
-    tsunami_zones = db.query(TsunamiZone).all()
-    if not tsunami_zones:
-        raise HTTPException(status_code=404, detail="No tsunami zones found")
-    features = [TsunamiFeature.from_sqlalchemy_model(zone) for zone in tsunami_zones]
-    return TsunamiFeatureCollection(type="FeatureCollection", features=features)
+
+    async def build_collection():
+        if settings.postgis_geojson:
+            geojson = await fetch_feature_collection(
+                db,
+                TsunamiZone.geometry,
+                {
+                    "identifier": TsunamiZone.identifier,
+                    "evacuate": TsunamiZone.evacuate,
+                    "update_timestamp": TsunamiZone.update_timestamp,
+                },
+                max_decimal_digits=settings.geojson_max_decimal_digits,
+            )
+            if geojson is None:
+                raise HTTPException(status_code=404, detail="No tsunami zones found")
+            return geojson
+
+        tsunami_zones = (await db.scalars(select(TsunamiZone))).all()
+        if not tsunami_zones:
+            raise HTTPException(status_code=404, detail="No tsunami zones found")
+        features = [
+            TsunamiFeature.from_sqlalchemy_model(zone) for zone in tsunami_zones
+        ]
+        return TsunamiFeatureCollection(type="FeatureCollection", features=features)
+
+    return await collection_cache.get_response(
+        request, db, "tsunami_zones", TsunamiZone, build_collection
+    )
 
 
 @router.get("/is-in-tsunami-zone", response_model=IsInTsunamiZoneView)
-def is_in_tsunami_zone(
+async def is_in_tsunami_zone(
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     ping: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Check if a point is in a tsunami zone.
@@ -61,7 +90,7 @@ def is_in_tsunami_zone(
         lon (float): Longitude of the point.
         lat (float): Latitude of the point.
         ping (bool): Optional ping parameter, used to reduce cold starts.
-        db (Session): The database session dependency.
+        db (AsyncSession): The database session dependency.
 
     Returns:
         IsInTsunamiZoneView containing:
@@ -71,7 +100,7 @@ def is_in_tsunami_zone(
         If `ping=true` is passed, skips DB call and returns a dummy IsInTsunamiZoneView(exists=False, last_updated=None) instance.
     """
     if ping:
-        logger.info(f"Pinging the is-in-tsunami-zone endpoint")
+        logger.info("Pinging the is-in-tsunami-zone endpoint")
         return IsInTsunamiZoneView(exists=False, last_updated=None)  # skip DB call
 
     if lon is None or lat is None:
@@ -81,31 +110,46 @@ def is_in_tsunami_zone(
             detail="Both 'lon' and 'lat' must be provided unless ping=true",
         )
 
-    logger.info(f"Checking tsunami zone for coordinates: lon={lon}, lat={lat}")
+    logger.info("Checking tsunami zone for coordinates: lon=%s, lat=%s", lon, lat)
+
+    async def find_zone() -> IsInTsunamiZoneView:
+        if settings.in_memory_spatial_index:
+            zone = await tsunami_zone_index.find(db, lon, lat)
+        else:
+            point = from_shape(Point(lon, lat), srid=4326)
+            zone = (
+                await db.scalars(
+                    select(TsunamiZone)
+                    .where(TsunamiZone.geometry.ST_Intersects(point))
+                    .limit(1)
+                )
+            ).first()
+        return IsInTsunamiZoneView(
+            exists=zone is not None,
+            last_updated=zone.update_timestamp if zone else None,
+        )
 
     try:
-        point = from_shape(Point(lon, lat), srid=4326)
-        zone = (
-            db.query(TsunamiZone)
-            .filter(TsunamiZone.geometry.ST_Intersects(point))
-            .first()
+        view = await point_cache.get_or_compute(
+            db, "tsunami", lon, lat, [TsunamiZone], IsInTsunamiZoneView, find_zone
         )
 
-        exists = zone is not None
-        last_updated = zone.update_timestamp if zone else None
-
         logger.info(
-            f"Tsunami zone check result for coordinates: lon={lon}, lat={lat} - "
-            f"exists: {exists}, "
-            f"last_updated: {last_updated}"
+            "Tsunami zone check result for coordinates: lon=%s, lat=%s - "
+            "exists: %s, last_updated: %s",
+            lon,
+            lat,
+            view.exists,
+            view.last_updated,
         )
 
-        return IsInTsunamiZoneView(exists=exists, last_updated=last_updated)
+        return view
 
     except Exception:
-        logger.error(
-            f"Error checking tsunami zone status for coordinates: lon={lon}, lat={lat}",
-            exc_info=True,
+        logger.exception(
+            "Error checking tsunami zone status for coordinates: lon=%s, lat=%s",
+            lon,
+            lat,
         )
         raise HTTPException(
             status_code=500,
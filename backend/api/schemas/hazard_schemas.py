@@ -0,0 +1,81 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List
+from backend.api.schemas.soft_story_schemas import IsSoftStoryPropertyView
+from backend.api.schemas.tsunami_schemas import IsInTsunamiZoneView
+from backend.api.schemas.liquefaction_schemas import InLiquefactionZoneView
+from backend.api.schemas.landslide_schemas import IsInLandslideZoneView
+
+
+class HazardsAtPointView(BaseModel):
+    """
+    Pydantic View model for the combined hazard check endpoint.
+
+    Each attribute has the same shape as the response of the matching
+    single-hazard endpoint, so clients can switch between them freely.
+
+    Attributes:
+        soft_story (IsSoftStoryPropertyView): Soft story status of the point
+        tsunami (IsInTsunamiZoneView): Tsunami zone status of the point
+        liquefaction (InLiquefactionZoneView): Liquefaction zone status of the point
+        landslide (IsInLandslideZoneView): Landslide zone status of the point
+    """
+
+    soft_story: IsSoftStoryPropertyView
+    tsunami: IsInTsunamiZoneView
+    liquefaction: InLiquefactionZoneView
+    landslide: IsInLandslideZoneView
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Largest number of points accepted by the batch endpoint
+MAX_BATCH_POINTS = 10000
+
+
+class Coordinates(BaseModel):
+    """
+    Pydantic model for a point given as longitude and latitude.
+
+    Attributes:
+        lon (float): Longitude of the point
+        lat (float): Latitude of the point
+    """
+
+    lon: float = Field(ge=-180, le=180)
+    lat: float = Field(ge=-90, le=90)
+
+
+class HazardsBatchRequest(BaseModel):
+    """
+    Pydantic request model for the batch hazard check endpoint.
+
+    Attributes:
+        points (List[Coordinates]): Points to check, at most MAX_BATCH_POINTS
+    """
+
+    points: List[Coordinates] = Field(min_length=1, max_length=MAX_BATCH_POINTS)
+
+
+class HazardsAtPointResult(HazardsAtPointView):
+    """
+    Pydantic View model for the hazards of one point of a batch.
+
+    Attributes:
+        lon (float): Longitude of the point
+        lat (float): Latitude of the point
+    """
+
+    lon: float
+    lat: float
+
+
+class HazardsBatchView(BaseModel):
+    """
+    Pydantic View model for the batch hazard check endpoint.
+
+    Attributes:
+        results (List[HazardsAtPointResult]): Hazards of each point, in
+            the order of the request
+    """
+
+    results: List[HazardsAtPointResult]
@@ -2,7 +2,7 @@ from pydantic import BaseModel, ConfigDict, Field
 from backend.api.models.landslide_zones import LandslideZone
 from geojson_pydantic import Feature, FeatureCollection, MultiPolygon
 from geoalchemy2.shape import to_shape
-from typing import List
+from typing import List, Optional
 import json
 from datetime import datetime
 
@@ -70,3 +70,20 @@ class LandslideFeatureCollection(FeatureCollection):
 
     type: str = Field(default="FeatureCollection")  # type: ignore
     features: List[LandslideFeature]
+
+
+class IsInLandslideZoneView(BaseModel):
+    """
+    Pydantic View model for landslide zone checks.
+
+    Attributes:
+        exists (bool): Whether the point is in a hazardous landslide zone
+        last_updated (Optional[datetime]): Timestamp of last update if exists
+        gridcode (Optional[int]): Hazard level of the zone if exists
+    """
+
+    exists: bool
+    last_updated: Optional[datetime] = None
+    gridcode: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,152 @@
+"""
+In-memory spatial indexes answering point-in-zone lookups without a
+round trip to the database for the spatial predicate
+"""
+
+import asyncio
+import time
+from typing import Any, Optional
+import numpy as np
+import shapely
+from shapely import STRtree
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.api.config import settings
+from backend.api.cache import table_version
+from backend.api.models.base import ModelType
+from backend.api.models.tsunami import TsunamiZone
+from backend.api.models.liquefaction_zones import LiquefactionZone
+from backend.api.models.landslide_zones import LandslideZone, HAZARDOUS_GRIDCODES
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ZoneIndex:
+    """
+    STRtree over the geometries of a zone table.
+
+    The geometries are loaded lazily on the first lookup and reloaded
+    when the table's version (max(update_timestamp) and row count)
+    changes. The version is checked at most once every
+    `refresh_seconds`, so most lookups never touch the database.
+
+    Args:
+        table: SQLAlchemy model with `geometry` and `update_timestamp` columns
+        columns: Extra columns returned with a matched zone
+        where: Optional filter restricting the indexed zones
+        order_by: Order of preference of the zones when several contain
+            a point, as in the ORDER BY of the database lookup
+        refresh_seconds: Minimum delay between two version checks
+    """
+
+    def __init__(
+        self,
+        table: type[ModelType],
+        columns: Optional[list] = None,
+        where: Optional[Any] = None,
+        order_by: Optional[list] = None,
+        refresh_seconds: Optional[int] = None,
+    ):
+        self.table = table
+        self.columns = [getattr(table, "update_timestamp"), *(columns or [])]
+        self.where = where
+        self.order_by = order_by or []
+        self.refresh_seconds = (
+            settings.spatial_index_refresh_seconds
+            if refresh_seconds is None
+            else refresh_seconds
+        )
+        self._lock = asyncio.Lock()
+        # (tree, prepared geometries, rows) swapped as a whole on rebuild
+        # so that concurrent lookups always see a consistent snapshot
+        self._snapshot: Optional[tuple[STRtree, np.ndarray, list]] = None
+        self._version: Optional[tuple] = None
+        self._checked_at = float("-inf")
+
+    async def _current_version(self, db: AsyncSession) -> tuple:
+        """Returns (max(update_timestamp), count) of the indexed zones"""
+        return await table_version(db, self.table, self.where)
+
+    async def _load_rows(self, db: AsyncSession) -> list:
+        """Returns (wkb, *columns) rows of the indexed zones, in order of preference"""
+        stmt = select(
+            func.ST_AsBinary(getattr(self.table, "geometry")).label("wkb"),
+            *self.columns,
+        )
+        if self.where is not None:
+            stmt = stmt.where(self.where)
+        if self.order_by:
+            stmt = stmt.order_by(*self.order_by)
+        return list((await db.execute(stmt)).all())
+
+    def _build(self, rows: list, version: tuple) -> None:
+        """Builds the STRtree and prepares the geometries of `rows`"""
+        geometries = shapely.from_wkb([bytes(row.wkb) for row in rows])
+        if len(geometries):
+            shapely.prepare(geometries)
+        self._snapshot = (STRtree(geometries), geometries, rows)
+        self._version = version
+        logger.info(
+            "Built spatial index for %s with %d zones", self.table.__name__, len(rows)
+        )
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        Rebuilds the index if it was never built or if the table
+        changed since it was built
+
+        Args:
+            db (AsyncSession): The database session
+            force (bool): Check the table version even if the last
+                check is more recent than `refresh_seconds`
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            if not force and now - self._checked_at < self.refresh_seconds:
+                return
+            version = await self._current_version(db)
+            if self._snapshot is None or version != self._version:
+                rows = await self._load_rows(db)
+                # Building the tree is CPU bound, keep it off the event loop
+                await asyncio.to_thread(self._build, rows, version)
+            self._checked_at = now
+
+    async def find(self, db: AsyncSession, lon: float, lat: float):
+        """
+        Returns a zone containing the point, or None
+
+        The returned row exposes `update_timestamp` and the extra
+        `columns` as attributes, like the ORM object the database path
+        returns.
+
+        Args:
+            db (AsyncSession): The database session, only used to refresh the index
+            lon (float): Longitude of the point
+            lat (float): Latitude of the point
+        """
+        await self.refresh(db)
+        if self._snapshot is None:
+            return None
+        tree, geometries, rows = self._snapshot
+        if not rows:
+            return None
+        point = shapely.points(lon, lat)
+        candidates = tree.query(point)
+        if not len(candidates):
+            return None
+        matches = candidates[shapely.intersects(geometries[candidates], point)]
+        # The rows are loaded in order of preference
+        return rows[int(matches.min())] if len(matches) else None
+
+
+tsunami_zone_index = ZoneIndex(TsunamiZone)
+liquefaction_zone_index = ZoneIndex(LiquefactionZone, columns=[LiquefactionZone.liq])
+landslide_zone_index = ZoneIndex(
+    LandslideZone,
+    columns=[LandslideZone.gridcode],
+    where=LandslideZone.gridcode.in_(HAZARDOUS_GRIDCODES),
+    order_by=[LandslideZone.gridcode.desc()],
+)
@@ -9,4 +9,6 @@ class Tags(Enum):
     POLYGONS = "polygons"
     LANDSLIDE = "landslide"
     LIQUEFACTION = "liquefaction"
+    HAZARDS = "hazards"
+    TILES = "tiles"
     SYSTEM = "system"
@@ -0,0 +1,312 @@
+import gzip
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from geojson_pydantic import FeatureCollection
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.api.cache import (
+    CollectionCache,
+    MemoryPointLookupStore,
+    PointLookupCache,
+    SQLitePointLookupStore,
+    TileCache,
+)
+from backend.api.models.liquefaction_zones import LiquefactionZone
+from backend.api.models.tsunami import TsunamiZone
+from backend.api.schemas.tsunami_schemas import IsInTsunamiZoneView
+
+UPDATED_AT = datetime(2024, 12, 16, 17, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def cache():
+    return CollectionCache()
+
+
+@pytest.fixture
+def build():
+    return AsyncMock(
+        return_value=FeatureCollection(type="FeatureCollection", features=[])
+    )
+
+
+@pytest.fixture
+def cache_client(cache, build):
+    app = FastAPI()
+
+    @app.get("/collection")
+    async def get_collection(request: Request):
+        return await cache.get_response(
+            request, MagicMock(), "test", TsunamiZone, build
+        )
+
+    return TestClient(app)
+
+
+def test_collection_is_built_once_per_version(cache_client, build):
+    with patch(
+        "backend.api.cache.table_version", return_value=(UPDATED_AT, 1)
+    ) as version:
+        first = cache_client.get("/collection")
+        second = cache_client.get("/collection")
+
+        assert first.status_code == second.status_code == 200
+        assert first.json() == {"type": "FeatureCollection", "features": []}
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.headers["last-modified"] == "Mon, 16 Dec 2024 17:10:00 GMT"
+        build.assert_called_once()
+
+        # A newer table version invalidates the entry
+        version.return_value = (datetime(2025, 1, 1, tzinfo=timezone.utc), 1)
+        cache_client.get("/collection")
+        assert build.call_count == 2
+
+
+def test_conditional_requests(cache_client):
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        etag = cache_client.get("/collection").headers["etag"]
+
+        response = cache_client.get("/collection", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+        response = cache_client.get("/collection", headers={"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+
+        response = cache_client.get(
+            "/collection",
+            headers={"If-Modified-Since": "Mon, 16 Dec 2024 17:10:00 GMT"},
+        )
+        assert response.status_code == 304
+
+        response = cache_client.get(
+            "/collection",
+            headers={"If-Modified-Since": "Sun, 15 Dec 2024 17:10:00 GMT"},
+        )
+        assert response.status_code == 200
+
+
+def test_gzip_encoding(cache_client):
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        identity = cache_client.get(
+            "/collection", headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in identity.headers
+
+        # Read the raw body to check what was sent over the wire
+        with cache_client.stream(
+            "GET", "/collection", headers={"Accept-Encoding": "gzip"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert gzip.decompress(raw) == identity.content
+
+
+def test_build_errors_are_not_cached(cache, cache_client, build):
+    build.side_effect = [ValueError("boom"), build.return_value]
+    with patch("backend.api.cache.table_version", return_value=(None, 0)):
+        with pytest.raises(ValueError):
+            cache_client.get("/collection")
+        assert cache_client.get("/collection").status_code == 200
+        assert build.call_count == 2
+
+
+def test_prebuilt_bytes_are_served_as_is(cache):
+    body = b'{"type":"FeatureCollection","features":[]}'
+    app = FastAPI()
+
+    @app.get("/collection")
+    async def get_collection(request: Request):
+        return await cache.get_response(
+            request, MagicMock(), "bytes", TsunamiZone, AsyncMock(return_value=body)
+        )
+
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 0)):
+        response = TestClient(app).get(
+            "/collection", headers={"Accept-Encoding": "identity"}
+        )
+
+    assert response.status_code == 200
+    assert response.content == body
+
+
+def _tile_client(cache, build):
+    app = FastAPI()
+
+    @app.get("/tiles/{z}/{x}/{y}")
+    async def get_tile(request: Request, z: int, x: int, y: int):
+        return await cache.get_response(
+            request, MagicMock(), "tsunami", (z, x, y), TsunamiZone, build
+        )
+
+    return TestClient(app)
+
+
+def test_tile_cache_evicts_least_recently_used():
+    build = AsyncMock(return_value=b"tile")
+    client = _tile_client(TileCache(max_entries=2, refresh_seconds=300), build)
+
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        client.get("/tiles/0/0/0")
+        client.get("/tiles/1/0/0")
+        client.get("/tiles/0/0/0")
+        assert build.call_count == 2
+
+        # Evicts 1/0/0, the least recently used tile
+        client.get("/tiles/1/1/0")
+        client.get("/tiles/0/0/0")
+        assert build.call_count == 3
+        client.get("/tiles/1/0/0")
+        assert build.call_count == 4
+
+
+def test_tile_cache_checks_layer_version_once_per_refresh():
+    build = AsyncMock(return_value=b"tile")
+    cache = TileCache(max_entries=16, refresh_seconds=300)
+    client = _tile_client(cache, build)
+
+    with patch(
+        "backend.api.cache.table_version", return_value=(UPDATED_AT, 1)
+    ) as version:
+        for x in range(4):
+            client.get(f"/tiles/2/{x}/0")
+        version.assert_called_once()
+
+        # Once the version is stale, a changed table invalidates the tiles
+        cache.refresh_seconds = 0
+        version.return_value = (datetime(2025, 1, 1, tzinfo=timezone.utc), 1)
+        client.get("/tiles/2/0/0")
+        assert build.call_count == 5
+
+
+def _point_cache(store=None, **kwargs) -> PointLookupCache:
+    options = {"precision": 1e-6, "ttl_seconds": 3600, "refresh_seconds": 300}
+    return PointLookupCache(
+        store or MemoryPointLookupStore(16), **{**options, **kwargs}
+    )
+
+
+def _lookup(exists: bool = True) -> AsyncMock:
+    return AsyncMock(
+        return_value=IsInTsunamiZoneView(exists=exists, last_updated=UPDATED_AT)
+    )
+
+
+async def _get(cache: PointLookupCache, compute, lon=-122.35, lat=37.83, tables=None):
+    return await cache.get_or_compute(
+        MagicMock(spec=AsyncSession),
+        "tsunami",
+        lon,
+        lat,
+        tables or [TsunamiZone],
+        IsInTsunamiZoneView,
+        compute,
+    )
+
+
+@pytest.mark.anyio
+async def test_point_cache_shares_results_within_precision():
+    cache = _point_cache()
+    compute = _lookup()
+
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        first = await _get(cache, compute, -122.3500001, 37.8300002)
+        second = await _get(cache, compute, -122.35000012, 37.83000018)
+        await _get(cache, compute, -122.351, 37.83)
+
+    assert first == second
+    assert second.last_updated == UPDATED_AT
+    assert compute.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_point_cache_is_invalidated_when_a_table_changes():
+    cache = _point_cache(refresh_seconds=0)
+    compute = _lookup()
+
+    with patch(
+        "backend.api.cache.table_version", return_value=(UPDATED_AT, 1)
+    ) as version:
+        await _get(cache, compute, tables=[TsunamiZone, LiquefactionZone])
+        await _get(cache, compute, tables=[TsunamiZone, LiquefactionZone])
+        assert compute.call_count == 1
+
+        version.side_effect = [(UPDATED_AT, 1), (datetime(2025, 1, 1), 1)]
+        await _get(cache, compute, tables=[TsunamiZone, LiquefactionZone])
+        assert compute.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_point_cache_results_expire():
+    cache = _point_cache(ttl_seconds=60)
+    compute = _lookup()
+
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        with patch("backend.api.cache.time.time", return_value=1000.0):
+            await _get(cache, compute)
+            await _get(cache, compute)
+        with patch("backend.api.cache.time.time", return_value=1061.0):
+            await _get(cache, compute)
+
+    assert compute.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_point_cache_errors_are_not_cached():
+    cache = _point_cache()
+    compute = AsyncMock(side_effect=RuntimeError("database is down"))
+
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        with pytest.raises(RuntimeError):
+            await _get(cache, compute)
+        compute.side_effect = None
+        compute.return_value = IsInTsunamiZoneView(exists=False, last_updated=None)
+        assert not (await _get(cache, compute)).exists
+
+
+@pytest.mark.anyio
+async def test_point_cache_disabled_always_computes():
+    cache = _point_cache(enabled=False)
+    compute = _lookup()
+
+    with patch("backend.api.cache.table_version") as version:
+        await _get(cache, compute)
+        await _get(cache, compute)
+
+    version.assert_not_called()
+    assert compute.call_count == 2
+
+
+def test_memory_point_store_evicts_least_recently_used():
+    store = MemoryPointLookupStore(max_entries=2)
+    store.set("a", "v", "{}", 0)
+    store.set("b", "v", "{}", 0)
+    store.get("a")
+    store.set("c", "v", "{}", 0)
+
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+
+@pytest.mark.anyio
+async def test_sqlite_point_store_is_shared_between_workers(tmp_path):
+    path = tmp_path / "point_cache.sqlite"
+    first_worker = _point_cache(SQLitePointLookupStore(path))
+    second_worker = _point_cache(SQLitePointLookupStore(path))
+    compute = _lookup()
+
+    with patch("backend.api.cache.table_version", return_value=(UPDATED_AT, 1)):
+        await _get(first_worker, compute)
+        result = await _get(second_worker, compute)
+
+    assert result.exists
+    assert compute.call_count == 1
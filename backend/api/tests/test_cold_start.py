@@ -0,0 +1,76 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.api.lazy_routers import include_routers
+
+REPO_DIR = Path(__file__).parents[3]
+
+# Cumulative import time of api.index allowed in the startup-optimized
+# mode, overridable for slower machines
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("API_IMPORT_TIME_BUDGET_SECONDS", "1.5"))
+
+# Modules only needed once a router serves a request
+DEFERRED_MODULES = [
+    "sqlalchemy",
+    "geoalchemy2",
+    "shapely",
+    "sentry_sdk",
+    "backend.database.session",
+]
+
+
+def import_app(code: str = "") -> subprocess.CompletedProcess:
+    """Imports api.index in a fresh interpreter in the startup-optimized mode"""
+    env = {**os.environ, "LAZY_ROUTERS": "true", "SENTRY_DSN": ""}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import api.index\n{code}"],
+        cwd=REPO_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    result = import_app(
+        f"import sys\nprint([m for m in {DEFERRED_MODULES!r} if m in sys.modules])"
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_import_time_budget():
+    timings = []
+    for _ in range(3):
+        importtime = import_app().stderr
+        match = re.search(r"\|\s*(\d+) \| api\.index$", importtime, re.MULTILINE)
+        timings.append(int(match[1]) / 1e6)
+
+    assert min(timings) <= IMPORT_TIME_BUDGET_SECONDS, (
+        f"Importing api.index took {min(timings):.2f}s, over the budget of "
+        f"{IMPORT_TIME_BUDGET_SECONDS}s; see python -X importtime"
+    )
+
+
+def test_lazy_router_is_included_on_first_request():
+    app = FastAPI()
+    include_routers(app, {"/api/health": "backend.api.routers.health_api"}, lazy=True)
+    client = TestClient(app)
+    assert not any(route.path == "/api/health" for route in app.routes)
+
+    assert client.get("/api/health").json() == {"status": "healthy"}
+    assert client.get("/api/unknown").status_code == 404
+
+
+def test_openapi_includes_lazy_routers():
+    app = FastAPI()
+    include_routers(app, {"/api/health": "backend.api.routers.health_api"}, lazy=True)
+
+    paths = TestClient(app).get("/openapi.json").json()["paths"]
+
+    assert "/api/health" in paths
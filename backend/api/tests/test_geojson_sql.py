@@ -0,0 +1,58 @@
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from sqlalchemy.dialects import postgresql
+from backend.api.geojson_sql import feature_collection_query, fetch_feature_collection
+from backend.api.models.tsunami import TsunamiZone
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def compile_query(stmt) -> str:
+    return str(
+        stmt.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def test_feature_collection_query_aggregates_in_postgis():
+    sql = compile_query(
+        feature_collection_query(
+            TsunamiZone.geometry,
+            {"identifier": TsunamiZone.identifier},
+            where=TsunamiZone.evacuate == "Y",
+            max_decimal_digits=6,
+        )
+    )
+
+    assert "ST_AsGeoJSON(tsunami_zones.geometry, 6)" in sql
+    assert "json_agg(" in sql
+    assert "'identifier', tsunami_zones.identifier" in sql
+    assert "'[]'::json" in sql
+    assert "WHERE tsunami_zones.evacuate = 'Y'" in sql
+
+
+@pytest.mark.anyio
+async def test_fetch_feature_collection_returns_none_without_features():
+    db = AsyncMock()
+    db.execute.return_value = MagicMock()
+    db.execute.return_value.one.return_value = MagicMock(
+        geojson='{"type" : "FeatureCollection", "features" : []}', count=0
+    )
+
+    assert await fetch_feature_collection(db, TsunamiZone.geometry, {}) is None
+
+
+@pytest.mark.anyio
+async def test_fetch_feature_collection_encodes_geojson():
+    geojson = '{"type" : "FeatureCollection", "features" : [{"type" : "Feature"}]}'
+    db = AsyncMock()
+    db.execute.return_value = MagicMock()
+    db.execute.return_value.one.return_value = MagicMock(geojson=geojson, count=1)
+
+    assert (
+        await fetch_feature_collection(db, TsunamiZone.geometry, {}) == geojson.encode()
+    )
@@ -0,0 +1,136 @@
+from backend.api.tests.test_session_config import test_engine, test_session, client
+from backend.api.schemas.hazard_schemas import MAX_BATCH_POINTS
+import json
+import logging
+from unittest.mock import AsyncMock
+import pytest
+from backend.api.routers.hazards_api import _stream_hazards_batch
+from backend.api.schemas.hazard_schemas import Coordinates
+
+
+def test_hazards_at_point(client, caplog):
+    """Test combined hazard check with logging verification"""
+    caplog.set_level(logging.INFO)
+
+    # Test point on a non-compliant soft story inside the tsunami zone
+    lon, lat = [-122.41211, 37.80541]
+    response = client.get(f"api/hazards/at-point?lon={lon}&lat={lat}")
+
+    assert response.status_code == 200
+    json = response.json()
+    assert json["soft_story"]["exists"]
+    assert json["soft_story"]["last_updated"] is not None
+    assert json["tsunami"]["exists"]
+    assert json["tsunami"]["last_updated"] is not None
+    assert f"Checking all hazards for coordinates: lon={lon}, lat={lat}" in caplog.text
+    assert "Hazard check result" in caplog.text
+
+
+def test_hazards_at_point_landslide(client):
+    """Test that only hazardous landslide zones are reported"""
+    lon, lat = [-122.45, 37.75]
+    response = client.get(f"api/hazards/at-point?lon={lon}&lat={lat}")
+
+    assert response.status_code == 200
+    json = response.json()
+    assert json["landslide"]["exists"]
+    assert json["landslide"]["gridcode"] == 10
+    assert json["landslide"]["last_updated"] is not None
+
+
+def test_hazards_at_point_outside_all_zones(client):
+    wrong_lon, wrong_lat = [0.0, 0.0]
+    response = client.get(f"api/hazards/at-point?lon={wrong_lon}&lat={wrong_lat}")
+
+    assert response.status_code == 200
+    json = response.json()
+    assert json["soft_story"]["exists"] is None
+    assert not json["tsunami"]["exists"]
+    assert not json["liquefaction"]["exists"]
+    assert json["liquefaction"]["liq"] is None
+    assert not json["landslide"]["exists"]
+
+
+def test_hazards_at_point_ping(client, caplog):
+    response = client.get(f"api/hazards/at-point?ping=true")
+    response_dict = response.json()
+    assert response.status_code == 200
+    assert response_dict["tsunami"]["exists"] is False
+    assert response_dict["liquefaction"]["exists"] is False
+    assert response_dict["landslide"]["exists"] is False
+    assert "Pinging the hazards at-point endpoint" in caplog.text
+
+
+def test_hazards_at_point_missing_params(client, caplog):
+    caplog.set_level(logging.WARN)
+    response = client.get("api/hazards/at-point", params={"lon": -122.424968})
+    assert response.status_code == 400
+    assert "Missing coordinates in non-ping request" in caplog.text
+
+    response = client.get("api/hazards/at-point")
+    assert response.status_code == 400
+
+
+def test_hazards_batch(client):
+    points = [
+        {"lon": -122.41211, "lat": 37.80541},
+        {"lon": 0.0, "lat": 0.0},
+        {"lon": -122.45, "lat": 37.75},
+    ]
+    response = client.post("api/hazards/batch", json={"points": points})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert [(r["lon"], r["lat"]) for r in results] == [
+        (p["lon"], p["lat"]) for p in points
+    ]
+    assert results[0]["soft_story"]["exists"]
+    assert results[0]["tsunami"]["exists"]
+    assert not results[1]["tsunami"]["exists"]
+    assert results[1]["soft_story"]["exists"] is None
+    assert results[2]["landslide"]["gridcode"] == 10
+
+
+def test_hazards_batch_stream(client):
+    points = [{"lon": -122.41211, "lat": 37.80541}, {"lon": 0.0, "lat": 0.0}]
+    response = client.post("api/hazards/batch?stream=true", json={"points": points})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 2
+    assert lines[0]["tsunami"]["exists"]
+    assert not lines[1]["tsunami"]["exists"]
+
+
+def test_hazards_batch_invalid_request(client):
+    response = client.post("api/hazards/batch", json={"points": []})
+    assert response.status_code == 422
+
+    points = [{"lon": 0.0, "lat": 0.0}] * (MAX_BATCH_POINTS + 1)
+    response = client.post("api/hazards/batch", json={"points": points})
+    assert response.status_code == 422
+
+    response = client.post("api/hazards/batch", json={"points": [{"lon": 200.0}]})
+    assert response.status_code == 422
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_hazards_batch_stream_reports_errors(caplog):
+    db = AsyncMock()
+    db.execute.side_effect = RuntimeError("connection lost")
+
+    lines = [
+        json.loads(line)
+        async for line in _stream_hazards_batch(db, [Coordinates(lon=0.0, lat=0.0)])
+    ]
+
+    assert list(lines[-1]) == ["error"]
+    assert "Error streaming hazards" in caplog.text
+    db.close.assert_awaited_once()
@@ -0,0 +1,99 @@
+import json
+import logging
+import queue
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.api.logging_config import (
+    JsonFormatter,
+    RequestContextQueueHandler,
+    RequestLoggingMiddleware,
+    SampleRates,
+)
+
+logger = logging.getLogger("test_logging_config")
+
+
+@pytest.fixture
+def records():
+    """Records enqueued by the loggers of the test"""
+    log_queue = queue.SimpleQueue()
+    handler = RequestContextQueueHandler(log_queue)
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    queued = []
+
+    def drain():
+        while not log_queue.empty():
+            queued.append(log_queue.get())
+        return queued
+
+    yield drain
+    logger.removeHandler(handler)
+
+
+def create_app(sample_rates=None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(RequestLoggingMiddleware, sample_rates=sample_rates)
+
+    @app.get("/api/points")
+    async def get_point():
+        logger.info("Looking up %s", "a point")
+        logger.warning("Slow lookup")
+        return {}
+
+    return app
+
+
+def test_records_carry_the_request_id(records):
+    client = TestClient(create_app())
+
+    response = client.get("/api/points", headers={"X-Request-ID": "abc123"})
+
+    assert response.headers["x-request-id"] == "abc123"
+    assert [record.request_id for record in records()] == ["abc123", "abc123"]
+
+
+def test_request_id_is_generated_when_missing(records):
+    response = TestClient(create_app()).get("/api/points")
+
+    assert len(response.headers["x-request-id"]) == 32
+    assert records()[0].request_id == response.headers["x-request-id"]
+
+
+def test_unsampled_requests_keep_warnings_only(records):
+    client = TestClient(create_app({"/api/points": 0.0}))
+
+    client.get("/api/points")
+
+    assert [record.getMessage() for record in records()] == ["Slow lookup"]
+
+
+def test_messages_are_formatted_by_the_listener(records):
+    logger.info("Looking up %s", "a point")
+
+    record = records()[0]
+    assert record.msg == "Looking up %s"
+    assert record.args == ("a point",)
+
+
+def test_json_formatter_writes_one_object_per_record():
+    record = logging.LogRecord(
+        "api", logging.ERROR, __file__, 1, "Failed %s", ("lookup",), None
+    )
+    record.request_id = "abc123"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Failed lookup"
+    assert entry["level"] == "ERROR"
+    assert entry["request_id"] == "abc123"
+
+
+def test_longest_prefix_sample_rate_wins():
+    rates = SampleRates({"/api": 0.5, "/api/hazards": 0.1})
+
+    assert rates.rate("/api/hazards/at-point") == 0.1
+    assert rates.rate("/api/tiles/tsunami/1/2/3.mvt") == 0.5
+    assert rates.rate("/api-docs") == 1.0
+    assert rates.rate("/docs") == 1.0
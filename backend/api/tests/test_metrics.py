@@ -0,0 +1,139 @@
+import re
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from backend.api.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    instrument_engine,
+    record_cache_lookup,
+    registry,
+    time_serialization,
+)
+from backend.api.routers.metrics_api import render_pool_metrics
+from backend.api.routers.metrics_api import router as metrics_router
+from backend.database.pool_metrics import MeteredQueuePool
+
+# One connection, so that the requests see the table of the test module
+engine = create_engine(
+    "sqlite://",
+    poolclass=StaticPool,
+    connect_args={"check_same_thread": False},
+)
+instrument_engine(engine)
+with engine.begin() as connection:
+    connection.execute(text("CREATE TABLE items (id INTEGER, hits INTEGER)"))
+    connection.execute(text("INSERT INTO items VALUES (1, 0), (2, 0), (3, 0)"))
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(metrics_router)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        # SQLite only counts the rows of updates, PostgreSQL also selects
+        with engine.begin() as connection:
+            rows = connection.execute(text("UPDATE items SET hits = hits + 1"))
+        with time_serialization():
+            body = {"id": item_id, "rows": rows.rowcount}
+        return body
+
+    return app
+
+
+def sample(metrics: str, name: str, labels: str) -> float:
+    match = re.search(rf"^{re.escape(name + labels)} (\S+)$", metrics, re.MULTILINE)
+    return float(match[1]) if match else 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    assert list(histogram.samples("latency", 'route="/"')) == [
+        'latency_bucket{route="/",le="0.1"} 1',
+        'latency_bucket{route="/",le="1.0"} 2',
+        'latency_bucket{route="/",le="+Inf"} 3',
+        'latency_sum{route="/"} 5.55',
+        'latency_count{route="/"} 3',
+    ]
+
+
+def test_requests_are_recorded_by_route_template():
+    registry.clear()
+    client = TestClient(create_app())
+
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/unknown/path")
+    metrics = client.get("/api/metrics").text
+
+    route = '{route="/items/{item_id}"}'
+    assert (
+        sample(
+            metrics,
+            "http_request_duration_seconds_count",
+            '{method="GET",route="/items/{item_id}",status="200"}',
+        )
+        == 2
+    )
+    assert sample(metrics, "http_request_db_rows_sum", route) == 6
+    assert sample(metrics, "http_request_db_seconds_count", route) == 2
+    assert sample(metrics, "http_request_serialization_seconds_count", route) == 2
+    assert sample(metrics, "http_response_size_bytes_sum", route) == 2 * len(
+        '{"id":1,"rows":3}'
+    )
+    assert (
+        sample(
+            metrics,
+            "http_request_duration_seconds_count",
+            '{method="GET",route="unmatched",status="404"}',
+        )
+        == 1
+    )
+
+
+def test_queries_outside_requests_are_not_recorded():
+    registry.clear()
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert "http_request_db_seconds_count" not in registry.render()
+
+
+def test_cache_lookups_are_counted():
+    registry.clear()
+
+    record_cache_lookup("tile", True)
+    record_cache_lookup("tile", True)
+    record_cache_lookup("tile", False)
+
+    metrics = registry.render()
+    assert sample(metrics, "cache_requests_total", '{cache="tile",result="hit"}') == 2
+    assert sample(metrics, "cache_requests_total", '{cache="tile",result="miss"}') == 1
+
+
+def test_metrics_endpoint_uses_prometheus_content_type():
+    response = TestClient(create_app()).get("/api/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+
+
+def test_pool_metrics_render_counters_and_gauges():
+    pool_engine = create_engine(
+        "sqlite://", poolclass=MeteredQueuePool, pool_logging_name="test_render"
+    )
+    with pool_engine.connect():
+        pass
+
+    metrics = render_pool_metrics()
+    assert "# TYPE db_pool_checkouts counter" in metrics
+    assert sample(metrics, "db_pool_checkouts_total", '{pool="test_render"}') == 1
+    assert "# TYPE db_pool_checked_out gauge" in metrics
+    assert sample(metrics, "db_pool_checked_out", '{pool="test_render"}') == 0
@@ -1,10 +1,12 @@
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from backend.api.config import settings
 from fastapi.testclient import TestClient
 from api.index import app
-from backend.database.session import get_db
+from backend.database.session import get_async_db, get_db, to_async_url
 
 
 # Set up a test database engine
@@ -35,7 +37,19 @@ def client(test_session):
         finally:
             test_session.close()
 
+    # The API routers use async sessions. NullPool avoids reusing asyncpg
+    # connections across the event loops the test client runs requests in
+    async_engine = create_async_engine(
+        to_async_url(settings.database_url_sqlalchemy_test), poolclass=NullPool
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db  # Override dependency
+    app.dependency_overrides[get_async_db] = override_get_async_db
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()  # Clear overrides after tests
@@ -0,0 +1,104 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+from backend.api.models.liquefaction_zones import LiquefactionZone
+from backend.api.spatial_index import ZoneIndex, landslide_zone_index
+
+ZoneRow = namedtuple("ZoneRow", ["wkb", "update_timestamp", "liq"])
+
+UPDATED_AT = datetime(2024, 12, 19, 20, 20, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def _zone_row(bounds, liq):
+    multipolygon = MultiPolygon([Polygon.from_bounds(*bounds)])
+    return ZoneRow(shapely.to_wkb(multipolygon), UPDATED_AT, liq)
+
+
+def _index(rows, version, refresh_seconds=300):
+    index = ZoneIndex(
+        LiquefactionZone,
+        columns=[LiquefactionZone.liq],
+        refresh_seconds=refresh_seconds,
+    )
+    load_rows = patch.object(index, "_load_rows", side_effect=rows)
+    current_version = patch.object(index, "_current_version", side_effect=version)
+    return index, load_rows, current_version
+
+
+@pytest.mark.anyio
+async def test_find_returns_matching_zone():
+    rows = [
+        _zone_row((-122.5, 37.7, -122.4, 37.8), "H"),
+        _zone_row((-122.4, 37.7, -122.3, 37.8), "VH"),
+    ]
+    index, load_rows, current_version = _index([rows], [(UPDATED_AT, 2)])
+
+    with load_rows as mock_load, current_version:
+        zone = await index.find(MagicMock(), -122.35, 37.75)
+        assert zone.liq == "VH"
+        assert zone.update_timestamp == UPDATED_AT
+
+        assert (await index.find(MagicMock(), -122.45, 37.75)).liq == "H"
+        assert await index.find(MagicMock(), 0.0, 0.0) is None
+
+        # The index is built once and reused within refresh_seconds
+        mock_load.assert_called_once()
+
+
+@pytest.mark.anyio
+async def test_find_with_empty_table():
+    index, load_rows, current_version = _index([[]], [(None, 0)])
+
+    with load_rows, current_version:
+        assert await index.find(MagicMock(), -122.35, 37.75) is None
+
+
+@pytest.mark.anyio
+async def test_index_rebuilds_when_table_changes():
+    old_rows = [_zone_row((-122.5, 37.7, -122.4, 37.8), "H")]
+    new_rows = [_zone_row((-122.5, 37.7, -122.4, 37.8), "VH")]
+    newer = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    index, load_rows, current_version = _index(
+        [old_rows, new_rows],
+        [(UPDATED_AT, 1), (UPDATED_AT, 1), (newer, 1)],
+        refresh_seconds=0,
+    )
+
+    with load_rows as mock_load, current_version:
+        assert (await index.find(MagicMock(), -122.45, 37.75)).liq == "H"
+        # Same version, the index is kept
+        assert (await index.find(MagicMock(), -122.45, 37.75)).liq == "H"
+        assert mock_load.call_count == 1
+        # New version, the index is rebuilt
+        assert (await index.find(MagicMock(), -122.45, 37.75)).liq == "VH"
+        assert mock_load.call_count == 2
+
+
+@pytest.mark.anyio
+async def test_find_prefers_first_loaded_zone():
+    rows = [
+        _zone_row((-122.5, 37.7, -122.3, 37.8), "VH"),
+        _zone_row((-122.4, 37.7, -122.3, 37.8), "H"),
+    ]
+    index, load_rows, current_version = _index([rows], [(UPDATED_AT, 2)])
+
+    with load_rows, current_version:
+        assert (await index.find(MagicMock(), -122.35, 37.75)).liq == "VH"
+
+
+@pytest.mark.anyio
+async def test_landslide_zones_load_by_descending_gridcode():
+    db = AsyncMock()
+    db.execute.return_value = MagicMock()
+    await landslide_zone_index._load_rows(db)
+
+    sql = str(db.execute.call_args.args[0])
+    assert "ORDER BY landslide_zones.gridcode DESC" in sql
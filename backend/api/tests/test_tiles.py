@@ -0,0 +1,93 @@
+from backend.api.tests.test_session_config import test_engine, test_session, client
+from sqlalchemy.dialects import postgresql
+from backend.api.routers.tiles_api import MVT_MEDIA_TYPE, tile_cache
+from backend.api.vector_tiles import (
+    MAX_SIMPLIFY_ZOOM,
+    TILE_LAYERS,
+    simplify_tolerance,
+    tile_margin,
+    tile_query,
+    tiles_covering,
+)
+
+# Tile containing the point of the tsunami zone used by test_tsunami.py
+TSUNAMI_TILE = "12/655/1582"
+
+
+def test_get_tile(client):
+    tile_cache.clear()
+    response = client.get(f"api/tiles/tsunami/{TSUNAMI_TILE}.mvt")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MVT_MEDIA_TYPE
+    assert len(response.content) > 0
+
+    # The cached tile is revalidated with its ETag
+    response = client.get(
+        f"api/tiles/tsunami/{TSUNAMI_TILE}.mvt",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_get_empty_tile(client):
+    tile_cache.clear()
+    response = client.get("api/tiles/tsunami/12/0/0.mvt")
+
+    assert response.status_code == 200
+    assert response.content == b""
+
+
+def test_get_tile_includes_features_in_buffer(client):
+    tile_cache.clear()
+    # The soft story of test_soft_story.py is about 5 m north of this tile,
+    # within its buffer
+    response = client.get("api/tiles/soft-story/14/2620/6330.mvt")
+
+    assert response.status_code == 200
+    assert len(response.content) > 0
+
+
+def test_get_tile_unknown_layer(client):
+    response = client.get(f"api/tiles/earthquakes/{TSUNAMI_TILE}.mvt")
+    assert response.status_code == 404
+
+
+def test_get_tile_invalid_coordinates(client):
+    for tile in ("1/2/0", "1/0/2", "23/0/0", "-1/0/0"):
+        response = client.get(f"api/tiles/tsunami/{tile}.mvt")
+        assert response.status_code == 400
+
+
+def test_simplify_tolerance_decreases_with_zoom():
+    assert simplify_tolerance(0) > simplify_tolerance(10) > 0
+    assert simplify_tolerance(MAX_SIMPLIFY_ZOOM) is None
+
+
+def test_tile_query():
+    sql = str(
+        tile_query("landslide", TILE_LAYERS["landslide"], 12, 655, 1582).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    assert "ST_AsMVT(features, 'landslide', 4096, 'geom')" in sql
+    assert f"ST_Expand(ST_TileEnvelope(12, 655, 1582), {tile_margin(12)})" in sql
+    assert "ST_SimplifyPreserveTopology(landslide_zones.geometry" in sql
+    assert "landslide_zones.gridcode IN (8, 9, 10)" in sql
+
+
+def test_tile_margin_matches_buffer():
+    # A tile spans TILE_EXTENT units, of which TILE_BUFFER are added around it
+    assert tile_margin(0) * 4096 / 64 == 2 * 20037508.342789244
+    assert tile_margin(14) == tile_margin(13) / 2
+
+
+def test_tiles_covering():
+    # A point covers a single tile
+    assert list(tiles_covering((-122.35, 37.83, -122.35, 37.83), 12)) == [(655, 1582)]
+    # Tiles are listed west to east and north to south
+    tiles = list(tiles_covering((-122.52, 37.70, -122.35, 37.83), 12))
+    assert tiles[0] == (653, 1582)
+    assert tiles[-1] == (655, 1584)
+    assert len(tiles) == 9
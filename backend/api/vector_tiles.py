@@ -0,0 +1,178 @@
+"""
+Mapbox vector tiles of the hazard layers, encoded in PostGIS with
+ST_AsMVT. Shared by the tile endpoint and the ETL's tile archive export.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from sqlalchemy import and_, func, literal, select
+from backend.api.models.base import Base
+from backend.api.models.tsunami import TsunamiZone
+from backend.api.models.liquefaction_zones import LiquefactionZone
+from backend.api.models.landslide_zones import LandslideZone, HAZARDOUS_GRIDCODES
+from backend.api.models.soft_story_properties import (
+    STATUS_WORK_COMPLETE_LOWERCASE,
+    SoftStoryProperty,
+)
+
+# Size of a tile in MVT coordinates and of the margin around it
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_ZOOM = 22
+# Geometries are no longer simplified from this zoom level on
+MAX_SIMPLIFY_ZOOM = 16
+# Half the width of the world in EPSG:3857 coordinates
+WEB_MERCATOR_EXTENT = 20037508.342789244
+
+
+@dataclass(frozen=True)
+class TileLayer:
+    """
+    A table exposed as a vector tile layer
+
+    Args:
+        table: SQLAlchemy model the features are read from
+        geometry: Geometry column of the features, with srid 4326
+        properties: Maps each feature property to the column it is read from
+        where: Optional filter restricting the features
+        simplify: Whether geometries are simplified at low zoom levels
+    """
+
+    table: type[Base]
+    geometry: Any
+    properties: dict[str, Any] = field(default_factory=dict)
+    where: Optional[Any] = None
+    simplify: bool = True
+
+
+TILE_LAYERS = {
+    "tsunami": TileLayer(
+        TsunamiZone,
+        TsunamiZone.geometry,
+        {"identifier": TsunamiZone.identifier, "evacuate": TsunamiZone.evacuate},
+    ),
+    "liquefaction": TileLayer(
+        LiquefactionZone,
+        LiquefactionZone.geometry,
+        {"identifier": LiquefactionZone.identifier, "liq": LiquefactionZone.liq},
+    ),
+    "landslide": TileLayer(
+        LandslideZone,
+        LandslideZone.geometry,
+        {"identifier": LandslideZone.identifier, "gridcode": LandslideZone.gridcode},
+        where=LandslideZone.gridcode.in_(HAZARDOUS_GRIDCODES),
+    ),
+    "soft-story": TileLayer(
+        SoftStoryProperty,
+        SoftStoryProperty.point,
+        {
+            "identifier": SoftStoryProperty.identifier,
+            "status": SoftStoryProperty.status,
+        },
+        where=and_(
+            SoftStoryProperty.point.isnot(None),
+            func.lower(SoftStoryProperty.status) != STATUS_WORK_COMPLETE_LOWERCASE,
+        ),
+        simplify=False,
+    ),
+}
+
+
+def simplify_tolerance(z: int) -> Optional[float]:
+    """
+    Returns the simplification tolerance in degrees for a zoom level,
+    about one MVT coordinate unit at the equator, or None when
+    geometries are not simplified at this zoom level
+
+    Args:
+        z (int): Zoom level
+    """
+    if z >= MAX_SIMPLIFY_ZOOM:
+        return None
+    return 360.0 / (2**z * TILE_EXTENT)
+
+
+def tile_margin(z: int) -> float:
+    """
+    Returns the width of the buffer around the tiles of a zoom level, in
+    EPSG:3857 units
+
+    Args:
+        z (int): Zoom level
+    """
+    return 2 * WEB_MERCATOR_EXTENT / 2**z * TILE_BUFFER / TILE_EXTENT
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    """Returns True if (z, x, y) are the coordinates of an existing tile"""
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def tiles_covering(bounds: tuple[float, float, float, float], z: int):
+    """
+    Yields the (x, y) coordinates of the tiles of zoom level `z`
+    covering a bounding box
+
+    Args:
+        bounds: (min lon, min lat, max lon, max lat) of the box
+        z (int): Zoom level
+    """
+
+    def tile_of(lon: float, lat: float) -> tuple[int, int]:
+        n = 2**z
+        x = int((lon + 180.0) / 360.0 * n)
+        y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    min_lon, min_lat, max_lon, max_lat = bounds
+    min_x, min_y = tile_of(min_lon, max_lat)
+    max_x, max_y = tile_of(max_lon, min_lat)
+    for x in range(min_x, max_x + 1):
+        for y in range(min_y, max_y + 1):
+            yield x, y
+
+
+def tile_query(name: str, layer: TileLayer, z: int, x: int, y: int):
+    """
+    Builds a statement encoding the features of a layer within a tile
+
+    Geometries are filtered with the spatial index against the tile
+    bounds and the buffer around them, simplified according to the zoom level, and clipped and
+    quantized to the tile grid by ST_AsMVTGeom.
+
+    Args:
+        name (str): Name of the layer inside the tile
+        layer (TileLayer): The layer to encode
+        z (int): Zoom level of the tile
+        x (int): Column of the tile
+        y (int): Row of the tile
+
+    Returns:
+        A SQLAlchemy selectable yielding the tile as a single bytea value
+    """
+    envelope = func.ST_TileEnvelope(z, x, y)
+    geometry = layer.geometry
+    tolerance = simplify_tolerance(z) if layer.simplify else None
+    if tolerance is not None:
+        geometry = func.ST_SimplifyPreserveTopology(geometry, tolerance)
+
+    features = select(
+        func.ST_AsMVTGeom(
+            func.ST_Transform(geometry, 3857), envelope, TILE_EXTENT, TILE_BUFFER
+        ).label("geom"),
+        *(column.label(property) for property, column in layer.properties.items()),
+    ).where(
+        layer.geometry.op("&&")(
+            func.ST_Transform(func.ST_Expand(envelope, tile_margin(z)), 4326)
+        )
+    )
+    if layer.where is not None:
+        features = features.where(layer.where)
+    subquery = features.subquery("features")
+
+    return select(
+        func.ST_AsMVT(
+            subquery.table_valued(), literal(name), TILE_EXTENT, literal("geom")
+        )
+    )
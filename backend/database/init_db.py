@@ -43,6 +43,7 @@ from backend.api.models.tsunami import TsunamiZone
 from backend.api.models.landslide_zones import LandslideZone
 from backend.api.models.liquefaction_zones import LiquefactionZone
 from backend.api.models.soft_story_properties import SoftStoryProperty
+from backend.api.models.row_hashes import RowHash
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -67,12 +68,15 @@ def drop_db():
 
 table_classes = [TsunamiZone, LiquefactionZone, SoftStoryProperty]
 
+# Tables the ETL keeps its own state in, never populated by it
+etl_state_classes = [RowHash]
+
 
 def check_tables_exist():
     inspector = inspect(engine)
     tables = inspector.get_table_names()
 
-    for table in table_classes:
+    for table in table_classes + etl_state_classes:
         if table.__tablename__ not in tables:
             return False
     return True
@@ -0,0 +1,147 @@
+"""
+Connection pool metrics, to size the pools of each deployment mode from data
+
+The metered pool classes count the checkouts, connections and checkins
+of an engine's pool and time how long each checkout waited for a
+connection. The metrics of a pool are registered under the pool's
+logging name, which the engine sets with `pool_logging_name` and which
+is kept when the pool is recreated.
+"""
+
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field, fields
+from typing import Optional
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+# Checkouts taking longer than this waited for a connection to be
+# returned or created
+WAIT_THRESHOLD_SECONDS = 0.001
+
+
+@dataclass
+class PoolMetrics:
+    """Counters of one connection pool since the process started"""
+
+    name: str
+    checkouts: int = 0
+    checkins: int = 0
+    connects: int = 0
+    waits: int = 0
+    timeouts: int = 0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    peak_checked_out: int = 0
+    peak_overflow: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+    # Pool last checked out from, for its current state in snapshots
+    _pool: Optional[weakref.ref] = field(default=None, repr=False, compare=False)
+
+    def record_checkout(self, wait: float, pool: Pool) -> None:
+        with self._lock:
+            self._pool = weakref.ref(pool)
+            self.checkouts += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            if wait > WAIT_THRESHOLD_SECONDS:
+                self.waits += 1
+            if isinstance(pool, QueuePool):
+                self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+                self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+    def record_timeout(self, wait: float) -> None:
+        with self._lock:
+            self.timeouts += 1
+            self.waits += 1
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.checkins += 1
+
+    def snapshot(self) -> dict:
+        """
+        The counters, with the current size, checked out connections and
+        overflow of the pool if it is a queue pool
+
+        Returns:
+            The metrics as a dictionary
+        """
+        with self._lock:
+            metrics = {
+                f.name: getattr(self, f.name)
+                for f in fields(self)
+                if not f.name.startswith("_")
+            }
+            pool = self._pool() if self._pool is not None else None
+        if isinstance(pool, QueuePool):
+            metrics.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=max(0, pool.overflow()),
+            )
+        return metrics
+
+
+_registry: dict[str, PoolMetrics] = {}
+_registry_lock = threading.Lock()
+
+
+def get_pool_metrics(name: str) -> PoolMetrics:
+    """The metrics of the pools named `name`, created on first use"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = PoolMetrics(name)
+        return _registry[name]
+
+
+def all_pool_metrics() -> list[PoolMetrics]:
+    with _registry_lock:
+        return list(_registry.values())
+
+
+class _MeteredPool(Pool):
+    """Records the metrics of the pool under its logging name"""
+
+    @property
+    def metrics(self) -> PoolMetrics:
+        return get_pool_metrics(self._orig_logging_name or "default")
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, self)
+        return record
+
+    def _create_connection(self):
+        self.metrics.record_connect()
+        return super()._create_connection()
+
+    def _do_return_conn(self, record) -> None:
+        self.metrics.record_checkin()
+        super()._do_return_conn(record)
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncAdaptedQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class MeteredNullPool(_MeteredPool, NullPool):
+    pass
@@ -1,7 +1,22 @@
 import logging
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Any, Callable
+from sqlalchemy import URL, Engine, create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from backend.api.config import settings
+from backend.api.metrics import instrument_engine
+from backend.database.pool_metrics import (
+    MeteredAsyncAdaptedQueuePool,
+    MeteredNullPool,
+    MeteredQueuePool,
+)
+
+# TCP keepalive probes, so that idle pooled connections dropped by a NAT
+# or by Neon are noticed without pinging on every checkout
+KEEPALIVES_IDLE_SECONDS = 30
+KEEPALIVES_INTERVAL_SECONDS = 10
+KEEPALIVES_COUNT = 3
 
 
 def _get_database_url() -> str:
@@ -16,26 +31,181 @@ def _get_database_url() -> str:
             raise ValueError(f"Unknown environment: {settings.environment}")
 
 
-# Set up the database engine using settings
-engine = create_engine(
-    _get_database_url(),
-    pool_size=10,
-    pool_timeout=30,
-    max_overflow=5,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-)
+def to_async_url(url: str) -> URL:
+    """
+    Converts a psycopg2 database URL into its asyncpg equivalent
+
+    asyncpg takes `ssl` instead of libpq's `sslmode` and does not know
+    `channel_binding`, which Neon adds to its connection strings.
+    """
+    parsed = make_url(url)
+    query = dict(parsed.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode is not None:
+        query["ssl"] = sslmode
+    return parsed.set(drivername="postgresql+asyncpg", query=query)
+
+
+def to_neon_pooler_url(url: URL) -> URL:
+    """
+    Points a Neon database URL at the endpoint's connection pooler, whose
+    host has `-pooler` appended to the endpoint ID. Other URLs are
+    returned unchanged.
+    """
+    if url.host is None or not url.host.endswith(".neon.tech"):
+        return url
+    endpoint, _, domain = url.host.partition(".")
+    if endpoint.endswith("-pooler"):
+        return url
+    return url.set(host=f"{endpoint}-pooler.{domain}")
+
+
+def _keepalive_connect_args(is_async: bool) -> dict:
+    if is_async:
+        # asyncpg has no client-side keepalive options; have the server
+        # send the probes instead
+        return {
+            "server_settings": {
+                "tcp_keepalives_idle": str(KEEPALIVES_IDLE_SECONDS),
+                "tcp_keepalives_interval": str(KEEPALIVES_INTERVAL_SECONDS),
+                "tcp_keepalives_count": str(KEEPALIVES_COUNT),
+            }
+        }
+    return {
+        "keepalives": 1,
+        "keepalives_idle": KEEPALIVES_IDLE_SECONDS,
+        "keepalives_interval": KEEPALIVES_INTERVAL_SECONDS,
+        "keepalives_count": KEEPALIVES_COUNT,
+    }
+
+
+def _engine_options(url: URL, is_async: bool, name: str) -> tuple[URL, dict]:
+    """
+    URL and create_engine options of an engine in the DB_POOL_MODE
+    deployment mode:
+
+    - queue: a pool of up to 15 connections pinged on checkout, for
+      long-running servers and the ETL
+    - pooler: no pool in the process, every session connects through
+      Neon's pooled endpoint, for serverless instances scaling out
+    - serverless: a small pool of connections kept alive by TCP
+      keepalives instead of checkout pings, for warm serverless instances
+
+    Args:
+        url: Database URL
+        is_async: Whether the engine is an asyncpg engine
+        name: Name of the engine's pool in the pool metrics
+
+    Returns:
+        The URL to connect to and the options of create_engine
+
+    Raises:
+        ValueError: If DB_POOL_MODE is not one of the modes
+    """
+    options: dict[str, Any] = {"pool_logging_name": name}
+    match settings.db_pool_mode:
+        case "queue":
+            options.update(
+                poolclass=(
+                    MeteredAsyncAdaptedQueuePool if is_async else MeteredQueuePool
+                ),
+                pool_size=10,
+                pool_timeout=30,
+                max_overflow=5,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+            )
+        case "pooler":
+            url = to_neon_pooler_url(url)
+            options.update(poolclass=MeteredNullPool)
+            if is_async:
+                # PgBouncer in transaction mode does not keep prepared
+                # statements across transactions
+                options["connect_args"] = {
+                    "statement_cache_size": 0,
+                    "prepared_statement_cache_size": 0,
+                }
+        case "serverless":
+            options.update(
+                poolclass=(
+                    MeteredAsyncAdaptedQueuePool if is_async else MeteredQueuePool
+                ),
+                pool_size=settings.serverless_pool_size,
+                pool_timeout=10,
+                max_overflow=0,
+                pool_pre_ping=False,
+                # Neon suspends idle computes after 5 minutes
+                pool_recycle=300,
+                connect_args=_keepalive_connect_args(is_async),
+            )
+        case _:
+            raise ValueError(f"Unknown database pool mode: {settings.db_pool_mode}")
+    return url, options
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """
+    The database engine used by the ETL and scripts, created on first use
+    so that importing this module does not load the database driver
+    """
+    url, options = _engine_options(make_url(_get_database_url()), False, "etl")
+    return create_engine(url, **options)
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """
+    Async engine used by the API, so that requests waiting on the database
+    do not each hold a worker thread. Created on first use, like get_engine
+    """
+    url, options = _engine_options(to_async_url(_get_database_url()), True, "api")
+    engine = create_async_engine(url, **options)
+    instrument_engine(engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@lru_cache(maxsize=None)
+def get_async_session_factory() -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=get_async_engine(), autoflush=False, expire_on_commit=False
+    )
+
 
 logging.getLogger("sqlalchemy.pool").setLevel(logging.WARNING)
 
-# Create a session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_LAZY_ATTRIBUTES: dict[str, Callable[[], Any]] = {
+    "engine": get_engine,
+    "async_engine": get_async_engine,
+    "SessionLocal": get_session_factory,
+    "AsyncSessionLocal": get_async_session_factory,
+}
+
+
+def __getattr__(name: str) -> Any:
+    # The engines and session factories used to be created at import;
+    # they are still available as module attributes, created on access
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Dependency function to get a database session
 def get_db():
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
+
+
+# Dependency function to get an async database session
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
@@ -0,0 +1,80 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from backend.api.config import settings
+from backend.api.routers.health_api import router
+from backend.database.pool_metrics import (
+    MeteredNullPool,
+    MeteredQueuePool,
+    get_pool_metrics,
+)
+
+
+def test_queue_pool_counts_checkouts_overflow_and_timeouts():
+    engine = create_engine(
+        "sqlite://",
+        poolclass=MeteredQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+        pool_logging_name="test_queue",
+    )
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    metrics = get_pool_metrics("test_queue").snapshot()
+
+    assert metrics["checkouts"] == 3
+    assert metrics["checkins"] == 3
+    assert metrics["connects"] == 2
+    assert metrics["timeouts"] == 1
+    assert metrics["waits"] >= 1
+    assert metrics["max_wait_seconds"] >= 0.05
+    assert metrics["peak_checked_out"] == 2
+    assert metrics["peak_overflow"] == 1
+    assert metrics["checked_out"] == 0
+    engine.dispose()
+
+
+def test_null_pool_connects_on_every_checkout():
+    engine = create_engine(
+        "sqlite://", poolclass=MeteredNullPool, pool_logging_name="test_null"
+    )
+    for _ in range(3):
+        with engine.connect():
+            pass
+
+    metrics = get_pool_metrics("test_null").snapshot()
+
+    assert metrics["checkouts"] == metrics["connects"] == 3
+    assert "size" not in metrics
+
+
+def test_metrics_survive_pool_recreation():
+    engine = create_engine(
+        "sqlite://", poolclass=MeteredQueuePool, pool_logging_name="test_recreate"
+    )
+    with engine.connect():
+        pass
+    engine.dispose()
+    with engine.connect():
+        pass
+
+    assert get_pool_metrics("test_recreate").checkouts == 2
+
+
+def test_health_endpoint_publishes_pool_metrics():
+    get_pool_metrics("test_endpoint").record_connect()
+    app = FastAPI()
+    app.include_router(router)
+
+    response = TestClient(app).get("/api/health/db-pool").json()
+
+    assert response["mode"] == settings.db_pool_mode
+    assert response["pools"]["test_endpoint"]["connects"] == 1
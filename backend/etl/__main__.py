@@ -0,0 +1,79 @@
+"""
+Command line entry point of the ETL.
+
+Usage:
+    python -m backend.etl run --datasets tsunami soft_story --jobs 2
+    python backend/database/init_db.py | python -m backend.etl run --required-from -
+"""
+
+import argparse
+import logging
+import sys
+from backend.etl.data_handler import configure_logging
+from backend.etl.orchestrator import (
+    DATASETS,
+    DEFAULT_DATASETS,
+    format_report,
+    required_tables,
+    resolve_datasets,
+    run_datasets,
+)
+
+logger = logging.getLogger("backend.etl")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m backend.etl")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Run the ETL of several datasets")
+    selection = run.add_mutually_exclusive_group()
+    selection.add_argument(
+        "--datasets",
+        nargs="+",
+        metavar="DATASET",
+        help=(
+            f"Datasets or tables to load, among {', '.join(DATASETS)}; "
+            f"defaults to {' '.join(DEFAULT_DATASETS)}"
+        ),
+    )
+    selection.add_argument(
+        "--required-from",
+        type=argparse.FileType("r"),
+        metavar="FILE",
+        help="Load the tables of the ETL_REQUIRED lines printed by init_db.py, "
+        "read from FILE or - for stdin",
+    )
+    run.add_argument(
+        "--jobs", type=int, default=1, help="Number of datasets loaded concurrently"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.required_from is not None:
+        names = required_tables(args.required_from)
+        if not names:
+            logger.info("No table requires ETL")
+            return 0
+    else:
+        names = args.datasets or DEFAULT_DATASETS
+    try:
+        datasets = resolve_datasets(names)
+    except ValueError as e:
+        logger.error(e)
+        return 2
+
+    logger.info(
+        f"Running the ETL of {', '.join(d.name for d in datasets)} "
+        f"with {args.jobs} jobs"
+    )
+    results = run_datasets(datasets, jobs=args.jobs)
+    logger.info("ETL timings (s):\n" + format_report(results))
+    return 0 if all(result.succeeded for result in results) else 1
+
+
+if __name__ == "__main__":
+    configure_logging()
+    sys.exit(main())
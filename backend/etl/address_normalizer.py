@@ -0,0 +1,90 @@
+"""
+Normalization of the soft story addresses before geocoding.
+
+The rewrite rules are compiled once and the normalized forms memoized,
+as the same addresses come back on every run of the ETL. Addresses
+differing only in case, spacing, punctuation or leading zeros share the
+same key, so that they are geocoded and cached once.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+# Rewrites making SFData addresses resolvable by Mapbox, applied in order
+_MAPBOX_RULES = [
+    # Remove leading zeros
+    (re.compile(r"\b0+(\d)"), r"\1"),
+    # Remove any text in parentheses
+    (re.compile(r"\s*\([^)]*\)"), ""),
+    # BL to BOULEVARD
+    (re.compile(r"\bBL\b"), "BOULEVARD"),
+    # TR to TERRACE
+    (re.compile(r"\bTR\b"), "TERRACE"),
+    # AL to ALLEY
+    (re.compile(r"\bAL\b"), "ALLEY"),
+    # WEST AV to AVENUE WEST
+    (re.compile(r"\bWEST AV\b"), "AVENUE WEST"),
+]
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+
+# Address range of the form '1234-5678 Street Ave'
+_ADDRESS_RANGE = re.compile(r"(\d+)-(\d+)\s+(.*)")
+
+_MEMOIZED_ADDRESSES = 1 << 16
+
+
+class AddressRange(NamedTuple):
+    start: int
+    end: int
+    street_name: str
+
+
+@lru_cache(maxsize=_MEMOIZED_ADDRESSES)
+def clean_address(address: str) -> str:
+    """
+    Replaces address sub-strings so MapBox will return a result
+    """
+    for pattern, replacement in _MAPBOX_RULES:
+        address = pattern.sub(replacement, address)
+    return address
+
+
+@lru_cache(maxsize=_MEMOIZED_ADDRESSES)
+def address_key(address: str) -> str:
+    """
+    Key identifying near-duplicate addresses, which only differ in case,
+    spacing, punctuation, leading zeros or the abbreviations expanded by
+    clean_address
+    """
+    key = clean_address(address.upper())
+    return " ".join(_PUNCTUATION.sub(" ", key).split())
+
+
+def parse_address_range(address: str) -> Optional[AddressRange]:
+    """
+    Parses an address range such as '1234-1260 GROVE ST'
+
+    Returns:
+        The first and last numbers of the range and its street, or None
+        if the address is not a range
+    """
+    match_result = _ADDRESS_RANGE.search(address)
+    if match_result is None:
+        return None
+    return AddressRange(int(match_result[1]), int(match_result[2]), match_result[3])
+
+
+def interpolate_coordinates(
+    start: Tuple[float, float],
+    end: Tuple[float, float],
+    fraction: float,
+) -> Tuple[float, float]:
+    """
+    Returns the point at `fraction` of the way from `start` to `end`
+    """
+    return (
+        start[0] + (end[0] - start[0]) * fraction,
+        start[1] + (end[1] - start[1]) * fraction,
+    )
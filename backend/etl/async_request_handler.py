@@ -0,0 +1,190 @@
+"""
+Async HTTP requests of the ETL, on a shared httpx.AsyncClient.
+
+The client keeps its connections alive between requests and negotiates
+HTTP/2, so consecutive requests to the same API reuse one TLS
+connection. Requests are retried with the LoggingRetry strategy of
+SessionManager, with the same backoff, Retry-After handling and log
+messages as the requests sessions. Only the Mapbox batch geocoder sends
+its requests here; the data handlers page through their APIs with
+RequestHandler on threads.
+
+The client and its connections belong to one event loop. Synchronous
+code, such as the geocoder, runs coroutines on the process-wide
+loop of `shared_event_loop()` and uses `shared_async_client()` there, so
+that geocoding proceeds on that loop while the handler threads page
+through their APIs.
+"""
+
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Coroutine, Optional, TypeVar
+import httpx
+from backend.etl.rate_limiter import TokenBucket
+from backend.etl.retry import LoggingRetry
+from backend.etl.session_manager import SessionManager
+
+T = TypeVar("T")
+
+
+def create_async_client(
+    max_connections: int = 10, timeout: float = 60, **kwargs
+) -> httpx.AsyncClient:
+    """
+    Create an AsyncClient keeping up to `max_connections` connections
+    alive, with HTTP/2
+
+    Args:
+        max_connections: Maximum number of open connections
+        timeout: Default request timeout in seconds
+        kwargs: Other AsyncClient arguments, such as a test transport
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=30,
+        ),
+        timeout=timeout,
+        **kwargs,
+    )
+
+
+class EventLoopThread:
+    """An asyncio event loop running in a daemon thread"""
+
+    def __init__(self, name: str = "etl-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the loop, blocking until it completes"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+@lru_cache(maxsize=None)
+def shared_event_loop() -> EventLoopThread:
+    """The event loop shared by the synchronous callers of the process"""
+    return EventLoopThread()
+
+
+@lru_cache(maxsize=None)
+def shared_async_client() -> httpx.AsyncClient:
+    """
+    The AsyncClient shared by the requests run on `shared_event_loop()`,
+    and only usable there
+    """
+    return create_async_client()
+
+
+class AsyncRequestHandler:
+    """
+    Handles async HTTP requests with retries, logging and error handling
+
+    Args:
+        client: The AsyncClient sending the requests
+        logger: Optional logger instance
+        retry: The retry strategy, with a total number of retries;
+            defaults to SessionManager's, which retries GET requests only
+        rate_limiter: Optional rate limiter every attempt, including
+            retries, waits for
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        logger: Optional[logging.Logger] = None,
+        retry: Optional[LoggingRetry] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+    ):
+        self.client = client
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.retry = retry or SessionManager.create_retry()
+        if self.retry.total is None or isinstance(self.retry.total, bool):
+            raise ValueError("The retry strategy needs a total number of retries")
+        self.rate_limiter = rate_limiter
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying failed attempts as LoggingRetry does
+
+        A response is retried if its status is in the retry's status
+        list, or if it carries a Retry-After header with a 413, 429 or
+        503 status. Connection errors are retried too. Between attempts,
+        the handler waits for the Retry-After delay if any, otherwise
+        for the exponential backoff of the retry.
+
+        Args:
+            method: HTTP method, which must be allowed by the retry to
+                be retried
+            url: Request URL
+            kwargs: Other arguments of AsyncClient.request
+        Returns:
+            The successful response
+        Raises:
+            httpx.HTTPStatusError: If the last response is an error
+            httpx.TransportError: If the last attempt failed to connect
+        """
+        retry = self.retry
+        # As in urllib3, no allowed methods means that every method is retried
+        retryable = (
+            retry.allowed_methods is None or method.upper() in retry.allowed_methods
+        )
+        while True:
+            response = None
+            error = None
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if not retryable:
+                    raise
+                error = e
+
+            if response is not None and not retry.is_retry(
+                method, response.status_code, "Retry-After" in response.headers
+            ):
+                response.raise_for_status()
+                return response
+
+            # An int, as checked in __init__
+            total = int(retry.total or 0)
+            if total <= 0:
+                retry.log_exhausted()
+                if error is not None:
+                    raise error
+                if response is None:
+                    raise RuntimeError(f"No response from {url}")
+                response.raise_for_status()
+                return response
+
+            delay = None
+            retry_after = (
+                response.headers.get("Retry-After") if response is not None else None
+            )
+            if retry_after is not None and retry.respect_retry_after_header:
+                delay = retry.parse_retry_after(retry_after)
+            if delay is None:
+                delay = retry.get_backoff_time()
+            retry.log_attempt(
+                method,
+                url,
+                response.status_code if response is not None else "unknown",
+                error,
+                delay,
+            )
+            if delay:
+                await asyncio.sleep(delay)
+            retry = retry.new(total=total - 1)
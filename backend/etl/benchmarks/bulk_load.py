@@ -0,0 +1,154 @@
+"""
+Benchmarks the bulk load methods of DataHandler.bulk_insert_data against
+a scratch table of the test database.
+
+Each method loads the same synthetic rows twice, once into an empty table
+(plain inserts) and once more with newer timestamps (every row takes the
+ON CONFLICT DO UPDATE path).
+
+Usage:
+    python -m backend.etl.benchmarks.bulk_load --rows 50000 --batch-size 1000
+    python -m backend.etl.benchmarks.bulk_load --batch-size 50000 \
+        --chunk-size 5000 --parallel-writers 4
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from geoalchemy2 import Geometry
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Point
+from sqlalchemy import Column, DateTime, Integer, String, create_engine, text
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from backend.api.config import settings
+from backend.etl.data_handler import BULK_LOAD_METHODS, DataHandler
+
+
+class _BenchmarkBase(DeclarativeBase):
+    pass
+
+
+class BenchmarkRow(_BenchmarkBase):
+    """Scratch table shaped like the ETL tables"""
+
+    __tablename__ = "bulk_load_benchmark"
+    identifier = Column(Integer, primary_key=True)
+    name = Column(String)
+    value = Column(Integer)
+    data_changed_at = Column(DateTime)
+    geometry = Column(Geometry("POINT", srid=4326))
+
+
+class _BenchmarkDataHandler(DataHandler):
+    def parse_data(self, data: dict) -> tuple[list[dict], dict]:
+        return data["features"], data
+
+    def insert_policy(self) -> dict:
+        return {
+            field: text(
+                "CASE WHEN bulk_load_benchmark.data_changed_at "
+                f"< EXCLUDED.data_changed_at THEN EXCLUDED.{field} "
+                f"ELSE bulk_load_benchmark.{field} END"
+            )
+            for field in ["name", "value", "data_changed_at", "geometry"]
+        }
+
+
+def make_rows(count: int, changed_at: datetime) -> list[dict]:
+    rng = random.Random(count)
+    return [
+        {
+            "identifier": i,
+            "name": f"Feature {i}",
+            "value": rng.randint(0, 1000),
+            "data_changed_at": changed_at,
+            "geometry": from_shape(
+                Point(-122.5 + rng.random() * 0.15, 37.7 + rng.random() * 0.1),
+                srid=4326,
+            ),
+        }
+        for i in range(count)
+    ]
+
+
+def run(
+    database_url: str, rows: int, batch_size: int, **handler_options
+) -> dict[str, tuple]:
+    """
+    Times each bulk load method
+
+    Args:
+        handler_options: Further arguments of the handler, e.g. chunk_size
+
+    Returns:
+        Maps each method to its (insert seconds, upsert seconds)
+    """
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine)
+    first = make_rows(rows, datetime(2024, 1, 1))
+    second = make_rows(rows, datetime(2024, 1, 1) + timedelta(days=1))
+
+    def db_getter():
+        yield Session()
+
+    results = {}
+    try:
+        for method in BULK_LOAD_METHODS:
+            _BenchmarkBase.metadata.drop_all(engine)
+            _BenchmarkBase.metadata.create_all(engine)
+            handler = _BenchmarkDataHandler(
+                url="", table=BenchmarkRow, bulk_load_method=method, **handler_options
+            )
+            handler.db_getter = db_getter
+
+            timings = []
+            for data in (first, second):
+                start = time.perf_counter()
+                for offset in range(0, rows, batch_size):
+                    handler.bulk_insert_data(
+                        data[offset : offset + batch_size], "identifier"
+                    )
+                timings.append(time.perf_counter() - start)
+
+            with Session() as db:
+                loaded = db.query(BenchmarkRow).count()
+            assert loaded == rows, f"{method} loaded {loaded} of {rows} rows"
+            results[method] = tuple(timings)
+    finally:
+        _BenchmarkBase.metadata.drop_all(engine)
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--rows-per-statement", type=int, default=None)
+    parser.add_argument("--parallel-writers", type=int, default=None)
+    parser.add_argument(
+        "--database-url",
+        default=settings.database_url_sqlalchemy_test,
+        help="Defaults to the test database; the benchmark table is dropped",
+    )
+    args = parser.parse_args()
+
+    results = run(
+        args.database_url,
+        args.rows,
+        args.batch_size,
+        chunk_size=args.chunk_size,
+        rows_per_statement=args.rows_per_statement,
+        parallel_writers=args.parallel_writers,
+    )
+    print(f"{args.rows} rows in batches of {args.batch_size}")
+    print(f"{'method':<8} {'insert (s)':>12} {'upsert (s)':>12} {'rows/s':>10}")
+    for method, (insert, upsert) in results.items():
+        rate = 2 * args.rows / (insert + upsert)
+        print(f"{method:<8} {insert:>12.2f} {upsert:>12.2f} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
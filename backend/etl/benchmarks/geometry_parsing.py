@@ -0,0 +1,86 @@
+"""
+Benchmarks the vectorized tsunami geometry parsing against the previous
+per-feature path on the real tsunami payload.
+
+The payload is fetched from the ArcGIS API, or read from a file saved by
+an earlier run with --save.
+
+Usage:
+    python -m backend.etl.benchmarks.geometry_parsing --save tsunami.json
+    python -m backend.etl.benchmarks.geometry_parsing --payload tsunami.json
+"""
+
+import argparse
+import json
+import time
+from pyproj import Transformer
+from shapely.geometry import MultiPolygon, Polygon
+from shapely.ops import transform
+from backend.api.models.tsunami import TsunamiZone
+from backend.etl.tsunami_data_handler import TSUNAMI_URL, TsunamiDataHandler
+
+_PARAMS = {
+    "where": "County='San Francisco' AND Evacuate='Yes, Tsunami Hazard Area'",
+    "outFields": "*",
+    "f": "json",
+}
+
+
+def per_feature_geometries(features: list[dict], boundary) -> list:
+    """The geometry path before vectorization, one feature at a time"""
+    geometries = []
+    for feature in features:
+        polygons = [
+            Polygon(ring) for ring in feature["geometry"]["rings"] if len(ring) >= 4
+        ]
+        transformer = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        transformed = transform(transformer.transform, MultiPolygon(polygons))
+        trimmed = transformed.intersection(boundary)
+        if not trimmed.is_empty:
+            geometries.append(trimmed)
+    return geometries
+
+
+def best_time(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--payload", help="Tsunami features saved with --save")
+    parser.add_argument("--save", help="Saves the fetched features to a file")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    handler = TsunamiDataHandler(TSUNAMI_URL, TsunamiZone)
+    if args.payload:
+        with open(args.payload) as f:
+            features = json.load(f)
+    else:
+        features = handler.fetch_data(_PARAMS)["features"]
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump(features, f)
+
+    data = {"features": features}
+    legacy = best_time(
+        lambda: per_feature_geometries(features, handler.boundary), args.repeat
+    )
+    vectorized = best_time(lambda: handler.parse_data(data), args.repeat)
+    points = sum(
+        len(ring) for feature in features for ring in feature["geometry"]["rings"]
+    )
+
+    print(f"{len(features)} features, {points} points, best of {args.repeat}")
+    print(f"per feature: {legacy:.3f}s")
+    print(f"vectorized:  {vectorized:.3f}s (including row and GeoJSON building)")
+    print(f"speedup:     {legacy / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Bulk loads rows with PostgreSQL's COPY protocol. Rows are streamed into a
+temporary staging table, then merged into the target table with a single
+INSERT ... SELECT ... ON CONFLICT statement.
+"""
+
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator, Optional, Type
+import psycopg2
+from geoalchemy2 import Geometry
+from geoalchemy2.elements import WKBElement, WKTElement
+from sqlalchemy import column, select, table as table_clause
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.postgresql import Insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from backend.api.models.base import ModelType
+
+# Text format markers, see https://www.postgresql.org/docs/current/sql-copy.html
+_NULL = "\\N"
+_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_geometry(value: Any, srid: int) -> str:
+    """
+    Encodes a geometry as PostGIS geometry input text: hex EWKB for
+    WKB elements and EWKT for WKT elements or strings
+
+    Args:
+        value: A WKBElement, WKTElement or WKT string
+        srid (int): SRID of the geometry column, used when the value
+            does not carry its own
+    """
+    if isinstance(value, WKBElement):
+        return f"SRID={value.srid if value.srid > 0 else srid};{value.desc}"
+    if isinstance(value, WKTElement):
+        value = value.data
+    value = str(value)
+    if value.upper().startswith("SRID="):
+        return value
+    return f"SRID={srid};{value}"
+
+
+def copy_value(value: Any, srid: Optional[int] = None) -> str:
+    """
+    Encodes a value as a field of the COPY text format
+
+    Args:
+        value: The Python value
+        srid (int): SRID of the column if it is a geometry column
+    """
+    if value is None:
+        return _NULL
+    if srid is not None:
+        text = copy_geometry(value, srid)
+    elif isinstance(value, bool):
+        text = "t" if value else "f"
+    elif isinstance(value, (datetime, date)):
+        text = value.isoformat()
+    else:
+        text = str(value)
+    return text.translate(_ESCAPES)
+
+
+def copy_lines(
+    rows: Iterable[dict], columns: list[str], srids: dict[str, int]
+) -> Iterator[str]:
+    """
+    Yields the rows as lines of the COPY text format
+
+    Args:
+        rows: The rows to encode
+        columns: Names of the columns, in COPY order
+        srids: SRID of each geometry column
+    """
+    for row in rows:
+        yield "\t".join(
+            copy_value(row.get(name), srids.get(name)) for name in columns
+        ) + "\n"
+
+
+class CopyStream:
+    """
+    File-like object reading the lines of an iterator, so that psycopg2's
+    copy_expert streams the rows without encoding them all up front
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def staging_table_name(table: Type[ModelType]) -> str:
+    return f"{table.__tablename__}_staging"
+
+
+def copy_columns(table: Type[ModelType], rows: list[dict]) -> list[str]:
+    """Names of the table columns present in the rows, in table order"""
+    keys = set().union(*(row.keys() for row in rows))
+    return [name for name in table.__table__.columns.keys() if name in keys]
+
+
+def staging_upsert_statement(
+    table: Type[ModelType],
+    columns: list[str],
+    id_field: str,
+    update_fields: dict,
+) -> Insert:
+    """
+    Builds the statement merging the staging table into `table`
+
+    Args:
+        table: The target SQLAlchemy model
+        columns: Names of the staged columns
+        id_field (str): Column the conflicts are detected on
+        update_fields (dict): SET clauses of ON CONFLICT DO UPDATE, as
+            returned by DataHandler.insert_policy(); when empty, conflicting
+            rows are skipped
+    """
+    staging = table_clause(
+        staging_table_name(table), *(column(c) for c in columns), schema="pg_temp"
+    )
+    stmt = pg_insert(table).from_select(columns, select(*staging.c))
+    if update_fields:
+        return stmt.on_conflict_do_update(index_elements=[id_field], set_=update_fields)
+    return stmt.on_conflict_do_nothing(index_elements=[id_field])
+
+
+def copy_upsert(
+    db: Session,
+    table: Type[ModelType],
+    rows: list[dict],
+    id_field: str,
+    update_fields: dict,
+) -> int:
+    """
+    Loads rows into `table` through a COPY into a temporary staging table,
+    applying the same conflict policy as a multi-row INSERT
+
+    The staging table is dropped at the end of the transaction; the caller
+    is responsible for committing. Rows must already be unique on
+    `id_field` when `update_fields` is non-empty.
+
+    Args:
+        db (Session): A session on a psycopg2 engine
+        table: The target SQLAlchemy model
+        rows: The rows to load, as dictionaries keyed by column name
+        id_field (str): Column the conflicts are detected on
+        update_fields (dict): SET clauses of ON CONFLICT DO UPDATE
+
+    Returns:
+        The number of rows inserted or updated
+
+    Raises:
+        DBAPIError: The SQLAlchemy equivalent of any psycopg2 error raised
+            by the COPY, e.g. IntegrityError or ProgrammingError
+    """
+    columns = copy_columns(table, rows)
+    srids = {
+        name: col.type.srid
+        for name, col in table.__table__.columns.items()
+        if isinstance(col.type, Geometry)
+    }
+    connection = db.connection()
+    preparer = connection.dialect.identifier_preparer
+    target = preparer.format_table(table.__table__)
+    # Qualified so that a permanent table with the same name is never touched
+    staging = f"pg_temp.{preparer.quote(staging_table_name(table))}"
+    column_list = ", ".join(preparer.quote(name) for name in columns)
+
+    # Only the staged columns are created, without constraints or defaults,
+    # so that the target's defaults apply in the final INSERT
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {staging}")
+    connection.exec_driver_sql(
+        f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {target} WITH NO DATA"
+    )
+    copy_sql = f"COPY {staging} ({column_list}) FROM STDIN"
+    dbapi_connection = connection.connection.dbapi_connection
+    if dbapi_connection is None:
+        raise RuntimeError("The database connection of the session was invalidated")
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(copy_sql, CopyStream(copy_lines(rows, columns, srids)))
+        finally:
+            cursor.close()
+    except psycopg2.Error as e:
+        raise DBAPIError.instance(copy_sql, None, e, psycopg2.Error) from e
+
+    result = db.execute(
+        staging_upsert_statement(table, columns, id_field, update_fields)
+    )
+    return result.rowcount
@@ -6,36 +6,110 @@ from dotenv import load_dotenv
 from pathlib import Path
 import json
 from shapely.geometry import shape
-from sqlalchemy import func
+from sqlalchemy import delete, func
+from geoalchemy2 import Geometry
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.postgresql import Insert
 from backend.database.session import get_db
 from backend.api.models.base import ModelType
 from backend.api.models.export_metadata import ExportMetadata
-from shapely.ops import transform
-from pyproj import Transformer
+from backend.api.models.row_hashes import RowHash
+from backend.api.vector_tiles import TILE_LAYERS, tile_query, tiles_covering
+from backend.etl.tile_archive import mbtiles_metadata, write_mbtiles
 from typing import Type, Generator, Optional
 import time
 import logging
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor
+from backend.etl.copy_loader import copy_upsert
+from backend.etl.geojson_stream import GeoJSONStreamWriter
+from backend.etl.geometry import prepare_boundary, transform_geometries
+from backend.etl.rate_limiter import TokenBucket
+from backend.etl.row_diff import RowDiff, diff_rows
 from backend.etl.session_manager import SessionManager
 from backend.etl.request_handler import RequestHandler
 from sqlalchemy.exc import SQLAlchemyError, ProgrammingError, IntegrityError
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    force=True,
-)
+
+def configure_logging() -> None:
+    """
+    Writes the INFO logs of the ETL to stderr; called by the ETL entry
+    points rather than on import, so that importing a data handler does
+    not reconfigure the logging of the API or tests
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+
 
 _SF_BOUNDARY_PATH = "backend/etl/data/sf_boundary.geojson"
 
+BULK_LOAD_METHODS = ("insert", "copy")
+
+
+@lru_cache(maxsize=None)
+def load_sf_boundary():
+    """
+    Loads the San Francisco boundary once per process, prepared for the
+    repeated clipping of every handler
+
+    Raises:
+        FileNotFoundError, json.JSONDecodeError, ValueError: If the
+            boundary geojson is missing, invalid or has no feature
+    """
+    with open(_SF_BOUNDARY_PATH) as f:
+        boundary_geojson = json.load(f)
+    if not boundary_geojson["features"]:
+        raise ValueError("No features found in boundary geojson")
+    return prepare_boundary(shape(boundary_geojson["features"][0]["geometry"]))
+
 
 def get_geojson_prefix():
     return os.getenv("DATA_GEOJSON_PATH", "public/data/")
 
 
+def get_tiles_prefix():
+    return os.getenv("DATA_TILES_PATH", "public/tiles/")
+
+
+def tile_archives_enabled() -> bool:
+    return os.getenv("EXPORT_TILE_ARCHIVES", "false").lower() == "true"
+
+
+def get_bulk_load_method() -> str:
+    return os.getenv("ETL_BULK_LOAD_METHOD", "insert").lower()
+
+
+def row_diffing_enabled() -> bool:
+    return os.getenv("ETL_DIFF_ROWS", "false").lower() == "true"
+
+
+def get_bulk_load_chunking() -> tuple[Optional[int], int, int]:
+    """
+    Returns the rows per chunk (None for a single chunk), rows per
+    statement and number of parallel writers of bulk loads
+    """
+    chunk_size = os.getenv("ETL_CHUNK_SIZE")
+    return (
+        int(chunk_size) if chunk_size else None,
+        int(os.getenv("ETL_ROWS_PER_STATEMENT", "1000")),
+        int(os.getenv("ETL_PARALLEL_WRITERS", "1")),
+    )
+
+
+def get_tile_archive_zoom_range() -> tuple[int, int]:
+    return (
+        int(os.getenv("TILE_ARCHIVE_MIN_ZOOM", "10")),
+        int(os.getenv("TILE_ARCHIVE_MAX_ZOOM", "16")),
+    )
+
+
 class DataHandler(ABC):
     """
     Abstract base class for handling data operations with an external
@@ -46,8 +120,32 @@ class DataHandler(ABC):
         page_size (int): Number of records to fetch per page.
         session: Optional pre-configured requests session
         logger: Optional logger instance
+        max_concurrent_requests (int): Number of pages fetched
+            concurrently when the total count is known; 1 fetches pages
+            one after another
+        requests_per_second (float): Maximum average request rate
+        bulk_load_method (str): "insert" to load rows with multi-row
+            INSERT statements, or "copy" to stream them with COPY into a
+            staging table; defaults to ETL_BULK_LOAD_METHOD
+        chunk_size (int): Number of rows written per transaction by
+            bulk_insert_data; defaults to ETL_CHUNK_SIZE, or all rows in
+            one transaction
+        rows_per_statement (int): Number of rows per INSERT statement
+            within a chunk; defaults to ETL_ROWS_PER_STATEMENT, or 1000
+        parallel_writers (int): Number of chunks written concurrently,
+            each over its own pooled connection; defaults to
+            ETL_PARALLEL_WRITERS, or 1
     """
 
+    # Name of the vector tile layer of the dataset, see
+    # backend.api.vector_tiles.TILE_LAYERS. Datasets without a layer are
+    # not exported as tile archives
+    tile_layer: Optional[str] = None
+
+    # Columns left out of the content hash of change-data diffing, such as
+    # load timestamps that change on every run without the data changing
+    diff_ignored_fields: tuple[str, ...] = ()
+
     def __init__(
         self,
         url: str,
@@ -55,6 +153,12 @@ class DataHandler(ABC):
         page_size: int = 1000,
         session: Optional[requests.Session] = None,
         logger: Optional[logging.Logger] = None,
+        max_concurrent_requests: int = 1,
+        requests_per_second: float = 1.0,
+        bulk_load_method: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        rows_per_statement: Optional[int] = None,
+        parallel_writers: Optional[int] = None,
     ):
         self.url = url
         self.table = table
@@ -63,12 +167,24 @@ class DataHandler(ABC):
         self.logger = logger or logging.getLogger(f"{self.__class__.__name__}")
         self.session = session or SessionManager.create_session(self.logger)
         self.request_handler = RequestHandler(self.session, self.logger)
+        # Set when the session is shared with other handlers, which then
+        # leave closing it to its owner
+        self.keep_session_open = False
+        # Seconds spent in each stage of the pipeline, see _timed
+        self.stage_timings: dict[str, float] = defaultdict(float)
+        self.max_concurrent_requests = max(1, max_concurrent_requests)
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.bulk_load_method = bulk_load_method or get_bulk_load_method()
+        if self.bulk_load_method not in BULK_LOAD_METHODS:
+            raise ValueError(f"Unknown bulk load method: {self.bulk_load_method}")
+        default_chunking = get_bulk_load_chunking()
+        self.chunk_size = chunk_size or default_chunking[0]
+        self.rows_per_statement = rows_per_statement or default_chunking[1]
+        self.parallel_writers = max(1, parallel_writers or default_chunking[2])
+        self.diff_enabled = row_diffing_enabled()
+        self.last_diff: Optional[RowDiff] = None
         try:
-            with open(_SF_BOUNDARY_PATH) as f:
-                boundary_geojson = json.load(f)
-            if not boundary_geojson["features"]:
-                raise ValueError("No features found in boundary geojson")
-            self.boundary = shape(boundary_geojson["features"][0]["geometry"])
+            self.boundary = load_sf_boundary()
         except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
             self.logger.error(f"Failed to load boundary geojson: {e}")
             raise
@@ -77,26 +193,73 @@ class DataHandler(ABC):
             f"Initialized handler for {table.__name__} "
             f"with URL: {url}, "
             f"page size: {page_size}, "
+            f"concurrent requests: {self.max_concurrent_requests}, "
+            f"requests per second: {requests_per_second}, "
+            f"bulk load method: {self.bulk_load_method}, "
+            f"chunk size: {self.chunk_size}, "
+            f"rows per statement: {self.rows_per_statement}, "
+            f"parallel writers: {self.parallel_writers}, "
             f"session: {session}"
         )
 
-    def _yield_data(self, params: Optional[dict] = None) -> Generator:
+    def _page_params(self, offset: int) -> dict:
         """
-        Yield paginated data from API.
+        Pagination parameters of the page starting at `offset`. Defaults
+        to Socrata's; override for APIs paginating differently.
+        """
+        return {"$offset": offset, "$limit": self.page_size}
+
+    def _fetch_total_count(self, params: Optional[dict] = None) -> Optional[int]:
+        """
+        Total number of records matching `params`, used to fetch pages
+        concurrently. Defaults to a Socrata `count(*)` query on the JSON
+        endpoint; override for other APIs.
+
+        Returns:
+            The number of records, or None if it could not be determined
+        """
+        count_params = {
+            key: value
+            for key, value in (params or {}).items()
+            if key in ("$where", "$q")
+        }
+        count_params["$select"] = "count(*)"
+        try:
+            data = self.request_handler.make_request(
+                self.url.replace(".geojson", ".json"), count_params
+            )
+            return int(data[0]["count"])
+        except Exception as e:
+            self.logger.warning(
+                f"{self.table.__name__}: Could not get the total count, "
+                f"fetching pages sequentially: {e}"
+            )
+            return None
+
+    def _fetch_page(self, params: Optional[dict], offset: int) -> tuple[list, float]:
+        """
+        Fetch the page starting at `offset`, once the rate limiter allows it.
+        Returns:
+            The features of the page and the request time in seconds
+        """
+        paginated_params = params.copy() if params else {}
+        paginated_params.update(self._page_params(offset))
+
+        self.rate_limiter.acquire()
+        start_time = time.time()
+        data = self.request_handler.make_request(self.url, paginated_params)
+        return data.get("features", []), time.time() - start_time
+
+    def _yield_pages_sequentially(
+        self, params: Optional[dict], offset: int = 0, page_num: int = 1
+    ) -> Generator:
+        """
+        Yield pages one after another until an empty or partial page.
         Yields:
             Feature data from each page
         """
-        offset = 0
-        page_num = 1
-
         while True:
-            paginated_params = params.copy() if params else {}
-            paginated_params.update({"$offset": offset, "$limit": self.page_size})
-
-            start_time = time.time()
-            data = self.request_handler.make_request(self.url, paginated_params)
-            features = data.get("features", [])
-            request_time = time.time() - start_time
+            features, request_time = self._fetch_page(params, offset)
 
             if not features:
                 self.logger.info(
@@ -126,7 +289,90 @@ class DataHandler(ABC):
 
             offset += len(features)
             page_num += 1
-            time.sleep(1)
+
+    def _yield_pages_concurrently(
+        self, params: Optional[dict], total_count: int
+    ) -> Generator[list, None, Optional[tuple[int, int]]]:
+        """
+        Yield the pages covering `total_count` records in order, while
+        up to `max_concurrent_requests` of the next pages are fetched
+        in the background.
+        Yields:
+            Feature data from each page
+        Returns:
+            The offset and page number to continue from if every page was
+            full, in case records were added while fetching, else None
+        """
+        offsets = iter(range(0, total_count, self.page_size))
+        pending: deque[tuple[int, Future[tuple[list, float]]]] = deque()
+        self.logger.info(
+            f"{self.table.__name__}: Fetching {total_count} records with up to "
+            f"{self.max_concurrent_requests} concurrent requests"
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_requests) as executor:
+
+            def prefetch_next():
+                offset = next(offsets, None)
+                if offset is not None:
+                    future = executor.submit(self._fetch_page, params, offset)
+                    pending.append((offset, future))
+
+            try:
+                for _ in range(self.max_concurrent_requests):
+                    prefetch_next()
+
+                page_num = 0
+                while pending:
+                    offset, future = pending.popleft()
+                    features, request_time = future.result()
+                    prefetch_next()
+                    page_num += 1
+
+                    if len(features) < self.page_size:
+                        self.logger.info(
+                            f"{self.table.__name__}: Completed pagination. "
+                            f"Final stats: Pages={page_num}, "
+                            f"Total Features={offset + len(features)}, "
+                            f"Last Offset={offset}, "
+                            f"Request time: {request_time:.2f}s"
+                        )
+                        if features:
+                            yield features
+                        return None
+
+                    yield features
+                    self.logger.info(
+                        f"{self.table.__name__}: Retrieved {len(features)} features on page {page_num}. "
+                        f"Offset: {offset}, "
+                        f"Request time: {request_time:.2f}s"
+                    )
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+        return total_count, page_num + 1
+
+    def _yield_data(self, params: Optional[dict] = None) -> Generator:
+        """
+        Yield paginated data from API.
+
+        With `max_concurrent_requests` > 1 and a known total count, the
+        next pages are prefetched concurrently; pages are still yielded
+        in order. Requests are paced by the rate limiter in both modes.
+        Yields:
+            Feature data from each page
+        """
+        if self.max_concurrent_requests > 1:
+            total_count = self._fetch_total_count(params)
+            if total_count is not None:
+                resume = yield from self._yield_pages_concurrently(params, total_count)
+                if resume is None:
+                    return
+                yield from self._yield_pages_sequentially(params, *resume)
+                return
+
+        yield from self._yield_pages_sequentially(params)
 
     def fetch_data(self, params: Optional[dict] = None) -> dict:
         """
@@ -152,8 +398,32 @@ class DataHandler(ABC):
             self.logger.error(f"Data fetch failed: {str(e)}", exc_info=True)
             raise
         finally:
-            self.session.close()
-            self.logger.info("Closed session")
+            self._close_session()
+
+    @contextmanager
+    def _timed(self, stage: str):
+        """Adds the time spent in the block to the stage's timing"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_timings[stage] += time.perf_counter() - start
+
+    def _timed_pages(self, params: Optional[dict] = None) -> Generator:
+        """Yields the pages of _yield_data, timing their fetch"""
+        pages = self._yield_data(params)
+        while True:
+            with self._timed("fetch"):
+                features = next(pages, None)
+            if features is None:
+                return
+            yield features
+
+    def _close_session(self) -> None:
+        if self.keep_session_open:
+            return
+        self.session.close()
+        self.logger.info("Closed session")
 
     def transform_geometry(self, geometry, source_srid, target_srid=4326):
         """
@@ -161,7 +431,8 @@ class DataHandler(ABC):
         pyproj
 
         Args:
-            geometry: The geometry object (Point, Polygon or MultiPolygon)
+            geometry: The geometry object (Point, Polygon or MultiPolygon),
+                or an array of geometries
             source_srid: The original SRID of the geometry
             target_srid: The target SRID for the transformation,
                          default is 4326
@@ -169,13 +440,7 @@ class DataHandler(ABC):
         Returns:
             The transformed geometry.
         """
-        # Set up the transformer using pyproj
-        transformer = Transformer.from_crs(
-            f"EPSG:{source_srid}", f"EPSG:{target_srid}", always_xy=True
-        )
-
-        # Transform the geometry
-        return transform(transformer.transform, geometry)
+        return transform_geometries(geometry, source_srid, target_srid)
 
     @abstractmethod
     def parse_data(self, data: dict) -> tuple[list[dict], dict]:
@@ -195,7 +460,7 @@ class DataHandler(ABC):
         conflicts based on the defined policy.
 
         This method is designed to efficiently insert multiple rows into the
-        database in a single operation. It supports conflict resolution by either
+        database in a few large statements. It supports conflict resolution by either
         updating existing records or doing nothing if a conflict is detected.
 
         Args:
@@ -219,12 +484,17 @@ class DataHandler(ABC):
             `insert_policy` method.
             3. If the conflict policy involves updating existing records,
             deduplicate the data based on the `id_field`.
-            4. Open a database session using the `db_getter` function.
-            5. Create an SQL insert statement using SQLAlchemy's `pg_insert`
-            function.
+            4. Split the data into chunks of `chunk_size` rows, written one
+            after another or by `parallel_writers` threads.
+            5. For each chunk, open a database session using the `db_getter`
+            function and create an SQL insert statement using SQLAlchemy's
+            `pg_insert` function, or with the "copy" bulk load method, COPY
+            the rows into a staging table and insert them from there (see
+            backend.etl.copy_loader).
             6. Modify the insert statement to handle conflicts based on the
             conflict policy.
-            7. Execute the insert statement and commit the transaction.
+            7. Execute the insert statement and commit the chunk's
+            transaction.
             8. Catch and log any exceptions that occur during the process.
 
         Usage Examples:
@@ -248,6 +518,9 @@ class DataHandler(ABC):
             behavior.
             - The method ensures that the database session is properly closed
             after the operation, even if an exception occurs.
+            - Each chunk is committed on its own: when a chunk fails, the
+            chunks written before it stay committed. Rows are deduplicated
+            before chunking, so parallel writers never update the same row.
         """
         if not data_dicts:
             self.logger.warning(f"{self.table.__name__}: No data to insert")
@@ -260,23 +533,32 @@ class DataHandler(ABC):
                 seen[item[id_field]] = item
             data_dicts = list(seen.values())
 
-        try:
-            with next(self.db_getter()) as db:
-                stmt = pg_insert(self.table).values(data_dicts)
+        chunk_size = self.chunk_size or len(data_dicts)
+        chunks = [
+            data_dicts[offset : offset + chunk_size]
+            for offset in range(0, len(data_dicts), chunk_size)
+        ]
 
-                if update_fields:
-                    stmt = stmt.on_conflict_do_update(
-                        index_elements=[id_field], set_=update_fields
-                    )
-                else:
-                    stmt = stmt.on_conflict_do_nothing(index_elements=[id_field])
-
-                db.execute(stmt)
-                db.commit()
-                self.logger.info(
-                    f"{self.table.__name__}: Inserted {len(data_dicts)} rows with "
-                    f"{'update' if update_fields else 'do nothing'} conflict policy."
-                )
+        try:
+            if self.parallel_writers > 1 and len(chunks) > 1:
+                with ThreadPoolExecutor(max_workers=self.parallel_writers) as executor:
+                    futures = [
+                        executor.submit(
+                            self._write_chunk, chunk, id_field, update_fields
+                        )
+                        for chunk in chunks
+                    ]
+                    for future in futures:
+                        future.result()
+            else:
+                for chunk in chunks:
+                    self._write_chunk(chunk, id_field, update_fields)
+            self.logger.info(
+                f"{self.table.__name__}: Inserted {len(data_dicts)} rows in "
+                f"{len(chunks)} chunks with "
+                f"{'update' if update_fields else 'do nothing'} conflict policy "
+                f"using {self.bulk_load_method}."
+            )
 
         except ProgrammingError as e:
             self.logger.error(f"Schema error in {self.table.__name__}: {str(e)}")
@@ -290,6 +572,37 @@ class DataHandler(ABC):
             self.logger.error(f"Database error in {self.table.__name__}: {str(e)}")
             raise
 
+    def _write_chunk(
+        self, data_dicts: list[dict], id_field: str, update_fields: dict
+    ) -> None:
+        """
+        Writes one chunk of rows in its own session and transaction
+
+        With the "insert" method, the rows are sent as an executemany of a
+        single INSERT ... ON CONFLICT statement, which SQLAlchemy pages into
+        multi-row statements of `rows_per_statement` rows.
+        """
+        with next(self.db_getter()) as db:
+            if self.bulk_load_method == "copy":
+                copy_upsert(db, self.table, data_dicts, id_field, update_fields)
+            else:
+                stmt = pg_insert(self.table)
+
+                if update_fields:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[id_field], set_=update_fields
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=[id_field])
+
+                db.execute(
+                    stmt.execution_options(
+                        insertmanyvalues_page_size=self.rows_per_statement
+                    ),
+                    data_dicts,
+                )
+            db.commit()
+
     def insert_policy(self) -> dict:
         """
         Defines conflict handling for bulk_insert_data() method.
@@ -328,13 +641,20 @@ class DataHandler(ABC):
         """Default behavior: Do nothing on conflict. Override in subclasses."""
         return {}
 
-    def _get_last_export_time_from_db(self):
-        """Get last geojson export time from database"""
+    def _get_last_export_time_from_db(self, dataset_name: Optional[str] = None):
+        """
+        Get last export time from database
+
+        Args:
+            dataset_name: Name the export is tracked under, the table name
+                (the geojson export) by default
+        """
+        dataset_name = dataset_name or self.table.__name__
         try:
             with next(self.db_getter()) as db:
                 row = (
                     db.query(ExportMetadata)
-                    .filter_by(dataset_name=self.table.__name__)
+                    .filter_by(dataset_name=dataset_name)
                     .first()
                 )
                 if row:
@@ -370,30 +690,39 @@ class DataHandler(ABC):
             )
             return True  # assume that data has changed if we can't track the changes
 
-    def _update_last_export_time_in_db(self) -> None:
-        """Update last export time in database"""
+    def _update_last_export_time_in_db(
+        self, dataset_name: Optional[str] = None
+    ) -> None:
+        """
+        Update last export time in database
+
+        Args:
+            dataset_name: Name the export is tracked under, the table name
+                (the geojson export) by default
+        """
+        dataset_name = dataset_name or self.table.__name__
         try:
             with next(self.db_getter()) as db:
                 row = (
                     db.query(ExportMetadata)
-                    .filter_by(dataset_name=self.table.__name__)
+                    .filter_by(dataset_name=dataset_name)
                     .first()
                 )
                 now = datetime.now(timezone.utc)
                 if row:
-                    self.logger.info(f"Updating existing row for {self.table.__name__}")
+                    self.logger.info(f"Updating existing row for {dataset_name}")
                     row.last_exported_at = now
                 else:
-                    self.logger.info(f"Creating new row for {self.table.__name__}")
+                    self.logger.info(f"Creating new row for {dataset_name}")
                     row = ExportMetadata(
-                        dataset_name=self.table.__name__, last_exported_at=now
+                        dataset_name=dataset_name, last_exported_at=now
                     )
                     db.add(row)
                 db.commit()
-            self.logger.info(f"Updated export metadata for {self.table.__name__}")
+            self.logger.info(f"Updated export metadata for {dataset_name}")
         except SQLAlchemyError as e:
             self.logger.warning(
-                f"Failed to update export metadata for {self.table.__name__}: {e}"
+                f"Failed to update export metadata for {dataset_name}: {e}"
             )
 
     def _save_geojson_file(self, features: dict, geojson_path: Path) -> None:
@@ -411,6 +740,36 @@ class DataHandler(ABC):
             self.logger.error(f"Failed to write GeoJSON: {e}")
             raise
 
+    def _geojson_export_path(self) -> Path:
+        """Path of the dataset's geojson in the public/data folder"""
+        geojson_path = Path(f"{get_geojson_prefix()}{self.table.__name__}.geojson")
+        geojson_path.parent.mkdir(parents=True, exist_ok=True)
+        return geojson_path
+
+    def _should_export_geojson(self, geojson_path: Path) -> bool:
+        """
+        Decide whether the geojson file should be (re)written.
+        - Locally: Only if the file doesn't exist
+        - ETL (production): Only if data changed since last export
+        """
+        if os.getenv("ENVIRONMENT") != "prod":
+            # Local behavior: only save if file doesn't exist
+            if geojson_path.exists():
+                self.logger.info(
+                    f"GeoJSON {geojson_path.name} already exists locally, skipping write"
+                )
+                return False
+            self.logger.info(f"GeoJSON {geojson_path.name} doesn't exist, creating it")
+            return True
+
+        # Production behavior: check if data changed since last export
+        self.logger.info("Check if geojsons should be updated in production")
+        last_export_time = self._get_last_export_time_from_db()
+        if self._data_changed_since_last_export(last_export_time):
+            return True
+        self.logger.info(f"GeoJSON {geojson_path.name} unchanged, skipping write")
+        return False
+
     def export_geojson_if_changed(self, features: dict) -> None:
         """
         Write the geojson file to the public/data folder. The geojson is a static asset that is displayed on the map in the app.
@@ -418,33 +777,258 @@ class DataHandler(ABC):
         - ETL (production): Check if data changed since last export
         """
         try:
-            geojson_path = Path(f"{get_geojson_prefix()}{self.table.__name__}.geojson")
-            geojson_path.parent.mkdir(parents=True, exist_ok=True)
+            geojson_path = self._geojson_export_path()
+            if self._should_export_geojson(geojson_path):
+                self._save_geojson_file(features, geojson_path)
+                if os.getenv("ENVIRONMENT") == "prod":
+                    self._update_last_export_time_in_db()
+        except Exception as e:
+            self.logger.warning(f"Exception in export_geojson_if_changed: {e}")
+            raise
 
-            if os.getenv("ENVIRONMENT") != "prod":
-                # Local behavior: only save if file doesn't exist
-                if geojson_path.exists():
+    def stream_data(
+        self, id_field: str, params: Optional[dict] = None, export_geojson: bool = True
+    ) -> int:
+        """
+        Streaming pipeline: each fetched page is parsed, upserted and
+        appended to the geojson export before the next page is handled,
+        so memory use is bounded by the page size rather than the size
+        of the dataset.
+
+        The geojson export follows the same rules as
+        export_geojson_if_changed and is decided before any row is
+        written. The file is replaced only once every page went through.
+
+        With ETL_DIFF_ROWS=true, each parsed row is hashed and only rows
+        whose hash differs from the one stored by the previous run are
+        written. Rows that were stored but no longer appear in the source
+        are deleted once every page went through, and a summary of the
+        changes is logged and kept in `last_diff`.
+
+        Args:
+            id_field (str): The field identifying unique records, as in
+                bulk_insert_data
+            params: Optional query parameters of the API
+            export_geojson (bool): Whether to write the geojson export
+
+        Returns:
+            The number of rows upserted, or with diffing, the number of
+            rows inserted or updated
+        """
+        self.logger.info(
+            f"Starting streaming pipeline for {self.table.__name__} "
+            f"with params: {params}"
+        )
+        geojson_path = self._geojson_export_path() if export_geojson else None
+        geojson_writer = (
+            GeoJSONStreamWriter(geojson_path)
+            if geojson_path is not None and self._should_export_geojson(geojson_path)
+            else None
+        )
+        total_rows = 0
+        start_time = time.time()
+        diff = RowDiff() if self.diff_enabled else None
+        stored_hashes = self._load_row_hashes() if diff else {}
+        seen_ids: set[str] = set()
+
+        try:
+            with geojson_writer if geojson_writer is not None else nullcontext():
+                for page_num, features in enumerate(self._timed_pages(params), start=1):
+                    with self._timed("parse"):
+                        rows, geojson = self.parse_data({"features": features})
+                    if diff:
+                        with self._timed("diff"):
+                            seen_ids.update(str(row[id_field]) for row in rows)
+                            rows, new_hashes = diff_rows(
+                                rows,
+                                id_field,
+                                stored_hashes,
+                                diff,
+                                self._geometry_columns(),
+                                self.diff_ignored_fields,
+                            )
+                    with self._timed("load"):
+                        if rows:
+                            self.bulk_insert_data(rows, id_field)
+                        if diff and new_hashes:
+                            self._save_row_hashes(new_hashes)
+                            stored_hashes.update(new_hashes)
+                    if geojson_writer is not None:
+                        with self._timed("export"):
+                            geojson_writer.write_features(geojson["features"])
+                    total_rows += len(rows)
                     self.logger.info(
-                        f"GeoJSON {geojson_path.name} already exists locally, skipping write"
+                        f"{self.table.__name__}: Page {page_num} streamed, "
+                        f"{len(features)} features fetched, {len(rows)} rows upserted"
                     )
-                    return
-                else:
+            if diff:
+                diff.deleted = sorted(set(stored_hashes) - seen_ids)
+                if diff.deleted and seen_ids:
+                    self._delete_rows(diff.deleted, id_field)
+                elif diff.deleted:
+                    self.logger.warning(
+                        f"{self.table.__name__}: The source returned no rows, "
+                        f"keeping the {len(diff.deleted)} stored rows"
+                    )
+                    diff.deleted = []
+                self.last_diff = diff
+                self.logger.info(
+                    f"{self.table.__name__}: Diff summary: {diff.summary()}"
+                )
+        except Exception as e:
+            self.logger.error(f"Streaming pipeline failed: {str(e)}", exc_info=True)
+            raise
+        finally:
+            self._close_session()
+
+        if geojson_writer is not None:
+            self.logger.info(
+                f"Generated {geojson_writer.path} with "
+                f"{geojson_writer.feature_count} features"
+            )
+            if os.getenv("ENVIRONMENT") == "prod":
+                self._update_last_export_time_in_db()
+
+        self.logger.info(
+            f"{self.table.__name__}: Streamed {total_rows} rows "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return total_rows
+
+    def _geometry_columns(self) -> list[str]:
+        return [
+            name
+            for name, column in self.table.__table__.columns.items()
+            if isinstance(column.type, Geometry)
+        ]
+
+    def _load_row_hashes(self) -> dict[str, str]:
+        """
+        Load the content hashes stored by the previous run, keyed by row id.
+        The hashes table is created with the schema by init_db.py. When the
+        dataset's table is empty, e.g. after it was recreated, the stored
+        hashes are discarded so that every row is written again.
+        """
+        dataset_name = self.table.__name__
+        with next(self.db_getter()) as db:
+            if db.query(self.table).first() is None:
+                db.execute(delete(RowHash).where(RowHash.dataset_name == dataset_name))
+                db.commit()
+                return {}
+            hashes = dict(
+                db.query(RowHash.row_id, RowHash.content_hash).filter(
+                    RowHash.dataset_name == dataset_name
+                )
+            )
+        self.logger.info(f"{dataset_name}: Loaded {len(hashes)} row hashes")
+        return hashes
+
+    def _save_row_hashes(self, hashes: dict[str, str]) -> None:
+        """Store the content hashes of the rows written, keyed by row id"""
+        stmt = pg_insert(RowHash)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RowHash.dataset_name, RowHash.row_id],
+            set_={"content_hash": stmt.excluded.content_hash, "updated_at": func.now()},
+        )
+        with next(self.db_getter()) as db:
+            db.execute(
+                stmt,
+                [
+                    {
+                        "dataset_name": self.table.__name__,
+                        "row_id": row_id,
+                        "content_hash": content_hash,
+                    }
+                    for row_id, content_hash in hashes.items()
+                ],
+            )
+            db.commit()
+
+    def _delete_rows(self, row_ids: list[str], id_field: str) -> None:
+        """Delete the rows that are no longer in the source, and their hashes"""
+        column = self.table.__table__.columns[id_field]
+        ids = [column.type.python_type(row_id) for row_id in row_ids]
+        with next(self.db_getter()) as db:
+            db.execute(delete(self.table).where(column.in_(ids)))
+            db.execute(
+                delete(RowHash).where(
+                    RowHash.dataset_name == self.table.__name__,
+                    RowHash.row_id.in_(row_ids),
+                )
+            )
+            db.commit()
+        self.logger.info(f"{self.table.__name__}: Deleted {len(row_ids)} rows")
+
+    def _save_tile_archive(self, archive_path: Path) -> None:
+        """
+        Render the vector tiles of the dataset covering San Francisco
+        in PostGIS and write them to an MBTiles archive. Empty tiles are
+        left out of the archive.
+        """
+        tile_layer = self.tile_layer
+        if tile_layer is None:
+            raise ValueError(f"{self.table.__name__} has no tile layer")
+        layer = TILE_LAYERS[tile_layer]
+        min_zoom, max_zoom = get_tile_archive_zoom_range()
+        bounds = self.boundary.bounds
+        start_time = time.time()
+
+        with next(self.db_getter()) as db:
+
+            def rendered_tiles():
+                for z in range(min_zoom, max_zoom + 1):
+                    for x, y in tiles_covering(bounds, z):
+                        tile = db.execute(
+                            tile_query(tile_layer, layer, z, x, y)
+                        ).scalar()
+                        if tile:
+                            yield z, x, y, bytes(tile)
+
+            count = write_mbtiles(
+                archive_path,
+                rendered_tiles(),
+                mbtiles_metadata(tile_layer, layer, bounds, min_zoom, max_zoom),
+            )
+
+        self.logger.info(
+            f"Generated {archive_path} with {count} tiles "
+            f"(zoom {min_zoom}-{max_zoom}) in {time.time() - start_time:.2f}s"
+        )
+
+    def export_tiles_if_changed(self) -> None:
+        """
+        Write an MBTiles archive of the dataset's vector tiles to the
+        public/tiles folder, when EXPORT_TILE_ARCHIVES is true. The tiles
+        are rendered from the database, so this runs after bulk_insert_data.
+        - Locally: Only save if file doesn't exist
+        - ETL (production): Check if data changed since last tile export
+        """
+        if self.tile_layer is None or not tile_archives_enabled():
+            return
+
+        try:
+            archive_path = Path(f"{get_tiles_prefix()}{self.table.__name__}.mbtiles")
+            archive_path.parent.mkdir(parents=True, exist_ok=True)
+
+            if os.getenv("ENVIRONMENT") != "prod":
+                if archive_path.exists():
                     self.logger.info(
-                        f"GeoJSON {geojson_path.name} doesn't exist, creating it"
+                        f"Tile archive {archive_path.name} already exists locally, skipping write"
                     )
-                    self._save_geojson_file(features, geojson_path)
-                    return
+                else:
+                    self._save_tile_archive(archive_path)
+                return
 
-            # Production behavior: check if data changed since last export
-            self.logger.info("Check if geojsons should be updated in production")
-            last_export_time = self._get_last_export_time_from_db()
+            # Tracked separately from the geojson export, which runs first
+            dataset_name = archive_path.name
+            last_export_time = self._get_last_export_time_from_db(dataset_name)
             if self._data_changed_since_last_export(last_export_time):
-                self._save_geojson_file(features, geojson_path)
-                self._update_last_export_time_in_db()
+                self._save_tile_archive(archive_path)
+                self._update_last_export_time_in_db(dataset_name)
             else:
                 self.logger.info(
-                    f"GeoJSON {geojson_path.name} unchanged, skipping write"
+                    f"Tile archive {archive_path.name} unchanged, skipping write"
                 )
         except Exception as e:
-            self.logger.warning(f"Exception in export_geojson_if_changed: {e}")
+            self.logger.warning(f"Exception in export_tiles_if_changed: {e}")
             raise
@@ -0,0 +1,262 @@
+"""
+Caches of the Mapbox geocoding results of the soft story addresses.
+
+The SQLite cache looks addresses up by primary key and only writes the
+new results of a run, instead of loading and rewriting the whole cache.
+Its results can expire after a time to live, so that addresses are
+geocoded again once Mapbox may have better results for them.
+"""
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+from backend.etl.address_normalizer import address_key
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Tuple[float, float]
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    address TEXT PRIMARY KEY,
+    longitude REAL,
+    latitude REAL,
+    geocoded_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def get_geocode_cache_path() -> Path:
+    return Path(
+        os.getenv("GEOCODE_CACHE_PATH", "backend/etl/data/geocode_cache.sqlite")
+    )
+
+
+def get_geocode_cache_ttl() -> Optional[float]:
+    """
+    Time to live of the geocoding results in seconds, set in days by
+    GEOCODE_CACHE_TTL_DAYS; results never expire by default
+    """
+    ttl_days = os.getenv("GEOCODE_CACHE_TTL_DAYS")
+    return float(ttl_days) * 86400 if ttl_days else None
+
+
+class GeocodeCache(ABC):
+    """
+    Maps addresses to their coordinates, or to None for the addresses
+    Mapbox could not resolve
+    """
+
+    @abstractmethod
+    def lookup(self, address: str) -> Tuple[bool, Optional[Coordinates]]:
+        """
+        Returns whether the address is cached, and its coordinates if
+        it is
+        """
+
+    @abstractmethod
+    def add(self, results: Mapping[str, Optional[Coordinates]]) -> None:
+        """Caches geocoding results, replacing those of the same addresses"""
+
+    def __contains__(self, address: str) -> bool:
+        return self.lookup(address)[0]
+
+    def get(self, address: str) -> Optional[Coordinates]:
+        return self.lookup(address)[1]
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryGeocodeCache(GeocodeCache):
+    """A cache kept in memory for the lifetime of the process"""
+
+    def __init__(self, results: Optional[Mapping[str, Optional[Coordinates]]] = None):
+        self._results: Dict[str, Optional[Coordinates]] = {}
+        self.add(results or {})
+
+    def lookup(self, address: str) -> Tuple[bool, Optional[Coordinates]]:
+        key = address_key(address)
+        return key in self._results, self._results.get(key)
+
+    def add(self, results: Mapping[str, Optional[Coordinates]]) -> None:
+        for address, coordinates in results.items():
+            self._results[address_key(address)] = coordinates
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+
+class SQLiteGeocodeCache(GeocodeCache):
+    """
+    A cache stored in a SQLite file, keyed by the address_key of the
+    addresses
+
+    The connection is shared by the threads of the process under a lock.
+
+    Args:
+        path: Path of the SQLite file, created if missing
+        ttl: Seconds after which results expire and are treated as not
+            cached; None keeps them forever
+        clock: Wall clock of the result timestamps, overridable in tests
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SQLITE_SCHEMA)
+
+    def _expired_before(self) -> float:
+        return self._clock() - self.ttl if self.ttl is not None else float("-inf")
+
+    def lookup(self, address: str) -> Tuple[bool, Optional[Coordinates]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT longitude, latitude FROM geocodes "
+                "WHERE address = ? AND geocoded_at >= ?",
+                (address_key(address), self._expired_before()),
+            ).fetchone()
+        if row is None:
+            return False, None
+        longitude, latitude = row
+        if longitude is None or latitude is None:
+            return True, None
+        return True, (longitude, latitude)
+
+    def add(
+        self,
+        results: Mapping[str, Optional[Coordinates]],
+        geocoded_at: Optional[float] = None,
+    ) -> None:
+        """
+        Caches geocoding results, replacing those of the same addresses
+
+        Args:
+            results: Coordinates of each address, None if unresolved
+            geocoded_at: Timestamp of the results, defaults to now
+        """
+        geocoded_at = self._clock() if geocoded_at is None else geocoded_at
+        rows = [
+            (
+                address_key(address),
+                coordinates[0] if coordinates else None,
+                coordinates[1] if coordinates else None,
+                geocoded_at,
+            )
+            for address, coordinates in results.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO geocodes VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (address) DO UPDATE SET "
+                "longitude = excluded.longitude, latitude = excluded.latitude, "
+                "geocoded_at = excluded.geocoded_at",
+                rows,
+            )
+
+    def invalidate(self, addresses: Iterable[str]) -> None:
+        """Removes the results of the addresses, to geocode them again"""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM geocodes WHERE address = ?",
+                [(address_key(address),) for address in addresses],
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Removes the expired results from the file
+
+        Returns:
+            The number of results removed
+        """
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM geocodes WHERE geocoded_at < ?",
+                (self._expired_before(),),
+            ).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT count(*) FROM geocodes").fetchone()[
+                0
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def read_geojson_results(geojson_path: Path) -> Dict[str, Optional[Coordinates]]:
+    """
+    Reads the geocoding results of a gzipped GeoJSON cache, as written
+    before the SQLite cache
+
+    Raises:
+        ValueError: If a feature has no sfdata_address property
+    """
+    with gzip.open(geojson_path, "rt") as f:
+        soft_story_json = json.load(f)
+
+    results: Dict[str, Optional[Coordinates]] = {}
+    for feature in soft_story_json.get("features", []):
+        properties = feature.get("properties", {})
+        address = properties.get("sfdata_address")
+        if address is None:
+            raise ValueError("No address found in geojson's 'properties' field")
+        if "coordinates" not in properties:
+            results[address] = None
+        else:
+            results[address] = (
+                float(properties["coordinates"]["longitude"]),
+                float(properties["coordinates"]["latitude"]),
+            )
+    return results
+
+
+def import_geojson(cache: GeocodeCache, geojson_path: Path) -> int:
+    """
+    Imports the results of a gzipped GeoJSON cache into `cache`
+
+    Returns:
+        The number of addresses imported
+    """
+    results = read_geojson_results(geojson_path)
+    cache.add(results)
+    logger.info(f"Imported {len(results)} geocoded addresses from {geojson_path}")
+    return len(results)
+
+
+def open_geocode_cache(
+    path: Path, geojson_path: Optional[Path] = None, ttl: Optional[float] = None
+) -> SQLiteGeocodeCache:
+    """
+    Opens the SQLite cache at `path`, first importing the GeoJSON cache
+    at `geojson_path` if the SQLite cache does not exist yet
+    """
+    is_new = not path.exists()
+    cache = SQLiteGeocodeCache(path, ttl=ttl)
+    if is_new and geojson_path is not None and geojson_path.exists():
+        try:
+            import_geojson(cache, geojson_path)
+        except Exception:
+            # Leave no partial cache behind, so the import runs again
+            cache.close()
+            path.unlink(missing_ok=True)
+            raise
+    return cache
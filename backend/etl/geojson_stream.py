@@ -0,0 +1,63 @@
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional, TextIO
+
+_HEADER = '{"type": "FeatureCollection", "features": ['
+_FOOTER = "]}"
+_SEPARATOR = ", "
+
+
+class GeoJSONStreamWriter:
+    """
+    Writes a GeoJSON FeatureCollection one batch of features at a time,
+    so that the whole collection never has to be held in memory.
+
+    The output is identical to `json.dump` of the equivalent
+    {"type": "FeatureCollection", "features": [...]} dictionary. It is
+    written next to `path` and moved into place when the writer is
+    closed without error, so readers never see a partial file.
+
+    Usage:
+        with GeoJSONStreamWriter(path) as writer:
+            for page in pages:
+                writer.write_features(page)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(self.path.name + ".partial")
+        self.feature_count = 0
+        self._file: Optional[TextIO] = None
+
+    def _open_file(self) -> TextIO:
+        if self._file is None:
+            raise RuntimeError("GeoJSONStreamWriter is used outside its with block")
+        return self._file
+
+    def __enter__(self) -> "GeoJSONStreamWriter":
+        self._file = open(self.partial_path, "wt")
+        self._file.write(_HEADER)
+        return self
+
+    def write_features(self, features: Iterable[dict]) -> None:
+        """Appends features to the collection"""
+        file = self._open_file()
+        for feature in features:
+            if self.feature_count:
+                file.write(_SEPARATOR)
+            json.dump(feature, file)
+            self.feature_count += 1
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        file = self._open_file()
+        self._file = None
+        try:
+            if exc_type is None:
+                file.write(_FOOTER)
+        finally:
+            file.close()
+        if exc_type is None:
+            os.replace(self.partial_path, self.path)
+        else:
+            self.partial_path.unlink(missing_ok=True)
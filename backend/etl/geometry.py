@@ -0,0 +1,145 @@
+"""
+Vectorized geometry helpers shared by the ETL handlers, built on the
+shapely 2 array functions so that a whole page of features is parsed,
+reprojected and clipped in a few calls into GEOS and PROJ.
+"""
+
+from functools import lru_cache
+from typing import Iterable
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+
+@lru_cache(maxsize=None)
+def get_transformer(source_srid: int, target_srid: int) -> Transformer:
+    """
+    Returns the transformer between two EPSG codes, created once per
+    process and shared by all handlers
+
+    pyproj transformers are thread-safe, so the cached instances can be
+    used by concurrent handlers.
+    """
+    return Transformer.from_crs(
+        f"EPSG:{source_srid}", f"EPSG:{target_srid}", always_xy=True
+    )
+
+
+def transform_geometries(geometries, source_srid: int, target_srid: int = 4326):
+    """
+    Reprojects a geometry or an array of geometries
+
+    The coordinates of all the geometries are transformed in a single
+    call to PROJ, instead of point by point as with shapely.ops.transform.
+
+    Args:
+        geometries: A shapely geometry or an array of them
+        source_srid (int): The original SRID of the geometries
+        target_srid (int): The target SRID, default is 4326
+
+    Returns:
+        The transformed geometry or array of geometries
+    """
+    transformer = get_transformer(source_srid, target_srid)
+
+    def transform_coordinates(coordinates: np.ndarray) -> np.ndarray:
+        x, y = transformer.transform(coordinates[:, 0], coordinates[:, 1])
+        return np.column_stack((x, y))
+
+    return shapely.transform(geometries, transform_coordinates)
+
+
+def multipolygons_from_rings(features_rings: Iterable[list]) -> np.ndarray:
+    """
+    Builds one MultiPolygon per feature from ArcGIS-style rings, each
+    ring of at least 4 points becoming a polygon of its own
+
+    Args:
+        features_rings: The list of rings of each feature, each ring
+            being a list of [x, y] coordinates
+
+    Returns:
+        An array with the MultiPolygon of each feature, empty when the
+        feature has no valid ring
+    """
+    coordinates = []
+    ring_indices = []
+    polygon_features: list[int] = []
+    feature_count = 0
+    for feature_index, rings in enumerate(features_rings):
+        feature_count += 1
+        for ring in rings:
+            if len(ring) < 4:
+                continue
+            ring_indices.extend([len(polygon_features)] * len(ring))
+            polygon_features.append(feature_index)
+            coordinates.extend(ring)
+
+    multipolygons = np.full(feature_count, shapely.MultiPolygon(), dtype=object)
+    if not polygon_features:
+        return multipolygons
+    polygons = shapely.polygons(
+        shapely.linearrings(np.asarray(coordinates, dtype=float), indices=ring_indices)
+    )
+    return shapely.multipolygons(polygons, indices=polygon_features, out=multipolygons)
+
+
+def prepare_boundary(boundary):
+    """
+    Prepares a clipping boundary for repeated predicates
+
+    The boundary is prepared in place and its lazily built GEOS indexes
+    are warmed up with one query of each predicate used by
+    clip_to_boundary, so that the prepared boundary can then be shared
+    by concurrent handlers.
+
+    Returns:
+        The prepared boundary
+    """
+    shapely.prepare(boundary)
+    probe = shapely.points(boundary.bounds[:2])
+    shapely.contains(boundary, probe)
+    shapely.intersects(boundary, probe)
+    return boundary
+
+
+def clip_to_boundary(geometries, boundary) -> np.ndarray:
+    """
+    Clips an array of geometries to a boundary, paying for a true
+    intersection only for the geometries straddling it
+
+    Geometries whose bounding box misses the boundary's, or that do not
+    intersect the boundary, become empty. Geometries contained in the
+    boundary are returned unchanged.
+
+    Args:
+        geometries: An array of shapely geometries
+        boundary: The clipping boundary, ideally prepared with
+            prepare_boundary
+
+    Returns:
+        An array of the clipped geometries, empty for those outside
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    clipped = np.full(len(geometries), shapely.GeometryCollection(), dtype=object)
+    if not len(geometries):
+        return clipped
+
+    min_x, min_y, max_x, max_y = boundary.bounds
+    bounds = shapely.bounds(geometries)
+    candidates = np.flatnonzero(
+        (bounds[:, 0] <= max_x)
+        & (bounds[:, 2] >= min_x)
+        & (bounds[:, 1] <= max_y)
+        & (bounds[:, 3] >= min_y)
+    )
+    candidate_geometries = geometries[candidates]
+
+    inside = shapely.contains(boundary, candidate_geometries)
+    clipped[candidates[inside]] = candidate_geometries[inside]
+
+    straddling = ~inside & shapely.intersects(boundary, candidate_geometries)
+    clipped[candidates[straddling]] = shapely.intersection(
+        candidate_geometries[straddling], boundary
+    )
+    return clipped
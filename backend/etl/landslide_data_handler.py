@@ -1,5 +1,5 @@
 from http.client import HTTPException
-from backend.etl.data_handler import DataHandler
+from backend.etl.data_handler import DataHandler, configure_logging
 from backend.api.models.landslide_zones import LandslideZone
 from shapely.geometry import shape
 from geoalchemy2.shape import from_shape
@@ -16,6 +16,8 @@ class LandslideDataHandler(DataHandler):
     landslides
     """
 
+    tile_layer = "landslide"
+
     def parse_data(self, data: dict) -> tuple[list[dict], dict]:
         """
         Parses fetched GeoJSON data and returns:
@@ -58,12 +60,10 @@ class LandslideDataHandler(DataHandler):
 
 
 if __name__ == "__main__":
+    configure_logging()
     handler = LandslideDataHandler(LANDSLIDE_URL, LandslideZone)
     try:
-        lanslide_zones = handler.fetch_data()
-        lanslide_zone_objects, landslide_zone_geojson = handler.parse_data(
-            lanslide_zones
-        )
-        handler.bulk_insert_data(lanslide_zone_objects, "identifier")
+        handler.stream_data("identifier", export_geojson=False)
+        handler.export_tiles_if_changed()
     except HTTPException as e:
         print(f"Failed after retries: {e}")
@@ -1,6 +1,9 @@
 from http.client import HTTPException
-from backend.etl.data_handler import DataHandler
+from backend.etl.data_handler import DataHandler, configure_logging
+from backend.etl.geometry import clip_to_boundary
 from backend.api.models.liquefaction_zones import LiquefactionZone
+import numpy as np
+import shapely
 from shapely.geometry import shape
 from geoalchemy2.shape import from_shape, to_shape
 from geoalchemy2.functions import ST_Simplify
@@ -15,6 +18,8 @@ class _LiquefactionDataHandler(DataHandler):
     data.sfgov.org
     """
 
+    tile_layer = "liquefaction"
+
     def parse_data(self, data: dict) -> tuple[list[dict], dict]:
         """
         Extracts feature attributes and geometry data, applies transformations and constructs:
@@ -32,17 +37,21 @@ class _LiquefactionDataHandler(DataHandler):
         parsed_data = []
         geojson_features = []
 
-        for feature in features:
-            properties = feature.get("properties", {})
-            geometry = feature.get("geometry", {})
-            multipolygon = shape(geometry)  # Convert GeoJSON to Shapely geometry
-            simplified_shapely_multipolygon = multipolygon.simplify(
-                tolerance, preserve_topology=True
-            )
+        # Convert GeoJSON to Shapely geometries, then simplify and clip
+        # the whole page at once
+        multipolygons = np.array(
+            [shape(feature.get("geometry", {})) for feature in features],
+            dtype=object,
+        )
+        simplified_multipolygons = shapely.simplify(
+            multipolygons, tolerance, preserve_topology=True
+        )
+        trimmed_multipolygons = clip_to_boundary(
+            simplified_multipolygons, self.boundary
+        )
 
-            trimmed_multipolygon = simplified_shapely_multipolygon.intersection(
-                self.boundary
-            )
+        for feature, trimmed_multipolygon in zip(features, trimmed_multipolygons):
+            properties = feature.get("properties", {})
 
             if trimmed_multipolygon.is_empty:
                 continue
@@ -76,15 +85,12 @@ def main():
     """ """
     handler = _LiquefactionDataHandler(_LIQUEFACTION_URL, LiquefactionZone)
     try:
-        liquefaction_zones = handler.fetch_data()
-        liquefaction_zones_objects, liquefaction_zones_geojson = handler.parse_data(
-            liquefaction_zones
-        )
-        handler.export_geojson_if_changed(liquefaction_zones_geojson)
-        handler.bulk_insert_data(liquefaction_zones_objects, "identifier")
+        handler.stream_data("identifier")
+        handler.export_tiles_if_changed()
     except HTTPException as e:
         print(f"Failed after retries: {e}")
 
 
 if __name__ == "__main__":
+    configure_logging()
     main()
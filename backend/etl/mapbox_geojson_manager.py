@@ -1,11 +1,36 @@
-import gzip
-import requests
-from requests import Response
+import asyncio
+import os
+import httpx
 from pathlib import Path
-import json
-import re
 from typing import List, Tuple, Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from backend.etl.async_request_handler import (
+    AsyncRequestHandler,
+    EventLoopThread,
+    shared_async_client,
+    shared_event_loop,
+)
+from backend.etl.address_normalizer import address_key, clean_address
+from backend.etl.geocode_cache import (
+    GeocodeCache,
+    get_geocode_cache_path,
+    get_geocode_cache_ttl,
+    open_geocode_cache,
+)
+from backend.etl.rate_limiter import TokenBucket
+from backend.etl.session_manager import RETRY_STATUS_CODES, SessionManager
+
+
+def get_mapbox_rate_limits() -> Tuple[float, int]:
+    """
+    Reads the rate limits of batch geocoding, set by MAPBOX_REQUESTS_PER_MINUTE
+    (600 by default, the default rate limit of the Mapbox geocoding API) and
+    MAPBOX_CONCURRENT_BATCHES (4 by default)
+    """
+    return (
+        float(os.getenv("MAPBOX_REQUESTS_PER_MINUTE", "600")),
+        int(os.getenv("MAPBOX_CONCURRENT_BATCHES", "4")),
+    )
 
 
 @dataclass
@@ -19,6 +44,13 @@ class MapboxConfig:
     api_key: str
     batch_limit: int = 1000
     post_request_result_limit: int = 1
+    # Rate limits of the batch requests, retries included
+    requests_per_minute: float = 600
+    max_concurrent_batches: int = 4
+    # SQLite cache of the geocoding results, created from the GeoJSON
+    # cache at soft_story_geojson_path on first use
+    geocode_cache_path: Path = field(default_factory=get_geocode_cache_path)
+    geocode_cache_ttl: Optional[float] = field(default_factory=get_geocode_cache_ttl)
 
     @property
     def bounding_box_string(self) -> str:
@@ -26,10 +58,41 @@ class MapboxConfig:
 
 
 class _BatchMapboxGeocoder:
+    """
+    Geocodes addresses with the Mapbox batch geocoding API
+
+    Args:
+        mapbox_config: The Mapbox configuration
+        request_handler: Sends the batch requests; defaults to one on
+            the shared AsyncClient, retrying rate-limited (429) and
+            failed POST requests, at most `requests_per_minute` of the
+            configuration
+        event_loop: The loop running the requests of the synchronous
+            batch_geocode_addresses; defaults to the shared event loop,
+            the only one the shared AsyncClient can be used on
+    """
+
     _mapbox_config: MapboxConfig
 
-    def __init__(self, mapbox_config: MapboxConfig):
+    def __init__(
+        self,
+        mapbox_config: MapboxConfig,
+        request_handler: Optional[AsyncRequestHandler] = None,
+        event_loop: Optional[EventLoopThread] = None,
+    ):
         self._mapbox_config = mapbox_config
+        self._request_handler = request_handler or AsyncRequestHandler(
+            shared_async_client(),
+            retry=SessionManager.create_retry(
+                status_forcelist=[429, *RETRY_STATUS_CODES],
+                allowed_methods=["POST"],
+            ),
+            rate_limiter=TokenBucket(
+                mapbox_config.requests_per_minute / 60,
+                capacity=mapbox_config.max_concurrent_batches,
+            ),
+        )
+        self._event_loop = event_loop or shared_event_loop()
 
     def _build_address_request(self, address: str) -> Dict[str, Any]:
         """
@@ -47,128 +110,146 @@ class _BatchMapboxGeocoder:
             "bbox": self._mapbox_config.bounding_box_string,
         }
 
-    def _post_request(self, batch_payload: List[Dict[str, Any]]) -> Response:
+    async def _post_request(
+        self, batch_payload: List[Dict[str, Any]]
+    ) -> httpx.Response:
         """
         Sends a POST request to the Mapbox API with the batch payload
+
+        Raises an HTTPStatusError if the request still fails after its
+        retries.
         """
         headers = {"Content-Type": "application/json"}
         params = {"access_token": self._mapbox_config.api_key, "permanent": "false"}
 
-        response = requests.post(
+        return await self._request_handler.request(
+            "POST",
             self._mapbox_config.geocode_api_endpoint_url,
             json=batch_payload,
             params=params,
             headers=headers,
         )
 
-        # Raise an HTTPError if one occurred
-        response.raise_for_status()
-        return response
-
     @staticmethod
     def _clean_address(address: str) -> str:
         """
         Replaces address sub-strings so MapBox will return a result
         """
-        # Remove leading zeros
-        clean_address = re.sub(r"\b0+(\d)", r"\1", address)
-        # Remove any text in parentheses
-        clean_address = re.sub(r"\s*\([^)]*\)", "", clean_address)
-        # BL to BOULEVARD
-        clean_address = re.sub(r"\bBL\b", "BOULEVARD", clean_address)
-        # TR to TERRACE
-        clean_address = re.sub(r"\bTR\b", "TERRACE", clean_address)
-        # AL to ALLEY
-        clean_address = re.sub(r"\bAL\b", "ALLEY", clean_address)
-        # WEST AV to AVENUE WEST
-        clean_address = re.sub(r"\bWEST AV\b", "AVENUE WEST", clean_address)
-
-        return clean_address
+        return clean_address(address)
 
     def batch_geocode_addresses(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Synchronous batch_geocode_addresses_async, run on the geocoder's
+        event loop
+        """
+        return self._event_loop.run(self.batch_geocode_addresses_async(addresses))
+
+    async def batch_geocode_addresses_async(
+        self, addresses: List[str]
+    ) -> List[Dict[str, Any]]:
         """
         Geocodes a list of addresses in batches of _MAPBOX_BATCH_LIMIT
         addresses
 
-        This limit is imposed by Mapbox.
+        This limit is imposed by Mapbox. Up to `max_concurrent_batches`
+        batches are in flight at once, each retried on its own, and the
+        features are returned in the order of the addresses. If a batch
+        fails, the other batches are cancelled.
         Returns a list of geojson features, with a property "sfdata_address"
         added to each feature
         """
+        batch_limit = self._mapbox_config.batch_limit
+        semaphore = asyncio.Semaphore(self._mapbox_config.max_concurrent_batches)
+
+        async def geocode(batch_addresses: List[str]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._geocode_batch(batch_addresses)
+
+        tasks = [
+            asyncio.create_task(geocode(addresses[i : i + batch_limit]))
+            for i in range(0, len(addresses), batch_limit)
+        ]
+        try:
+            batches_features = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return [feature for features in batches_features for feature in features]
+
+    async def _geocode_batch(self, batch_addresses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Geocodes one batch of addresses
+
+        Returns the features of the batch, in the order of its addresses
+        """
+        batch_payload = [
+            self._build_address_request(address) for address in batch_addresses
+        ]
+        response = await self._post_request(batch_payload)
+
+        batch_response = response.json().get("batch", [])
+
+        if len(batch_response) != len(batch_addresses):
+            raise ValueError(
+                "Number of batch addresses does not match number of batch responses"
+            )
+
+        # Update batch features with the SFData address, which will
+        # be used to join the SFData soft story dataset
         features = []
-        for i in range(0, len(addresses), self._mapbox_config.batch_limit):
-            batch_addresses = addresses[i : i + self._mapbox_config.batch_limit]
-            batch_payload = [
-                self._build_address_request(address) for address in batch_addresses
-            ]
-            response = self._post_request(batch_payload)
-
-            batch_response = response.json().get("batch", [])
-
-            if len(batch_response) != len(batch_addresses):
-                raise ValueError(
-                    "Number of batch addresses does not match number of batch responses"
-                )
-
-            # Update batch features with the SFData address, which will
-            # be used to join the SFData soft story dataset
-            for feature_collection, address in zip(batch_response, batch_addresses):
-                if len(feature_collection["features"]) == 0:
-                    feature_collection["features"].append({"properties": {}})
-                for feature in feature_collection["features"]:
-                    feature["properties"]["sfdata_address"] = address
-                    features.append(feature)
+        for feature_collection, address in zip(batch_response, batch_addresses):
+            if len(feature_collection["features"]) == 0:
+                feature_collection["features"].append({"properties": {}})
+            for feature in feature_collection["features"]:
+                feature["properties"]["sfdata_address"] = address
+                features.append(feature)
         return features
 
 
 class MapboxGeojsonManager:
+    """
+    Geocodes soft story addresses, caching the results
+
+    Args:
+        mapbox_config: The Mapbox configuration
+        cache: The cache of the geocoding results; defaults to the
+            SQLite cache of the configuration, opened on first use
+    """
+
     _mapbox_config: MapboxConfig
     _geocoder: _BatchMapboxGeocoder
-    _mapbox_points: Dict[str, Optional[Tuple[float, float]]]
 
-    def __init__(self, mapbox_config: MapboxConfig):
+    def __init__(
+        self, mapbox_config: MapboxConfig, cache: Optional[GeocodeCache] = None
+    ):
         self._mapbox_config = mapbox_config
         self._geocoder = _BatchMapboxGeocoder(self._mapbox_config)
-        self._mapbox_points = self._get_mapbox_points()
+        self._geocode_cache = cache
 
-    def _get_mapbox_points(self) -> Dict[str, Optional[Tuple[float, float]]]:
-        """
-        Parses the mapbox geojson file and return a dictionary mapping
-        SFData addresses to their respective MapBox coordinates
-        """
-        if not self._mapbox_config.soft_story_geojson_path.exists():
-            return {}
-
-        with gzip.open(self._mapbox_config.soft_story_geojson_path, "rt") as f:
-            soft_story_json = json.load(f)
-
-        parsed_data: Dict[str, Optional[Tuple[float, float]]] = {}
-        for feature in soft_story_json.get("features", []):
-            properties = feature.get("properties", {})
-            address = properties.get("sfdata_address")
-            if address is None:
-                raise ValueError("No address found in geojson's 'properties' field")
-            if "coordinates" not in properties:
-                parsed_data[address] = None
-            else:
-                longitude = properties["coordinates"]["longitude"]
-                latitude = properties["coordinates"]["latitude"]
-                parsed_data[address] = (longitude, latitude)
-
-        return parsed_data
+    @property
+    def _cache(self) -> GeocodeCache:
+        if self._geocode_cache is None:
+            self._geocode_cache = open_geocode_cache(
+                self._mapbox_config.geocode_cache_path,
+                self._mapbox_config.soft_story_geojson_path,
+                ttl=self._mapbox_config.geocode_cache_ttl,
+            )
+        return self._geocode_cache
 
     def is_address_in_geojson(self, address: str) -> bool:
         """
-        Returns True if the address exists in the geojson, otherwise
-        False
+        Returns True if the address was geocoded before, and its result
+        has not expired, otherwise False
         """
-        return address in self._mapbox_points
+        return address in self._cache
 
     def get_mapbox_coordinates(self, address: str) -> Optional[Tuple[float, float]]:
         """
-        Returns mapbox coordinates for this address if it exists in the
-        geojson, otherwise None
+        Returns mapbox coordinates for this address if it was geocoded
+        before, otherwise None
         """
-        return self._mapbox_points.get(address, None)
+        return self._cache.get(address)
 
     def _parse_mapbox_features(
         self, features: List[Dict[str, Any]]
@@ -190,38 +271,29 @@ class MapboxGeojsonManager:
 
         return coordinate_map
 
-    def _write_to_geojson(self, features: List[Dict[str, Any]]):
-        """
-        Writes the new features to a geojson file
-
-        If the geojson file doesn't exist, it creates one with the
-        given features.
-        """
-        # If file not found, create a new one
-        if not self._mapbox_config.soft_story_geojson_path.exists():
-            with gzip.open(self._mapbox_config.soft_story_geojson_path, "wt") as f:
-                json.dump({"type": "FeatureCollection", "features": features}, f)
-            return
-
-        # Otherwise append
-        with gzip.open(self._mapbox_config.soft_story_geojson_path, "rt") as f:
-            soft_story_json = json.load(f)
-
-        soft_story_json["features"] += features
-
-        with gzip.open(self._mapbox_config.soft_story_geojson_path, "wt") as f:
-            json.dump(soft_story_json, f)
-
     def batch_geocode_addresses(
         self, addresses: List[str]
     ) -> Dict[str, Optional[Tuple[float, float]]]:
         """
-        Batch geocodes a list of addresses and update the geojson file
-        with the new data
+        Batch geocodes a list of addresses and adds the results to the
+        cache
+
+        Duplicate and near-duplicate addresses, sharing the same
+        address_key, are geocoded once and get the same result.
         """
-        features = self._geocoder.batch_geocode_addresses(addresses)
-        coordinates = self._parse_mapbox_features(features)
+        representatives: Dict[str, str] = {}
+        for address in addresses:
+            representatives.setdefault(address_key(address), address)
 
-        self._write_to_geojson(features)
+        features = self._geocoder.batch_geocode_addresses(
+            list(representatives.values())
+        )
+        geocoded = self._parse_mapbox_features(features)
+
+        self._cache.add(geocoded)
 
-        return coordinates
+        return {
+            address: geocoded[representative]
+            for address in addresses
+            if (representative := representatives[address_key(address)]) in geocoded
+        }
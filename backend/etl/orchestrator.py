@@ -0,0 +1,232 @@
+"""
+Runs the ETL of several datasets concurrently in a single process.
+
+The handlers run in a thread pool and share one HTTP session and the
+database engine of backend.database.session, so the interpreter, the
+imports, the engine and the SF boundary are set up once for all datasets
+instead of once per dataset script.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from backend.api.models.landslide_zones import LandslideZone
+from backend.api.models.liquefaction_zones import LiquefactionZone
+from backend.api.models.soft_story_properties import SoftStoryProperty
+from backend.api.models.tsunami import TsunamiZone
+from backend.etl.data_handler import DataHandler
+from backend.etl.landslide_data_handler import LANDSLIDE_URL, LandslideDataHandler
+from backend.etl.liquefaction_data_handler import (
+    _LIQUEFACTION_URL,
+    _LiquefactionDataHandler,
+)
+from backend.etl.session_manager import SessionManager
+from backend.etl.soft_story_properties_data_handler import (
+    _SOFT_STORY_PROPERTIES_URL,
+    _SoftStoryPropertiesDataHandler,
+)
+from backend.etl.tsunami_data_handler import (
+    TSUNAMI_PARAMS,
+    TSUNAMI_URL,
+    TsunamiDataHandler,
+)
+
+logger = logging.getLogger(__name__)
+
+ETL_REQUIRED_PREFIX = "ETL_REQUIRED:"
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    A dataset the ETL can load
+
+    Args:
+        name: Name of the dataset on the command line
+        table_name: Name of its table, as printed by init_db.py
+        build: Creates the dataset's handler, given the shared session
+        run: Streams the dataset with its handler, returning the number
+            of rows upserted
+    """
+
+    name: str
+    table_name: str
+    build: Callable[[requests.Session], DataHandler]
+    run: Callable[[DataHandler], int]
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in [
+        Dataset(
+            "tsunami",
+            TsunamiZone.__tablename__,
+            lambda session: TsunamiDataHandler(
+                TSUNAMI_URL, TsunamiZone, session=session
+            ),
+            lambda handler: handler.stream_data("identifier", TSUNAMI_PARAMS),
+        ),
+        Dataset(
+            "liquefaction",
+            LiquefactionZone.__tablename__,
+            lambda session: _LiquefactionDataHandler(
+                _LIQUEFACTION_URL, LiquefactionZone, session=session
+            ),
+            lambda handler: handler.stream_data("identifier"),
+        ),
+        Dataset(
+            "soft_story",
+            SoftStoryProperty.__tablename__,
+            lambda session: _SoftStoryPropertiesDataHandler(
+                _SOFT_STORY_PROPERTIES_URL,
+                SoftStoryProperty,
+                mapbox_api_key=os.environ["NEXT_PUBLIC_MAPBOX_TOKEN"],
+                session=session,
+            ),
+            lambda handler: handler.stream_data("address"),
+        ),
+        Dataset(
+            "landslide",
+            LandslideZone.__tablename__,
+            lambda session: LandslideDataHandler(
+                LANDSLIDE_URL, LandslideZone, session=session
+            ),
+            lambda handler: handler.stream_data("identifier", export_geojson=False),
+        ),
+    ]
+}
+
+# Datasets run when none is given, as in the weekly ETL workflow
+DEFAULT_DATASETS = ["tsunami", "soft_story", "liquefaction"]
+
+
+@dataclass
+class DatasetResult:
+    """Outcome of the ETL of one dataset"""
+
+    name: str
+    rows: int = 0
+    error: Optional[BaseException] = None
+    timings: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def resolve_datasets(names: Iterable[str]) -> list[Dataset]:
+    """
+    Maps dataset or table names to datasets, keeping the first occurrence
+    of each
+
+    Raises:
+        ValueError: If a name matches no dataset
+    """
+    by_table = {dataset.table_name: dataset for dataset in DATASETS.values()}
+    datasets = []
+    for name in names:
+        dataset = DATASETS.get(name) or by_table.get(name)
+        if dataset is None:
+            raise ValueError(f"Unknown dataset: {name}")
+        if dataset not in datasets:
+            datasets.append(dataset)
+    return datasets
+
+
+def required_tables(lines: Iterable[str]) -> list[str]:
+    """
+    Extracts the tables needing ETL from the output of init_db.py, i.e.
+    its `ETL_REQUIRED:<table>` lines
+
+    Tables without a dataset are logged and skipped.
+    """
+    tables = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith(ETL_REQUIRED_PREFIX):
+            continue
+        table = line[len(ETL_REQUIRED_PREFIX) :]
+        if any(dataset.table_name == table for dataset in DATASETS.values()):
+            tables.append(table)
+        else:
+            logger.warning(f"No ETL mapping for {table}; skipping")
+    return tables
+
+
+def create_shared_session(jobs: int) -> requests.Session:
+    """
+    Creates the HTTP session shared by the handlers, with the retry
+    configuration of SessionManager and a connection pool sized for
+    `jobs` handlers fetching concurrently
+    """
+    session = SessionManager.create_session(logger)
+    retry = session.get_adapter("https://").max_retries
+    adapter = HTTPAdapter(
+        max_retries=retry, pool_connections=jobs, pool_maxsize=max(10, 2 * jobs)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def run_dataset(dataset: Dataset, session: requests.Session) -> DatasetResult:
+    """Runs the ETL of one dataset, recording its stage timings"""
+    result = DatasetResult(dataset.name)
+    start = time.perf_counter()
+    handler = None
+    try:
+        handler = dataset.build(session)
+        handler.keep_session_open = True
+        result.timings["init"] = time.perf_counter() - start
+        result.rows = dataset.run(handler)
+        tiles_start = time.perf_counter()
+        handler.export_tiles_if_changed()
+        result.timings["tiles"] = time.perf_counter() - tiles_start
+    except Exception as e:
+        logger.error(f"ETL of {dataset.name} failed: {e}", exc_info=True)
+        result.error = e
+    finally:
+        if handler is not None:
+            result.timings.update(handler.stage_timings)
+        result.timings["total"] = time.perf_counter() - start
+    return result
+
+
+def run_datasets(datasets: list[Dataset], jobs: int = 1) -> list[DatasetResult]:
+    """
+    Runs the ETL of the datasets, `jobs` at a time
+
+    Returns:
+        The result of each dataset, in the order given
+    """
+    session = create_shared_session(jobs)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            return list(
+                executor.map(lambda dataset: run_dataset(dataset, session), datasets)
+            )
+    finally:
+        session.close()
+
+
+_STAGES = ["init", "fetch", "parse", "diff", "load", "export", "tiles", "total"]
+
+
+def format_report(results: list[DatasetResult]) -> str:
+    """Formats the results as a table of per-stage timings in seconds"""
+    header = f"{'dataset':<14}{'status':<8}{'rows':>8}" + "".join(
+        f"{stage:>9}" for stage in _STAGES
+    )
+    lines = [header]
+    for result in results:
+        lines.append(
+            f"{result.name:<14}{'ok' if result.succeeded else 'failed':<8}"
+            f"{result.rows:>8}"
+            + "".join(f"{result.timings.get(stage, 0.0):>9.2f}" for stage in _STAGES)
+        )
+    return "\n".join(lines)
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second, up to
+    `capacity`. Callers reserve their tokens under the lock and sleep
+    outside of it, so concurrent callers are served in the order they
+    arrived and never exceed the rate on average.
+
+    Args:
+        rate: Number of tokens refilled per second
+        capacity: Maximum number of tokens, i.e. the largest burst
+            allowed after an idle period; defaults to 1
+        clock: Monotonic clock, overridable in tests
+        sleep: Sleep function, overridable in tests
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else 1.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = clock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket, waiting until they are available
+
+        Returns:
+            The number of seconds waited
+        """
+        wait = self.reserve(tokens)
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket, waiting on the event loop until
+        they are available
+
+        Returns:
+            The number of seconds waited
+        """
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket without waiting
+
+        Returns:
+            The number of seconds the caller must wait before using them
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated_at) * self.rate
+            )
+            self._updated_at = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
@@ -18,9 +18,7 @@ class LoggingRetry(Retry):
         # `Retry.total` counts down from `self._max_allowed_retries`.
         # Check if we've exhausted our retries.
         if self.total <= 0:
-            self.logger.error(
-                f"Max retries ({self._max_allowed_retries}) exceeded. Giving up."
-            )
+            self.log_exhausted()
             return super().increment(
                 method=method,
                 url=url,
@@ -30,25 +28,13 @@ class LoggingRetry(Retry):
                 **kwargs,
             )
 
-        current_attempt = self._max_allowed_retries - self.total + 1
-
         if response and hasattr(response, "status_code"):
             status = response.status_code
         else:
             status = "unknown"
 
         backoff = self.get_backoff_time()
-
-        self.logger.warning(
-            f"""
-                  === Retry Attempt {current_attempt} of {self._max_allowed_retries} ===
-                  URL: {unquote(url)}
-                  Method: {method}
-                  Status: {status}
-                  Error: {str(error) if error else "no error"}
-                  Backoff: {backoff} seconds
-          """
-        )
+        self.log_attempt(method, url, status, error, backoff)
 
         # Sleep for backoff duration
         if backoff:
@@ -64,6 +50,25 @@ class LoggingRetry(Retry):
             **kwargs,
         )
 
+    def log_attempt(self, method, url, status, error, backoff) -> None:
+        """Logs the retry about to be made after a failed attempt"""
+        current_attempt = self._max_allowed_retries - self.total + 1
+        self.logger.warning(
+            f"""
+                  === Retry Attempt {current_attempt} of {self._max_allowed_retries} ===
+                  URL: {unquote(str(url))}
+                  Method: {method}
+                  Status: {status}
+                  Error: {str(error) if error else "no error"}
+                  Backoff: {backoff} seconds
+          """
+        )
+
+    def log_exhausted(self) -> None:
+        self.logger.error(
+            f"Max retries ({self._max_allowed_retries}) exceeded. Giving up."
+        )
+
     def get_backoff_time(self):
         """
         Calculate the backoff time for the current retry attempt.
@@ -0,0 +1,120 @@
+"""
+Change-data diffing of parsed rows against the content hashes stored by
+the previous ETL run, so that only inserted and updated rows are written.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+import shapely
+from geoalchemy2.elements import WKBElement, WKTElement
+from geoalchemy2.shape import to_shape
+
+
+def normalized_wkb(value: Any) -> str:
+    """
+    Returns the hex WKB of a geometry in normal form, so that equal
+    geometries hash the same regardless of ring orientation, vertex order
+    or encoding
+
+    Args:
+        value: A WKBElement, WKTElement, WKT string or shapely geometry
+    """
+    if isinstance(value, WKBElement):
+        geometry = to_shape(value)
+    elif isinstance(value, WKTElement):
+        geometry = shapely.from_wkt(value.data)
+    elif isinstance(value, str):
+        geometry = shapely.from_wkt(value)
+    else:
+        geometry = value
+    return shapely.to_wkb(shapely.normalize(geometry), hex=True)
+
+
+def row_hash(
+    row: dict, geometry_columns: Iterable[str] = (), ignored: Iterable[str] = ()
+) -> str:
+    """
+    Hashes the content of a row: its attributes and normalized geometries
+
+    Args:
+        row: The row, as a dictionary keyed by column name
+        geometry_columns: Names of the geometry columns of the row
+        ignored: Names of columns left out of the hash, e.g. load
+            timestamps that change on every run
+    """
+    geometry_columns = set(geometry_columns)
+    ignored = set(ignored)
+    content = {
+        name: (
+            normalized_wkb(value)
+            if name in geometry_columns and value is not None
+            else value
+        )
+        for name, value in row.items()
+        if name not in ignored
+    }
+    encoded = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+@dataclass
+class RowDiff:
+    """Changes of a dataset between the stored hashes and a run"""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: list[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (
+            f"{self.inserted} inserted, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {len(self.deleted)} deleted"
+        )
+
+
+def diff_rows(
+    rows: list[dict],
+    id_field: str,
+    stored_hashes: dict[str, str],
+    diff: RowDiff,
+    geometry_columns: Iterable[str] = (),
+    ignored: Iterable[str] = (),
+) -> tuple[list[dict], dict[str, str]]:
+    """
+    Selects the rows whose content differs from the stored hashes
+
+    Args:
+        rows: Parsed rows of a page
+        id_field (str): Field identifying unique rows
+        stored_hashes: Maps the id of each stored row, as a string, to its
+            content hash
+        diff (RowDiff): Counts of the run, updated in place
+        geometry_columns: Names of the geometry columns of the rows
+        ignored: Names of columns left out of the hash
+
+    Returns:
+        The inserted and updated rows, and the new hash of each of them
+        keyed by id
+    """
+    changed_rows = []
+    new_hashes: dict[str, str] = {}
+    for row in rows:
+        row_id = str(row[id_field])
+        content_hash = row_hash(row, geometry_columns, ignored)
+        stored_hash = stored_hashes.get(row_id)
+        if stored_hash == content_hash or new_hashes.get(row_id) == content_hash:
+            diff.unchanged += 1
+            continue
+        if row_id in new_hashes:
+            # A duplicate within the page, already counted
+            pass
+        elif stored_hash is None:
+            diff.inserted += 1
+        else:
+            diff.updated += 1
+        changed_rows.append(row)
+        new_hashes[row_id] = content_hash
+    return changed_rows, new_hashes
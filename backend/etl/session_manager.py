@@ -2,30 +2,43 @@ import requests
 from requests.adapters import HTTPAdapter
 from backend.etl.retry import LoggingRetry
 import logging
-from typing import Optional
+from typing import Iterable, Optional
+
+RETRY_STATUS_CODES = [
+    404,  # Not Found
+    500,  # Internal Server Error
+    502,  # Bad Gateway
+    503,  # Service Unavailable
+    504,  # Gateway Timeout
+]
 
 
 class SessionManager:
     """Handles HTTP session creation and configuration"""
 
     @staticmethod
-    def create_session(logger: Optional[logging.Logger] = None) -> requests.Session:
-        """Create a configured requests session with retry logic"""
-        retry_strategy = LoggingRetry(
+    def create_retry(
+        status_forcelist: Iterable[int] = RETRY_STATUS_CODES,
+        allowed_methods: Iterable[str] = ("GET",),
+    ) -> LoggingRetry:
+        """
+        Create the retry strategy of the ETL's HTTP clients, shared by
+        the requests sessions and AsyncRequestHandler
+        """
+        return LoggingRetry(
             total=5,
             backoff_factor=1,
-            status_forcelist=[
-                404,  # Not Found
-                500,  # Internal Server Error
-                502,  # Bad Gateway
-                503,  # Service Unavailable
-                504,  # Gateway Timeout
-            ],
-            allowed_methods=["GET"],
+            status_forcelist=list(status_forcelist),
+            allowed_methods=list(allowed_methods),
             raise_on_status=True,
             respect_retry_after_header=True,
         )
 
+    @staticmethod
+    def create_session(logger: Optional[logging.Logger] = None) -> requests.Session:
+        """Create a configured requests session with retry logic"""
+        retry_strategy = SessionManager.create_retry()
+
         # Create session with retry strategy
         session = requests.Session()
         adapter = HTTPAdapter(max_retries=retry_strategy)
@@ -1,14 +1,23 @@
 from http.client import HTTPException
 from typing import Type, Dict, Tuple
-from backend.etl.data_handler import DataHandler
+from backend.etl.data_handler import DataHandler, configure_logging
 from backend.api.models.soft_story_properties import SoftStoryProperty
 from sqlalchemy.ext.declarative import DeclarativeMeta
 from dotenv import load_dotenv
 import os
-import re
 from pathlib import Path
 from typing import Dict, Tuple
-from backend.etl.mapbox_geojson_manager import MapboxConfig, MapboxGeojsonManager
+from backend.etl.address_normalizer import (
+    AddressRange,
+    address_key,
+    interpolate_coordinates,
+    parse_address_range,
+)
+from backend.etl.mapbox_geojson_manager import (
+    MapboxConfig,
+    MapboxGeojsonManager,
+    get_mapbox_rate_limits,
+)
 from backend.api.models.base import ModelType
 from shapely.wkt import loads
 from sqlalchemy import text, func
@@ -26,7 +35,12 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
     data.sfgov.org
     """
 
-    def __init__(self, url: str, table: Type[ModelType], mapbox_api_key: str):
+    tile_layer = "soft-story"
+    # DataSF reloads the dataset daily, so this changes on every run
+    diff_ignored_fields = ("sfdata_loaded_at",)
+
+    def __init__(self, url: str, table: Type[ModelType], mapbox_api_key: str, **kwargs):
+        requests_per_minute, max_concurrent_batches = get_mapbox_rate_limits()
         mapbox_config = MapboxConfig(
             # These values are for San Francisco
             min_longitude=-122.51436038,
@@ -36,9 +50,11 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
             geocode_api_endpoint_url=_MAPBOX_GEOCODE_API_ENDPOINT_URL,
             soft_story_geojson_path=Path(_MAPBOX_SOFT_STORY_GEOJSON_PATH),
             api_key=mapbox_api_key,
+            requests_per_minute=requests_per_minute,
+            max_concurrent_batches=max_concurrent_batches,
         )
         self.mapbox_geojson_manager = MapboxGeojsonManager(mapbox_config)
-        super().__init__(url, table)
+        super().__init__(url, table, **kwargs)
 
     def fill_in_missing_mapbox_points(
         self, parsed_data: list[dict], addresses: list[str]
@@ -124,6 +140,7 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
         sf_geometry: dict,
         parsed_data: list,
         addresses: list,
+        geocode: bool = True,
     ):
         """
         Adds the contents of a feature to parsed_data and possibly
@@ -139,13 +156,18 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
         instead must be turned into a list of addresses, one per
         number, by _addresses_from_range and then passed individually
         to this function.
+
+        Addresses with `geocode` False, the inner numbers of ranges, are
+        not added to addresses: their points are interpolated between
+        the range's ends by _interpolate_range instead.
         """
-        # Search for the address in the mapbox geojson.
+        # Search for the address in the geocoding cache.
         # If it's not there, it might be new, so get it
         # from MapBox freshly.
         if not self.mapbox_geojson_manager.is_address_in_geojson(address):
             # Save it for one big later MapBox query
-            addresses.append(address)
+            if geocode:
+                addresses.append(address)
             coordinates = sf_geometry["coordinates"] if sf_geometry else None
             point_source = "sfdata" if sf_geometry else None
         else:
@@ -181,6 +203,38 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
             }
         )
 
+    def _interpolate_range(
+        self, range_rows: list[dict], address_range: AddressRange
+    ) -> None:
+        """
+        Places the inner numbers of an address range missing from the
+        geocoding cache on the line between the range's ends, when
+        both ends were geocoded by Mapbox
+        """
+        first, last = range_rows[0], range_rows[-1]
+        if first["point_source"] != "mapbox" or last["point_source"] != "mapbox":
+            return
+        start = self.mapbox_geojson_manager.get_mapbox_coordinates(first["address"])
+        end = self.mapbox_geojson_manager.get_mapbox_coordinates(last["address"])
+        if not start or not end:
+            return
+        span = address_range.end - address_range.start
+        for offset, row in enumerate(range_rows[1:-1], start=1):
+            if row["point_source"] == "mapbox":
+                continue
+            lon, lat = interpolate_coordinates(start, end, offset / span)
+            row["point"] = f"Point({lon} {lat})"
+            row["point_source"] = "interpolated"
+
+    @staticmethod
+    def _collapse_duplicates(parsed_data: list[dict]) -> list[dict]:
+        """
+        Keeps one row per address_key, the last one as when the rows
+        are deduplicated on insert
+        """
+        rows = {address_key(row["address"]): row for row in parsed_data}
+        return list(rows.values())
+
     def parse_data(self, sf_data: dict) -> tuple[list[dict], dict]:
         """
         Extracts feature attributes and geometry data to construct:
@@ -188,29 +242,34 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
          - A dictionary representing the same data in GeoJSON format.
 
         Geometry data is converted into a GeoAlchemy-compatible
-        Point with srid 4326.
+        Point with srid 4326. Address ranges are expanded to one row per
+        number, of which only the ends are geocoded, and rows of
+        near-duplicate addresses are collapsed.
         """
         parsed_data: list[dict] = []
         addresses: list[str] = []
-        # Address range of the form '1234-5678 Street Ave'
-        # The pattern seeks digits separated by a hyphen
-        pattern = re.compile(r"(\d+)-(\d+)\s+(.*)")
+        ranges: list[tuple[list[dict], AddressRange]] = []
         for feature in sf_data["features"]:
             properties = feature.get("properties", {})
             sf_geometry = feature.get("geometry", {})
             address = properties.get("address")
-            # Tries to find the regular expression in the address
-            match_result = pattern.search(address)
-            if match_result:
-                start_range = int(match_result[1])  # Before the hyphen
-                end_range = int(match_result[2])  # After the hyphen
-                street_name = match_result[3]  # After the range of addreses
-                for address in _SoftStoryPropertiesDataHandler._addresses_from_range(
-                    start_range, end_range, street_name
-                ):
+            address_range = parse_address_range(address)
+            if address_range:
+                range_addresses = _SoftStoryPropertiesDataHandler._addresses_from_range(
+                    *address_range
+                )
+                first_row = len(parsed_data)
+                for index, address in enumerate(range_addresses):
                     self._process_feature(
-                        properties, address, sf_geometry, parsed_data, addresses
+                        properties,
+                        address,
+                        sf_geometry,
+                        parsed_data,
+                        addresses,
+                        geocode=index in (0, len(range_addresses) - 1),
                     )
+                if len(range_addresses) > 2:
+                    ranges.append((parsed_data[first_row:], address_range))
             else:
                 self._process_feature(
                     properties, address, sf_geometry, parsed_data, addresses
@@ -219,6 +278,9 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
         parsed_data_complete = self.fill_in_missing_mapbox_points(
             parsed_data, addresses
         )
+        for range_rows, address_range in ranges:
+            self._interpolate_range(range_rows, address_range)
+        parsed_data_complete = self._collapse_duplicates(parsed_data_complete)
         geojson = self._convert_to_geojson(parsed_data_complete)
 
         return parsed_data_complete, geojson
@@ -278,6 +340,7 @@ class _SoftStoryPropertiesDataHandler(DataHandler):
 
 if __name__ == "__main__":
     load_dotenv()
+    configure_logging()
 
     handler = _SoftStoryPropertiesDataHandler(
         _SOFT_STORY_PROPERTIES_URL,
@@ -285,11 +348,7 @@ if __name__ == "__main__":
         mapbox_api_key=os.environ["NEXT_PUBLIC_MAPBOX_TOKEN"],
     )
     try:
-        soft_story_properties = handler.fetch_data()
-        soft_story_property_objects, soft_story_property_geojson = handler.parse_data(
-            soft_story_properties
-        )
-        handler.export_geojson_if_changed(soft_story_property_geojson)
-        handler.bulk_insert_data(soft_story_property_objects, "address")
+        handler.stream_data("address")
+        handler.export_tiles_if_changed()
     except HTTPException as e:
         print(f"Failed after retries: {e}")
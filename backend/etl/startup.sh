@@ -15,16 +15,6 @@ if [ ! -f "$VENV_PYTHON" ]; then
     exit 1
 fi
 
-# Helper function to run a python script with logging and error handling
-run_python_script() {
-    local script_path="$1"
-    echo "Running ${script_path}..."
-    if ! "$VENV_PYTHON" "$script_path"; then
-        echo "Error: ${script_path} failed." >&2
-        exit 1
-    fi
-}
-
 # Run init_db.py
 ETL_OUTPUT=$($VENV_PYTHON backend/database/init_db.py)
 INIT_DB_EXIT_CODE=$?
@@ -34,26 +24,12 @@ if [[ $INIT_DB_EXIT_CODE -ne 0 ]]; then
     exit 1
 fi
 
-# Check which tables need ETL
-ETL_TABLES=$(echo "$ETL_OUTPUT" | awk -F: '/^ETL_REQUIRED:/ {print $2}')
-
-# run ETL only for required tables
-for tbl in $ETL_TABLES; do
-  case "$tbl" in
-    tsunami_zones)
-      run_python_script backend/etl/tsunami_data_handler.py
-      ;;
-    liquefaction_zones)
-      run_python_script backend/etl/liquefaction_data_handler.py
-      ;;
-    soft_story_properties)
-      run_python_script backend/etl/soft_story_properties_data_handler.py
-      ;;
-    *)
-      echo "No ETL mapping for $tbl; skipping" >&2
-      ;;
-  esac
-done
+# Run ETL only for the tables init_db.py reports as required, concurrently
+# in one process
+if ! echo "$ETL_OUTPUT" | "$VENV_PYTHON" -m backend.etl run --required-from - --jobs 3; then
+    echo "Error: ETL failed." >&2
+    exit 1
+fi
 
 echo "===== startup.sh finished ====="
 
@@ -0,0 +1,53 @@
+import pytest
+from backend.etl.address_normalizer import (
+    AddressRange,
+    address_key,
+    clean_address,
+    interpolate_coordinates,
+    parse_address_range,
+)
+
+
+@pytest.mark.parametrize(
+    "address,expected",
+    [
+        ("0055 FOLSOM ST", "55 FOLSOM ST"),
+        ("100 MAIN ST (REAR)", "100 MAIN ST"),
+        ("10 GENEVA BL", "10 GENEVA BOULEVARD"),
+        ("5 DOLORES TR", "5 DOLORES TERRACE"),
+        ("7 ROYAL AL", "7 ROYAL ALLEY"),
+        ("1 WEST AV", "1 AVENUE WEST"),
+        ("1 BLAKE ST", "1 BLAKE ST"),
+    ],
+)
+def test_clean_address(address, expected):
+    assert clean_address(address) == expected
+
+
+def test_clean_address_is_memoized():
+    clean_address.cache_clear()
+    clean_address("1 WEST AV")
+    clean_address("1 WEST AV")
+
+    assert clean_address.cache_info().hits == 1
+
+
+def test_near_duplicates_share_a_key():
+    assert (
+        address_key("1401 CHESTNUT  ST , SAN FRANCISCO CA")
+        == address_key("1401 Chestnut St, San Francisco CA")
+        == address_key("01401 CHESTNUT ST. SAN FRANCISCO CA")
+    )
+    assert address_key("10 GENEVA BL") == address_key("10 GENEVA BOULEVARD")
+    assert address_key("1401 CHESTNUT ST") != address_key("1403 CHESTNUT ST")
+
+
+def test_parse_address_range():
+    assert parse_address_range("1234-1260 GROVE ST") == AddressRange(
+        1234, 1260, "GROVE ST"
+    )
+    assert parse_address_range("1234 GROVE ST") is None
+
+
+def test_interpolate_coordinates():
+    assert interpolate_coordinates((0.0, 10.0), (4.0, 20.0), 0.25) == (1.0, 12.5)
@@ -0,0 +1,123 @@
+from unittest.mock import AsyncMock, patch
+import httpx
+import pytest
+from backend.etl.async_request_handler import (
+    AsyncRequestHandler,
+    create_async_client,
+    shared_event_loop,
+)
+from backend.etl.retry import LoggingRetry
+
+URL = "https://data.example.com/resource.geojson"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def mock_handler(responses: list) -> tuple[AsyncRequestHandler, list]:
+    """Handler answered by `responses` in turn, and the requests it sent"""
+    requests = []
+    answers = iter(responses)
+
+    def respond(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    client = create_async_client(transport=httpx.MockTransport(respond))
+    return AsyncRequestHandler(client), requests
+
+
+@pytest.mark.anyio
+async def test_request_returns_response():
+    handler, requests = mock_handler([httpx.Response(200, json={"features": [1]})])
+
+    response = await handler.request("GET", URL, params={"$limit": 10})
+
+    assert response.json() == {"features": [1]}
+    assert requests[0].url.params["$limit"] == "10"
+
+
+@pytest.mark.anyio
+async def test_failed_requests_are_retried_with_backoff(caplog):
+    handler, requests = mock_handler(
+        [
+            httpx.Response(503),
+            httpx.ConnectError("refused"),
+            httpx.Response(502),
+            httpx.Response(200, json={}),
+        ]
+    )
+
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await handler.request("GET", URL)
+
+    assert len(requests) == 4
+    # Same delays as LoggingRetry with a backoff factor of 1
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [2, 4]
+    assert "Retry Attempt 3 of 5" in caplog.text
+
+
+@pytest.mark.anyio
+async def test_retry_after_header_is_respected():
+    handler, _ = mock_handler(
+        [
+            httpx.Response(503, headers={"Retry-After": "7"}),
+            httpx.Response(200, json={}),
+        ]
+    )
+
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await handler.request("GET", URL)
+
+    mock_sleep.assert_awaited_once_with(7)
+
+
+@pytest.mark.anyio
+async def test_gives_up_after_max_retries(caplog):
+    handler, requests = mock_handler([httpx.Response(500)] * 6)
+
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        with pytest.raises(httpx.HTTPStatusError):
+            await handler.request("GET", URL)
+
+    assert len(requests) == 6
+    assert "Max retries (5) exceeded. Giving up." in caplog.text
+
+
+@pytest.mark.anyio
+async def test_methods_not_allowed_are_not_retried():
+    handler, requests = mock_handler([httpx.Response(503)])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await handler.request("POST", URL)
+
+    assert len(requests) == 1
+
+
+@pytest.mark.anyio
+async def test_all_methods_are_retried_without_allowed_methods():
+    handler, requests = mock_handler([httpx.Response(503), httpx.Response(200)])
+    handler.retry = LoggingRetry(total=1, status_forcelist=[503], allowed_methods=None)
+
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        await handler.request("POST", URL)
+
+    assert len(requests) == 2
+
+
+def test_retry_without_total_is_rejected():
+    with pytest.raises(ValueError):
+        AsyncRequestHandler(create_async_client(), retry=LoggingRetry(total=None))
+
+
+def test_shared_event_loop_runs_coroutines():
+    async def answer():
+        return 42
+
+    assert shared_event_loop().run(answer()) == 42
+    assert shared_event_loop() is shared_event_loop()
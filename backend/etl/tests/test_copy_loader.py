@@ -0,0 +1,88 @@
+from datetime import datetime
+from geoalchemy2.elements import WKTElement
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Point
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from backend.api.models.soft_story_properties import SoftStoryProperty
+from backend.etl.copy_loader import (
+    CopyStream,
+    copy_columns,
+    copy_geometry,
+    copy_lines,
+    copy_value,
+    staging_upsert_statement,
+)
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_copy_value_encodes_null_and_scalars():
+    assert copy_value(None) == "\\N"
+    assert copy_value(3) == "3"
+    assert copy_value(True) == "t"
+    assert copy_value(datetime(2024, 1, 2, 3, 4, 5)) == "2024-01-02T03:04:05"
+
+
+def test_copy_value_escapes_special_characters():
+    assert copy_value("a\tb\nc\\d\re") == "a\\tb\\nc\\\\d\\re"
+
+
+def test_copy_geometry_adds_srid_to_wkb_and_wkt():
+    point = from_shape(Point(1, 2), srid=4326)
+
+    assert copy_geometry(point, 4326) == f"SRID=4326;{point.desc}"
+    assert copy_geometry("Point(-122.4 37.7)", 4326) == "SRID=4326;Point(-122.4 37.7)"
+    assert copy_geometry(WKTElement("POINT(1 2)"), 4326) == "SRID=4326;POINT(1 2)"
+    assert copy_geometry("SRID=3857;POINT(1 2)", 4326) == "SRID=3857;POINT(1 2)"
+
+
+def test_copy_lines_follow_column_order():
+    rows = [{"b": "x", "a": 1}, {"a": None}]
+
+    lines = list(copy_lines(rows, ["a", "b"], {}))
+
+    assert lines == ["1\tx\n", "\\N\t\\N\n"]
+
+
+def test_copy_stream_reads_lines_in_chunks():
+    stream = CopyStream(["one\n", "two\n", "three\n"])
+
+    assert stream.read(5) == "one\nt"
+    assert stream.read(100) == "wo\nthree\n"
+    assert stream.read(100) == ""
+
+
+def test_copy_columns_keeps_table_order_and_skips_unknown_keys():
+    rows = [{"point": None, "address": "1 Main St"}, {"status": "x"}]
+
+    assert copy_columns(SoftStoryProperty, rows) == ["address", "status", "point"]
+
+
+def test_staging_upsert_statement_applies_insert_policy():
+    policy = {
+        "status": text(
+            "CASE WHEN EXCLUDED.sfdata_as_of > soft_story_properties.sfdata_as_of "
+            "THEN EXCLUDED.status ELSE soft_story_properties.status END"
+        )
+    }
+
+    sql = _compile(
+        staging_upsert_statement(
+            SoftStoryProperty, ["address", "status"], "address", policy
+        )
+    )
+
+    assert "INSERT INTO soft_story_properties (address, status)" in sql
+    assert "FROM pg_temp.soft_story_properties_staging" in sql
+    assert "ON CONFLICT (address) DO UPDATE SET status = CASE" in sql
+
+
+def test_staging_upsert_statement_without_policy_does_nothing():
+    sql = _compile(
+        staging_upsert_statement(SoftStoryProperty, ["address"], "address", {})
+    )
+
+    assert "ON CONFLICT (address) DO NOTHING" in sql
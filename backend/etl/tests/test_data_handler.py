@@ -11,6 +11,9 @@ import logging
 from unittest.mock import call, patch, MagicMock
 from backend.etl.retry import LoggingRetry
 from backend.etl.request_handler import RequestHandler
+from backend.etl.row_diff import row_hash
+from geoalchemy2.shape import to_shape
+import shapely
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from backend.api.config import settings
@@ -19,6 +22,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, timezone
 from sqlalchemy import DateTime
 from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from backend.database.session import _get_database_url
 from backend.api.models.tsunami import TsunamiZone
 from backend.api.models.soft_story_properties import SoftStoryProperty
@@ -29,6 +33,7 @@ from backend.etl.soft_story_properties_data_handler import (
     _SoftStoryPropertiesDataHandler,
 )
 import os
+import time
 import json
 from pathlib import Path
 
@@ -423,6 +428,96 @@ def test_bulk_insert_data_with_basic_policy(test_db, data_handler):
     assert result.value == 200
 
 
+def test_bulk_insert_data_with_copy_applies_upsert_policy(test_db):
+    """The COPY loader applies the same conflict policy as the INSERT loader"""
+    test_db.add(
+        DummyModel(
+            id=1, name="old name", value=100, data_changed_at=datetime(2024, 1, 2)
+        )
+    )
+    test_db.commit()
+
+    handler = TimestampDataHandler(
+        url="https://api.test.com", table=DummyModel, bulk_load_method="copy"
+    )
+    handler.db_getter = create_test_db_context_manager(test_db)
+
+    handler.bulk_insert_data(
+        [
+            # Older than the existing row, so it is ignored
+            {
+                "id": 1,
+                "name": "stale\tname",
+                "value": 1,
+                "data_changed_at": datetime(2024, 1, 1),
+            },
+            {"id": 2, "name": "new\nname", "value": None, "data_changed_at": None},
+        ],
+        "id",
+    )
+
+    assert test_db.query(DummyModel).filter_by(id=1).first().name == "old name"
+    new_row = test_db.query(DummyModel).filter_by(id=2).first()
+    assert new_row.name == "new\nname"
+    assert new_row.value is None
+
+
+def test_unknown_bulk_load_method_is_rejected():
+    with pytest.raises(ValueError):
+        DummyDataHandler(url="", table=DummyModel, bulk_load_method="merge")
+
+
+def test_bulk_insert_data_writes_chunks_in_separate_transactions():
+    handler = DummyDataHandler(
+        url="", table=DummyModel, chunk_size=2, rows_per_statement=50
+    )
+    sessions = []
+
+    def db_getter():
+        session = MagicMock()
+        session.__enter__.return_value = session
+        sessions.append(session)
+        yield session
+
+    handler.db_getter = db_getter
+    rows = [{"id": i, "name": f"row {i}"} for i in range(5)]
+
+    handler.bulk_insert_data(rows, "id")
+
+    assert len(sessions) == 3
+    for session, expected in zip(sessions, [rows[0:2], rows[2:4], rows[4:]]):
+        stmt, params = session.execute.call_args.args
+        assert params == expected
+        assert stmt.get_execution_options()["insertmanyvalues_page_size"] == 50
+        session.commit.assert_called_once()
+
+
+def test_bulk_insert_data_with_parallel_writers():
+    handler = DummyDataHandler(
+        url="", table=DummyModel, chunk_size=10, parallel_writers=4
+    )
+    rows = [{"id": i} for i in range(95)]
+
+    with patch.object(handler, "_write_chunk") as mock_write_chunk:
+        handler.bulk_insert_data(rows, "id")
+
+    chunks = [call.args[0] for call in mock_write_chunk.call_args_list]
+    assert len(chunks) == 10
+    assert sorted(row["id"] for chunk in chunks for row in chunk) == list(range(95))
+
+
+def test_bulk_insert_data_parallel_writer_errors_are_raised():
+    handler = DummyDataHandler(
+        url="", table=DummyModel, chunk_size=1, parallel_writers=2
+    )
+
+    with patch.object(
+        handler, "_write_chunk", side_effect=IntegrityError("stmt", {}, Exception())
+    ):
+        with pytest.raises(IntegrityError):
+            handler.bulk_insert_data([{"id": 1}, {"id": 2}], "id")
+
+
 def test_get_last_export_time_from_db(test_db):
     """Test the last export time lookup"""
     data_handler = DummyDataHandler(url="", table=DummyModel)
@@ -612,3 +707,374 @@ def test_export_geojson_if_changed_on_prod_data_not_changed(tmp_path, monkeypatc
                     data_handler.export_geojson_if_changed(features)
                     mock_save.assert_not_called()
                     mock_update.assert_not_called()
+
+
+class TiledDataHandler(DummyDataHandler):
+    """Handler exported as a tile archive"""
+
+    tile_layer = "tsunami"
+
+
+def test_export_tiles_if_changed_disabled(tmp_path, monkeypatch):
+    """Test that no tile archive is written unless enabled"""
+    monkeypatch.delenv("EXPORT_TILE_ARCHIVES", raising=False)
+    monkeypatch.setenv("DATA_TILES_PATH", str(tmp_path) + "/")
+    data_handler = TiledDataHandler(url="", table=DummyModel)
+
+    with patch.object(data_handler, "_save_tile_archive") as mock_save:
+        data_handler.export_tiles_if_changed()
+        mock_save.assert_not_called()
+
+
+def test_save_tile_archive_without_tile_layer(tmp_path):
+    """Test that a dataset without a tile layer cannot be exported as tiles"""
+    data_handler = DummyDataHandler(url="", table=DummyModel)
+
+    with pytest.raises(ValueError, match="has no tile layer"):
+        data_handler._save_tile_archive(tmp_path / "dummy.mbtiles")
+
+
+def test_export_tiles_if_changed_local_file_not_exists(tmp_path, monkeypatch):
+    """Test local environment when the archive doesn't exist (should save)"""
+    monkeypatch.setenv("EXPORT_TILE_ARCHIVES", "true")
+    monkeypatch.setenv("ENVIRONMENT", "local")
+    monkeypatch.setenv("DATA_TILES_PATH", str(tmp_path) + "/")
+    data_handler = TiledDataHandler(url="", table=DummyModel)
+
+    with patch.object(data_handler, "_save_tile_archive") as mock_save:
+        data_handler.export_tiles_if_changed()
+        mock_save.assert_called_once_with(tmp_path / "DummyModel.mbtiles")
+
+
+def test_export_tiles_if_changed_on_prod_data_changed(tmp_path, monkeypatch):
+    """Test production environment when the tile archive is stale"""
+    monkeypatch.setenv("EXPORT_TILE_ARCHIVES", "true")
+    monkeypatch.setenv("ENVIRONMENT", "prod")
+    monkeypatch.setenv("DATA_TILES_PATH", str(tmp_path) + "/")
+    data_handler = TiledDataHandler(url="", table=DummyModel)
+
+    with patch.object(
+        data_handler,
+        "_get_last_export_time_from_db",
+        return_value=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    ) as mock_get:
+        with patch.object(
+            data_handler, "_data_changed_since_last_export", return_value=True
+        ):
+            with patch.object(data_handler, "_save_tile_archive") as mock_save:
+                with patch.object(
+                    data_handler, "_update_last_export_time_in_db"
+                ) as mock_update:
+                    data_handler.export_tiles_if_changed()
+                    mock_save.assert_called_once()
+                    # Tracked separately from the geojson export
+                    mock_get.assert_called_once_with("DummyModel.mbtiles")
+                    mock_update.assert_called_once_with("DummyModel.mbtiles")
+
+
+def test_export_tiles_if_changed_on_prod_data_not_changed(tmp_path, monkeypatch):
+    """Test production environment when the tile archive is up-to-date"""
+    monkeypatch.setenv("EXPORT_TILE_ARCHIVES", "true")
+    monkeypatch.setenv("ENVIRONMENT", "prod")
+    monkeypatch.setenv("DATA_TILES_PATH", str(tmp_path) + "/")
+    data_handler = TiledDataHandler(url="", table=DummyModel)
+
+    with patch.object(
+        data_handler,
+        "_get_last_export_time_from_db",
+        return_value=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    ):
+        with patch.object(
+            data_handler, "_data_changed_since_last_export", return_value=False
+        ):
+            with patch.object(data_handler, "_save_tile_archive") as mock_save:
+                data_handler.export_tiles_if_changed()
+                mock_save.assert_not_called()
+
+
+def _page_response(features):
+    response = Mock()
+    response.json.return_value = {"type": "FeatureCollection", "features": features}
+    response.status_code = 200
+    response.raise_for_status.return_value = None
+    return response
+
+
+def _concurrent_handler(pages, total_count, delays=None):
+    """
+    Handler fetching `pages` by offset, where fetching page i takes
+    delays[i] seconds, so that responses can complete out of order
+    """
+    handler = DummyDataHandler(
+        url="https://api.test.com",
+        table=DummyModel,
+        page_size=3,
+        max_concurrent_requests=3,
+        requests_per_second=1000,
+    )
+
+    def get(url, params, timeout):
+        if params.get("$select") == "count(*)":
+            response = Mock()
+            response.json.return_value = [{"count": str(total_count)}]
+            response.raise_for_status.return_value = None
+            return response
+        index = params["$offset"] // 3
+        time.sleep((delays or {}).get(index, 0))
+        return _page_response(pages[index] if index < len(pages) else [])
+
+    handler.session = Mock()
+    handler.session.get.side_effect = get
+    handler.request_handler = RequestHandler(handler.session, handler.logger)
+    return handler
+
+
+def test_fetch_data_concurrently_keeps_page_order():
+    pages = [[{"id": i} for i in range(start, start + 3)] for start in (0, 3, 6)]
+    pages.append([{"id": 9}])
+    # The first page is the slowest to arrive
+    handler = _concurrent_handler(pages, total_count=10, delays={0: 0.2})
+
+    result = handler.fetch_data()
+
+    assert [feature["id"] for feature in result["features"]] == list(range(10))
+    page_calls = [
+        call
+        for call in handler.session.get.call_args_list
+        if "$offset" in call[1]["params"]
+    ]
+    assert sorted(call[1]["params"]["$offset"] for call in page_calls) == [0, 3, 6, 9]
+
+
+def test_fetch_data_concurrently_continues_if_records_were_added():
+    pages = [[{"id": i} for i in range(start, start + 3)] for start in (0, 3)]
+    pages.append([{"id": 6}])
+    # The count is taken before the last record is added
+    handler = _concurrent_handler(pages, total_count=6)
+
+    result = handler.fetch_data()
+
+    assert [feature["id"] for feature in result["features"]] == list(range(7))
+
+
+def test_fetch_data_falls_back_to_sequential_without_count(caplog):
+    handler = DummyDataHandler(
+        url="https://api.test.com",
+        table=DummyModel,
+        page_size=3,
+        max_concurrent_requests=3,
+        requests_per_second=1000,
+    )
+    handler.session = Mock()
+    handler.session.get.side_effect = [
+        requests.RequestException("count not supported"),
+        _page_response([{"id": 0}]),
+    ]
+    handler.request_handler = RequestHandler(handler.session, handler.logger)
+
+    result = handler.fetch_data()
+
+    assert result["features"] == [{"id": 0}]
+    assert "fetching pages sequentially" in caplog.text
+
+
+def test_tsunami_handler_paginates_with_arcgis_parameters():
+    handler = TsunamiDataHandler(url="https://arcgis.test/query", table=TsunamiZone)
+    handler.request_handler = Mock()
+    handler.request_handler.make_request.return_value = {"count": 42}
+
+    assert handler._page_params(1000) == {
+        "resultOffset": 1000,
+        "resultRecordCount": handler.page_size,
+    }
+    assert handler._fetch_total_count({"where": "1=1", "outFields": "*"}) == 42
+    handler.request_handler.make_request.assert_called_once_with(
+        "https://arcgis.test/query",
+        {"where": "1=1", "returnCountOnly": "true", "f": "json"},
+    )
+
+
+class PageDataHandler(DummyDataHandler):
+    """Handler turning each feature of a page into a row"""
+
+    def parse_data(self, data: dict) -> tuple[list[dict], dict]:
+        features = data["features"]
+        return features, {"type": "FeatureCollection", "features": features}
+
+
+def test_stream_data_handles_each_page(tmp_path, monkeypatch):
+    """Test that pages are parsed, upserted and exported one at a time"""
+    monkeypatch.setenv("ENVIRONMENT", "local")
+    monkeypatch.setenv("DATA_GEOJSON_PATH", str(tmp_path) + "/")
+    data_handler = PageDataHandler(url="", table=DummyModel)
+    pages = [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+
+    with patch.object(data_handler, "_yield_data", return_value=iter(pages)):
+        with patch.object(data_handler, "bulk_insert_data") as mock_insert:
+            total_rows = data_handler.stream_data("id")
+
+    assert total_rows == 3
+    assert mock_insert.call_args_list == [call(pages[0], "id"), call(pages[1], "id")]
+    with open(tmp_path / "DummyModel.geojson") as f:
+        assert json.load(f) == {
+            "type": "FeatureCollection",
+            "features": [{"id": 1}, {"id": 2}, {"id": 3}],
+        }
+
+
+def test_stream_data_on_prod_data_not_changed(tmp_path, monkeypatch):
+    """Test that the geojson is not rewritten when the data is up-to-date"""
+    monkeypatch.setenv("ENVIRONMENT", "prod")
+    monkeypatch.setenv("DATA_GEOJSON_PATH", str(tmp_path) + "/")
+    data_handler = PageDataHandler(url="", table=DummyModel)
+
+    with patch.object(
+        data_handler,
+        "_get_last_export_time_from_db",
+        return_value=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    ):
+        with patch.object(
+            data_handler, "_data_changed_since_last_export", return_value=False
+        ):
+            with patch.object(
+                data_handler, "_yield_data", return_value=iter([[{"id": 1}]])
+            ):
+                with patch.object(data_handler, "bulk_insert_data") as mock_insert:
+                    with patch.object(
+                        data_handler, "_update_last_export_time_in_db"
+                    ) as mock_update:
+                        data_handler.stream_data("id")
+                        mock_insert.assert_called_once()
+                        mock_update.assert_not_called()
+
+    assert not (tmp_path / "DummyModel.geojson").exists()
+
+
+def test_stream_data_failure_keeps_previous_geojson(tmp_path, monkeypatch):
+    """Test that a failing page leaves the previous export in place"""
+    monkeypatch.setenv("ENVIRONMENT", "prod")
+    monkeypatch.setenv("DATA_GEOJSON_PATH", str(tmp_path) + "/")
+    geojson_path = tmp_path / "DummyModel.geojson"
+    geojson_path.write_text('{"existing": "data"}')
+    data_handler = PageDataHandler(url="", table=DummyModel)
+
+    with patch.object(
+        data_handler, "_get_last_export_time_from_db", return_value=datetime.min
+    ):
+        with patch.object(
+            data_handler, "_data_changed_since_last_export", return_value=True
+        ):
+            with patch.object(
+                data_handler, "_yield_data", return_value=iter([[{"id": 1}]])
+            ):
+                with patch.object(
+                    data_handler,
+                    "bulk_insert_data",
+                    side_effect=IntegrityError("INSERT", {}, Exception()),
+                ):
+                    with patch.object(
+                        data_handler, "_update_last_export_time_in_db"
+                    ) as mock_update:
+                        with pytest.raises(IntegrityError):
+                            data_handler.stream_data("id")
+                        mock_update.assert_not_called()
+
+    assert geojson_path.read_text() == '{"existing": "data"}'
+
+
+def test_stream_data_with_diffing_writes_only_changes(tmp_path, monkeypatch):
+    """Test that unchanged rows are skipped and missing rows deleted"""
+    monkeypatch.setenv("ENVIRONMENT", "local")
+    monkeypatch.setenv("DATA_GEOJSON_PATH", str(tmp_path) + "/")
+    monkeypatch.setenv("ETL_DIFF_ROWS", "true")
+    data_handler = PageDataHandler(url="", table=DummyModel)
+    unchanged, updated, inserted = {"id": 1}, {"id": 2, "name": "b"}, {"id": 3}
+    stored_hashes = {
+        "1": row_hash(unchanged),
+        "2": row_hash({"id": 2, "name": "a"}),
+        "4": row_hash({"id": 4}),
+    }
+    pages = [[unchanged, updated], [inserted]]
+
+    with patch.object(data_handler, "_yield_data", return_value=iter(pages)):
+        with patch.object(data_handler, "_load_row_hashes", return_value=stored_hashes):
+            with patch.object(data_handler, "bulk_insert_data") as mock_insert:
+                with patch.object(data_handler, "_save_row_hashes") as mock_save:
+                    with patch.object(data_handler, "_delete_rows") as mock_delete:
+                        total_rows = data_handler.stream_data("id")
+
+    assert total_rows == 2
+    assert mock_insert.call_args_list == [call([updated], "id"), call([inserted], "id")]
+    assert mock_save.call_args_list == [
+        call({"2": row_hash(updated)}),
+        call({"3": row_hash(inserted)}),
+    ]
+    mock_delete.assert_called_once_with(["4"], "id")
+    assert data_handler.last_diff.summary() == (
+        "1 inserted, 1 updated, 1 unchanged, 1 deleted"
+    )
+
+
+def test_stream_data_with_diffing_keeps_rows_when_source_is_empty(monkeypatch):
+    """Test that an empty source does not delete every stored row"""
+    monkeypatch.setenv("ETL_DIFF_ROWS", "true")
+    data_handler = PageDataHandler(url="", table=DummyModel)
+
+    with patch.object(data_handler, "_yield_data", return_value=iter([])):
+        with patch.object(data_handler, "_load_row_hashes", return_value={"1": "hash"}):
+            with patch.object(data_handler, "_delete_rows") as mock_delete:
+                data_handler.stream_data("id", export_geojson=False)
+
+    mock_delete.assert_not_called()
+    assert data_handler.last_diff.deleted == []
+
+
+def test_tsunami_parse_data_with_page_outside_boundary():
+    """Test that a page without any feature in SF parses to no rows"""
+    handler = TsunamiDataHandler(url="", table=TsunamiZone)
+    ring = [[0, 0], [0, 1000], [1000, 1000], [1000, 0], [0, 0]]
+    page = {
+        "features": [{"attributes": {"OBJECTID": 1}, "geometry": {"rings": [ring]}}]
+    }
+
+    rows, geojson = handler.parse_data(page)
+
+    assert rows == []
+    assert geojson == {"type": "FeatureCollection", "features": []}
+
+
+def test_tsunami_parse_data_clips_page_to_boundary():
+    """Test that features in SF are reprojected and kept, others dropped"""
+    handler = TsunamiDataHandler(url="", table=TsunamiZone)
+    sf_ring = [
+        [-13627000, 4548000],
+        [-13626000, 4548000],
+        [-13626000, 4549000],
+        [-13627000, 4549000],
+        [-13627000, 4548000],
+    ]
+    outside_ring = [[0, 0], [0, 1000], [1000, 1000], [1000, 0], [0, 0]]
+    page = {
+        "features": [
+            {"attributes": {"OBJECTID": 1}, "geometry": {"rings": [outside_ring]}},
+            {"attributes": {"OBJECTID": 2}, "geometry": {"rings": [sf_ring]}},
+        ]
+    }
+
+    rows, geojson = handler.parse_data(page)
+
+    assert [row["identifier"] for row in rows] == [2]
+    geometry = to_shape(rows[0]["geometry"])
+    assert geometry.bounds == pytest.approx(
+        (-122.41342, 37.77721, -122.40444, 37.78431), abs=1e-5
+    )
+    assert len(geojson["features"]) == 1
+
+
+def test_boundary_is_loaded_once_per_process():
+    """Test that handlers share the prepared boundary instead of reloading it"""
+    first = DummyDataHandler(url="", table=DummyModel)
+    second = TsunamiDataHandler(url="", table=TsunamiZone)
+
+    assert first.boundary is second.boundary
+    assert shapely.is_prepared(first.boundary)
@@ -0,0 +1,132 @@
+import gzip
+import json
+import pytest
+from backend.etl.geocode_cache import (
+    InMemoryGeocodeCache,
+    SQLiteGeocodeCache,
+    import_geojson,
+    open_geocode_cache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write_geojson_cache(path, features: list[dict]):
+    with gzip.open(path, "wt") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SQLiteGeocodeCache(tmp_path / "geocode_cache.sqlite")
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("cache_class", ["sqlite", "memory"])
+def test_lookup_by_normalized_address(cache_class, tmp_path):
+    if cache_class == "sqlite":
+        cache = SQLiteGeocodeCache(tmp_path / "geocode_cache.sqlite")
+    else:
+        cache = InMemoryGeocodeCache()
+
+    cache.add({"100 Main St": (-122.4, 37.8), "1 Nowhere Al": None})
+
+    assert cache.lookup("100  MAIN ST") == (True, (-122.4, 37.8))
+    assert cache.lookup("1 Nowhere Al") == (True, None)
+    assert cache.lookup("200 Main St") == (False, None)
+    assert "100 main st" in cache
+    assert len(cache) == 2
+
+
+def test_results_persist_across_connections(cache):
+    cache.add({"100 Main St": (-122.4, 37.8)})
+    cache.close()
+
+    reopened = SQLiteGeocodeCache(cache.path)
+    assert reopened.get("100 Main St") == (-122.4, 37.8)
+    reopened.close()
+
+
+def test_new_results_replace_old_ones(cache):
+    cache.add({"100 Main St": None})
+    cache.add({"100 Main St": (-122.4, 37.8)})
+
+    assert cache.get("100 Main St") == (-122.4, 37.8)
+    assert len(cache) == 1
+
+
+def test_expired_results_are_not_cached(tmp_path):
+    clock = FakeClock()
+    cache = SQLiteGeocodeCache(tmp_path / "geocode_cache.sqlite", ttl=60, clock=clock)
+    cache.add({"100 Main St": (-122.4, 37.8)})
+    clock.now += 30
+    cache.add({"200 Main St": None})
+
+    clock.now += 40
+    assert "100 Main St" not in cache
+    assert "200 Main St" in cache
+
+    assert cache.purge_expired() == 1
+    assert len(cache) == 1
+    cache.close()
+
+
+def test_invalidate(cache):
+    cache.add({"100 Main St": (-122.4, 37.8), "200 Main St": None})
+
+    cache.invalidate(["200 MAIN ST"])
+
+    assert "100 Main St" in cache
+    assert "200 Main St" not in cache
+
+
+def test_import_geojson(cache, tmp_path):
+    geojson_path = tmp_path / "mapbox_soft_story.geojson.gz"
+    write_geojson_cache(
+        geojson_path,
+        [
+            {
+                "properties": {
+                    "sfdata_address": "100 Main St",
+                    "coordinates": {"longitude": -122.4, "latitude": 37.8},
+                }
+            },
+            {"properties": {"sfdata_address": "1 Nowhere Al"}},
+        ],
+    )
+
+    assert import_geojson(cache, geojson_path) == 2
+    assert cache.get("100 Main St") == (-122.4, 37.8)
+    assert cache.lookup("1 Nowhere Al") == (True, None)
+
+
+def test_geojson_is_imported_only_into_a_new_cache(tmp_path):
+    geojson_path = tmp_path / "mapbox_soft_story.geojson.gz"
+    path = tmp_path / "geocode_cache.sqlite"
+    write_geojson_cache(geojson_path, [{"properties": {"sfdata_address": "A St"}}])
+
+    cache = open_geocode_cache(path, geojson_path)
+    cache.invalidate(["A St"])
+    cache.close()
+
+    reopened = open_geocode_cache(path, geojson_path)
+    assert "A St" not in reopened
+    reopened.close()
+
+
+def test_failed_import_leaves_no_cache(tmp_path):
+    geojson_path = tmp_path / "mapbox_soft_story.geojson.gz"
+    path = tmp_path / "geocode_cache.sqlite"
+    write_geojson_cache(geojson_path, [{"properties": {}}])
+
+    with pytest.raises(ValueError):
+        open_geocode_cache(path, geojson_path)
+
+    assert not path.exists()
@@ -0,0 +1,42 @@
+import json
+import pytest
+from backend.etl.geojson_stream import GeoJSONStreamWriter
+
+FEATURES = [
+    {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [-122.4, 37.7]},
+        "properties": {"status": "Non-Compliant"},
+    },
+    {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [-122.5, 37.8]},
+        "properties": {},
+    },
+]
+
+
+@pytest.mark.parametrize("features", [FEATURES, []])
+def test_output_matches_json_dump(tmp_path, features):
+    path = tmp_path / "Test.geojson"
+    with GeoJSONStreamWriter(path) as writer:
+        # Written in two batches, as the pages of a streaming pipeline
+        writer.write_features(features[:1])
+        writer.write_features(features[1:])
+
+    expected = json.dumps({"type": "FeatureCollection", "features": features})
+    assert path.read_text() == expected
+    assert writer.feature_count == len(features)
+
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "Test.geojson"
+    path.write_text("previous")
+
+    with pytest.raises(RuntimeError):
+        with GeoJSONStreamWriter(path) as writer:
+            writer.write_features(FEATURES)
+            raise RuntimeError("page failed")
+
+    assert path.read_text() == "previous"
+    assert not (tmp_path / "Test.geojson.partial").exists()
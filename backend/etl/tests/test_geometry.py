@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from unittest.mock import patch
+import shapely
+from pyproj import Transformer
+from shapely.geometry import MultiPolygon, Polygon, box
+from shapely.ops import transform
+from backend.etl.geometry import (
+    clip_to_boundary,
+    get_transformer,
+    multipolygons_from_rings,
+    prepare_boundary,
+    transform_geometries,
+)
+
+# A square of about 1 km in downtown San Francisco, in EPSG:3857
+SF_RING = [
+    [-13627000, 4548000],
+    [-13626000, 4548000],
+    [-13626000, 4549000],
+    [-13627000, 4549000],
+    [-13627000, 4548000],
+]
+
+
+def test_transformer_is_created_once_per_crs_pair():
+    assert get_transformer(3857, 4326) is get_transformer(3857, 4326)
+    assert get_transformer(3857, 4326) is not get_transformer(4326, 3857)
+
+
+def test_transform_geometries_matches_point_by_point_transform():
+    polygon = Polygon(SF_RING)
+    transformer = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+    expected = transform(transformer.transform, polygon)
+
+    transformed = transform_geometries(np.array([polygon, polygon]), 3857)
+
+    for geometry in transformed:
+        assert geometry.equals_exact(expected, tolerance=1e-12)
+    assert transform_geometries(polygon, 3857).equals_exact(expected, 1e-12)
+
+
+def test_multipolygons_from_rings_makes_a_polygon_per_ring():
+    small_ring = [[0, 0], [1, 0], [0, 0]]
+    other_ring = [[0, 0], [2, 0], [2, 2], [0, 0]]
+
+    multipolygons = multipolygons_from_rings(
+        [[SF_RING, small_ring, other_ring], [small_ring], [other_ring]]
+    )
+
+    assert list(multipolygons) == [
+        MultiPolygon([Polygon(SF_RING), Polygon(other_ring)]),
+        MultiPolygon(),
+        MultiPolygon([Polygon(other_ring)]),
+    ]
+
+
+@pytest.mark.parametrize("features_rings", [[], [[]]])
+def test_multipolygons_from_rings_without_valid_rings(features_rings):
+    multipolygons = multipolygons_from_rings(features_rings)
+
+    assert len(multipolygons) == len(features_rings)
+    assert shapely.is_empty(multipolygons).all()
+
+
+def test_clip_to_boundary_only_intersects_straddling_geometries():
+    boundary = prepare_boundary(box(0, 0, 10, 10))
+    inside = MultiPolygon([box(1, 1, 2, 2)])
+    straddling = box(8, 8, 12, 12)
+    # Bounding box overlaps the boundary's, but the shape misses it
+    near = Polygon([(11, 0), (12, 0), (12, 12), (11, 0)]).union(box(-5, 11, -4, 12))
+    outside = box(20, 20, 21, 21)
+
+    with patch(
+        "backend.etl.geometry.shapely.intersection", wraps=shapely.intersection
+    ) as mock_intersection:
+        clipped = clip_to_boundary(
+            np.array([inside, straddling, near, outside, MultiPolygon()]), boundary
+        )
+
+    assert clipped[0] is inside
+    assert clipped[1].equals(box(8, 8, 10, 10))
+    assert shapely.is_empty(clipped[2:]).all()
+    assert len(mock_intersection.call_args.args[0]) == 1
+
+
+def test_clip_to_boundary_of_empty_page():
+    assert len(clip_to_boundary(np.array([], dtype=object), box(0, 0, 1, 1))) == 0
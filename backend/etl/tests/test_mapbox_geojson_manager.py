@@ -1,7 +1,18 @@
+import gzip
+import httpx
 import pytest
 import json
-from unittest.mock import patch, MagicMock, mock_open
-from requests import Response
+import threading
+import time
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from backend.etl.async_request_handler import (
+    AsyncRequestHandler,
+    EventLoopThread,
+    create_async_client,
+)
+from backend.etl.geocode_cache import InMemoryGeocodeCache
 from backend.etl.mapbox_geojson_manager import (
     _BatchMapboxGeocoder,
     MapboxGeojsonManager,
@@ -10,6 +21,109 @@ from backend.etl.mapbox_geojson_manager import (
 from pathlib import Path
 
 
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def mock_geocoder(mapbox_config, respond) -> _BatchMapboxGeocoder:
+    """Geocoder whose requests are answered by `respond`"""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+    return _BatchMapboxGeocoder(
+        mapbox_config, request_handler=AsyncRequestHandler(client)
+    )
+
+
+class StubMapboxServer(ThreadingHTTPServer):
+    """
+    Local stand-in of the Mapbox batch API, geocoding each query to a
+    point whose longitude is the query's number. The first batch answers
+    slowest, and the first request of `rate_limited_queries` is
+    rejected with a 429.
+    """
+
+    def __init__(self, rate_limited_queries: str = ""):
+        super().__init__(("127.0.0.1", 0), StubMapboxRequestHandler)
+        self.rate_limited_queries = rate_limited_queries
+        self.requests: list[list[str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/batch"
+
+
+class StubMapboxRequestHandler(BaseHTTPRequestHandler):
+    server: StubMapboxServer
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        queries = [request["q"] for request in body]
+        server = self.server
+        with server.lock:
+            server.requests.append(queries)
+            rate_limited = (
+                server.rate_limited_queries in queries
+                and server.requests.count(queries) == 1
+            )
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            if rate_limited:
+                self._respond(429, {"message": "Too Many Requests"}, retry_after=0)
+                return
+            # Later batches answer first, to check the order of the features
+            time.sleep(0.2 if "0" in queries else 0.05)
+            self._respond(
+                200,
+                {
+                    "batch": [
+                        {
+                            "features": [
+                                {
+                                    "properties": {
+                                        "coordinates": {
+                                            "longitude": float(query),
+                                            "latitude": 37.0,
+                                        }
+                                    }
+                                }
+                            ]
+                        }
+                        for query in queries
+                    ]
+                },
+            )
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _respond(self, status: int, data: dict, retry_after=None):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = StubMapboxServer(rate_limited_queries="4")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture
 def api_key():
     return "abdefg"
@@ -49,50 +163,72 @@ class TestBatchMapboxGeocoder:
             "bbox": geocoder._mapbox_config.bounding_box_string,
         }, "Request payload should match expected structure"
 
-    @patch("requests.post")
-    def test_post_request_success(self, mock_post, geocoder):
+    @pytest.mark.anyio
+    async def test_post_request_success(self, mapbox_config):
         """
-        Tests the _post_request method to ensure it calls requests.post correctly
-        and returns the response when successful.
+        Tests the _post_request method to ensure it posts the batch
+        payload correctly and returns the response when successful.
         """
-        # Mock a 200 Response object
-        mock_response = MagicMock(spec=Response)
-        mock_response.raise_for_status.return_value = None
-        mock_response.json.return_value = {"batch": []}
+        requests = []
 
-        # The mock_post is the patched requests.post
-        mock_post.return_value = mock_response
+        def respond(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"batch": []})
 
+        geocoder = mock_geocoder(mapbox_config, respond)
         batch_payload = [{"types": ["address"], "q": "Test", "limit": 1}]
-        response = geocoder._post_request(batch_payload)
-
-        # Check that requests.post was called with the correct arguments
-        mock_post.assert_called_once_with(
-            geocoder._mapbox_config.geocode_api_endpoint_url,
-            json=batch_payload,
-            params={
-                "access_token": geocoder._mapbox_config.api_key,
-                "permanent": "false",
-            },
-            headers={"Content-Type": "application/json"},
+        response = await geocoder._post_request(batch_payload)
+
+        # Check that the request was sent with the correct arguments
+        assert len(requests) == 1
+        request = requests[0]
+        assert request.method == "POST"
+        assert request.url.copy_with(query=None) == (
+            geocoder._mapbox_config.geocode_api_endpoint_url
         )
+        assert dict(request.url.params) == {
+            "access_token": geocoder._mapbox_config.api_key,
+            "permanent": "false",
+        }
+        assert request.headers["Content-Type"] == "application/json"
+        assert json.loads(request.content) == batch_payload
         # Verify the return value
-        assert response is mock_response
         assert response.json() == {"batch": []}
 
-    @patch("requests.post")
-    def test_post_request_http_error(self, mock_post, geocoder):
+    @pytest.mark.anyio
+    async def test_post_request_http_error(self, mapbox_config):
         """
-        Tests that an HTTPError is raised if the response's raise_for_status() fails.
+        Tests that an HTTPStatusError is raised if the request fails.
         """
-        mock_response = MagicMock(spec=Response)
-        # Make it raise an HTTPError
-        mock_response.raise_for_status.side_effect = Exception("HTTP Error")
-        mock_post.return_value = mock_response
+        geocoder = mock_geocoder(
+            mapbox_config, lambda request: httpx.Response(401, json={})
+        )
 
-        with pytest.raises(Exception) as excinfo:
-            geocoder._post_request([{}])
-        assert "HTTP Error" in str(excinfo.value)
+        with pytest.raises(httpx.HTTPStatusError) as excinfo:
+            await geocoder._post_request([{}])
+        assert "401" in str(excinfo.value)
+
+    @pytest.mark.anyio
+    async def test_post_request_retries_rate_limited_batches(self, mapbox_config):
+        """
+        Tests that a rate-limited batch is sent again after its
+        Retry-After delay.
+        """
+        statuses = iter([429, 200])
+
+        def respond(request: httpx.Request) -> httpx.Response:
+            status = next(statuses)
+            headers = {"Retry-After": "0"} if status == 429 else {}
+            return httpx.Response(status, json={"batch": []}, headers=headers)
+
+        geocoder = _BatchMapboxGeocoder(mapbox_config)
+        geocoder._request_handler.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(respond)
+        )
+
+        response = await geocoder._post_request([{}])
+
+        assert response.status_code == 200
 
     @patch.object(_BatchMapboxGeocoder, "_post_request")
     def test_batch_geocode_addresses_one_batch(self, mock_post_request, geocoder):
@@ -103,7 +239,7 @@ class TestBatchMapboxGeocoder:
         addresses = ["Address 1", "Address 2"]
 
         # Mock the JSON response you'd get from Mapbox
-        mock_response = MagicMock(spec=Response)
+        mock_response = MagicMock(spec=httpx.Response)
         # We expect "batch" to have the same # of items as addresses
         mock_response.json.return_value = {
             "batch": [
@@ -124,51 +260,119 @@ class TestBatchMapboxGeocoder:
         # Verify only one batch call was made since we have 2 addresses
         mock_post_request.assert_called_once()
 
+    def test_batches_are_geocoded_concurrently_in_order(
+        self, mapbox_config, stub_server
+    ):
+        """
+        Tests batch_geocode_addresses against a local stub of the
+        Mapbox API: batches run concurrently, a rate-limited batch is
+        retried, and the features come back in the order of the
+        addresses.
+        """
+        config = replace(
+            mapbox_config,
+            geocode_api_endpoint_url=stub_server.url,
+            batch_limit=2,
+            max_concurrent_batches=3,
+            requests_per_minute=6000,
+        )
+        event_loop = EventLoopThread()
+        try:
+            geocoder = _BatchMapboxGeocoder(config, event_loop=event_loop)
+            geocoder._request_handler.client = create_async_client()
+            addresses = [str(number) for number in range(10)]
+
+            features = geocoder.batch_geocode_addresses(addresses)
+        finally:
+            event_loop.close()
+
+        assert [f["properties"]["sfdata_address"] for f in features] == addresses
+        assert [f["properties"]["coordinates"]["longitude"] for f in features] == list(
+            range(10)
+        )
+        # 5 batches and the retry of the rate-limited one
+        assert len(stub_server.requests) == 6
+        assert stub_server.max_in_flight == 3
+
+    def test_failed_batch_fails_the_geocoding(self, mapbox_config):
+        """
+        Tests that a batch with a mismatched response fails the whole
+        geocoding.
+        """
+        geocoder = mock_geocoder(
+            replace(mapbox_config, batch_limit=1),
+            lambda request: httpx.Response(200, json={"batch": []}),
+        )
+
+        with pytest.raises(ValueError):
+            geocoder.batch_geocode_addresses(["Address 1", "Address 2"])
+
 
 class TestMapboxGeojsonManager:
     @pytest.fixture
     def manager(self, mapbox_config):
         """
-        Fixture that patches MapboxGeojsonManager._mapbox_points so it doesn't
-        actually read from a file but instead returns a mock dictionary.
+        Fixture of a manager whose cache is kept in memory instead of
+        being read from a file.
         """
-        with patch.object(
-            MapboxGeojsonManager,
-            "_get_mapbox_points",
-            return_value={"Some Address": (1.0, 2.0)},
-        ):
-            mgr = MapboxGeojsonManager(mapbox_config)
-            yield mgr
-
-    def test_mapbox_points_read_file(self, manager):
+        return MapboxGeojsonManager(
+            mapbox_config,
+            cache=InMemoryGeocodeCache({"Some Address": (1.0, 2.0)}),
+        )
+
+    def test_cache_is_imported_from_geojson_on_first_use(self, tmp_path):
         """
-        Tests that _get_mapbox_points() reads the geojson file and builds the dict correctly.
-        We'll patch the open call and simulate a small geojson.
+        Tests that the SQLite cache is created from the geojson file the
+        first time an address is looked up.
         """
-        result = manager._get_mapbox_points()
+        geojson_path = tmp_path / "mapbox_soft_story.geojson.gz"
+        feature = {
+            "properties": {
+                "sfdata_address": "Some Address",
+                "coordinates": {"longitude": 1.0, "latitude": 2.0},
+            }
+        }
+        with gzip.open(geojson_path, "wt") as f:
+            json.dump({"type": "FeatureCollection", "features": [feature]}, f)
+        config = MapboxConfig(
+            min_longitude=-122.51436038,
+            min_latitude=37.70799051,
+            max_longitude=-122.36206898,
+            max_latitude=37.83179017,
+            geocode_api_endpoint_url="https://someurl.com/endpoint",
+            soft_story_geojson_path=geojson_path,
+            api_key="abdefg",
+            geocode_cache_path=tmp_path / "geocode_cache.sqlite",
+        )
 
-        assert result == {
-            "Some Address": (1.0, 2.0)
-        }, "Should parse addresses to coordinate tuples"
+        manager = MapboxGeojsonManager(config)
+        assert not config.geocode_cache_path.exists()
+
+        assert manager.is_address_in_geojson("Some Address")
+        assert manager.get_mapbox_coordinates("Some Address") == (1.0, 2.0)
+        assert config.geocode_cache_path.exists()
 
     def test_get_mapbox_coordinates(self, manager):
         """
-        Tests get_mapbox_coordinates by mocking manager.mapbox_points directly.
+        Tests get_mapbox_coordinates on the cached results.
         """
-        manager._mapbox_points = {
-            "Some Address": (-123.0, 38.0),
-            "Missing Address": None,
-        }
+        manager._cache.add(
+            {
+                "Some Address": (-123.0, 38.0),
+                "Missing Address": None,
+            }
+        )
 
         coords = manager.get_mapbox_coordinates("Some Address")
         assert coords == (-123.0, 38.0)
 
-        # TODO: dinstinguish between the following two cases
         coords_none = manager.get_mapbox_coordinates("Missing Address")
         assert coords_none is None
+        assert manager.is_address_in_geojson("Missing Address")
 
         coords_not_found = manager.get_mapbox_coordinates("Does Not Exist")
         assert coords_not_found is None
+        assert not manager.is_address_in_geojson("Does Not Exist")
 
     def test_parse_mapbox_features(self, manager):
         """
@@ -197,78 +401,15 @@ class TestMapboxGeojsonManager:
         coords_map = manager._parse_mapbox_features(features)
         assert coords_map == {"Addr 1": (-122.4, 37.8), "Addr 2": (-122.3, 37.7)}
 
-    def test_write_to_geojson_new_file(self, manager):
-        """
-        Tests write_to_geojson when the geojson file doesn't exist.
-        """
-
-        # Create the mock file object that will simulate reading/writing
-        mocked_file = mock_open(
-            read_data='{"type": "FeatureCollection", "features": []}'
-        )
-
-        # Patch the builtin open to use our mock
-        with patch("gzip.open", mocked_file), patch.object(
-            Path, "exists", return_value=False
-        ):
-            manager._write_to_geojson(
-                [{"type": "Feature", "properties": {"sfdata_address": "New Address"}}]
-            )
-
-        handle = mocked_file()
-        written_data = json.loads(
-            "".join([call[0][0] for call in handle.write.call_args_list])
-        )
-
-        assert "features" in written_data
-        assert len(written_data["features"]) == 1
-        assert (
-            written_data["features"][0]["properties"]["sfdata_address"] == "New Address"
-        )
-
-    def test_write_to_geojson_append(self, manager):
-        """
-        If the file exists, we append new features to existing ones.
-        We'll patch Path.exists() to return True.
-        """
-        # Create a mock file containing one existing feature
-        initial_data = '{"type": "FeatureCollection", "features": [{"properties": {"sfdata_address": "Old Address"}}]}'
-        m = mock_open(read_data=initial_data)
-
-        with patch("gzip.open", m), patch.object(Path, "exists", return_value=True):
-            new_features = [
-                {
-                    "properties": {"sfdata_address": "Appended Address"},
-                    "type": "Feature",
-                }
-            ]
-            # This call now uses our mock file instead of a real file
-            manager._write_to_geojson(new_features)
-
-        # The final write should contain both the old and new features
-        handle = m()  # 'm()' is the mock file handle
-        written_data = json.loads(
-            "".join([call[0][0] for call in handle.write.call_args_list])
-        )
-        all_features = written_data["features"]
-        assert len(all_features) == 2
-
-        addresses = [f["properties"]["sfdata_address"] for f in all_features]
-        assert "Old Address" in addresses
-        assert "Appended Address" in addresses
-
     @patch.object(_BatchMapboxGeocoder, "batch_geocode_addresses")
     @patch.object(MapboxGeojsonManager, "_parse_mapbox_features")
-    @patch.object(MapboxGeojsonManager, "_write_to_geojson")
-    def test_batch_geocode_addresses_integration(
-        self, mock_write, mock_parse, mock_batch, manager
-    ):
+    def test_batch_geocode_addresses_integration(self, mock_parse, mock_batch, manager):
         """
         Tests the batch_geocode_addresses() high-level method.
         Ensures it:
         1) Calls geocoder.batch_geocode_addresses()
         2) Calls _parse_mapbox_features() on the result
-        3) Calls _write_to_geojson() with those features
+        3) Adds the coordinates to the cache
         4) Returns the coordinate dictionary
         """
         # Mock the geocoder's return
@@ -292,6 +433,25 @@ class TestMapboxGeojsonManager:
         # Check the calls
         mock_batch.assert_called_once_with(addresses)
         mock_parse.assert_called_once_with(mock_features)
-        mock_write.assert_called_once_with(mock_features)
+        assert manager.get_mapbox_coordinates("Addr X") == (-122.4, 37.8)
 
         assert result == {"Addr X": (-122.4, 37.8)}
+
+    @patch.object(_BatchMapboxGeocoder, "batch_geocode_addresses")
+    def test_near_duplicate_addresses_are_geocoded_once(self, mock_batch, manager):
+        mock_batch.return_value = [
+            {
+                "properties": {
+                    "sfdata_address": "1 MAIN ST",
+                    "coordinates": {"longitude": -122.4, "latitude": 37.8},
+                }
+            }
+        ]
+
+        result = manager.batch_geocode_addresses(
+            ["1 MAIN ST", "01 MAIN  ST", "1 MAIN ST"]
+        )
+
+        mock_batch.assert_called_once_with(["1 MAIN ST"])
+        assert result == {"1 MAIN ST": (-122.4, 37.8), "01 MAIN  ST": (-122.4, 37.8)}
+        assert manager.get_mapbox_coordinates("1 Main St.") == (-122.4, 37.8)
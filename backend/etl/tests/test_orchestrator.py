@@ -0,0 +1,119 @@
+import io
+import threading
+from typing import Optional
+from unittest.mock import MagicMock, patch
+import pytest
+from backend.etl.__main__ import main
+from backend.etl.orchestrator import (
+    Dataset,
+    DatasetResult,
+    format_report,
+    required_tables,
+    resolve_datasets,
+    run_datasets,
+)
+
+
+def fake_dataset(
+    name: str, rows: int = 1, error: Optional[Exception] = None, barrier=None
+):
+    """Dataset whose handler records the session it was built with"""
+    handlers = []
+
+    def build(session):
+        handler = MagicMock()
+        handler.session = session
+        handler.stage_timings = {"fetch": 1.0, "load": 2.0}
+        handlers.append(handler)
+        return handler
+
+    def run(handler):
+        if barrier is not None:
+            barrier.wait(timeout=5)
+        if error is not None:
+            raise error
+        return rows
+
+    dataset = Dataset(name, f"{name}_table", build, run)
+    return dataset, handlers
+
+
+def test_required_tables_reads_init_db_output(caplog):
+    output = [
+        "Database tables created.\n",
+        "ETL_REQUIRED:tsunami_zones\n",
+        "ETL_REQUIRED:soft_story_properties\n",
+        "ETL_REQUIRED:unknown_table\n",
+    ]
+
+    assert required_tables(output) == ["tsunami_zones", "soft_story_properties"]
+    assert "No ETL mapping for unknown_table" in caplog.text
+
+
+def test_resolve_datasets_by_dataset_or_table_name():
+    datasets = resolve_datasets(["tsunami", "soft_story_properties", "tsunami_zones"])
+
+    assert [dataset.name for dataset in datasets] == ["tsunami", "soft_story"]
+
+
+def test_resolve_unknown_dataset():
+    with pytest.raises(ValueError):
+        resolve_datasets(["seismic"])
+
+
+def test_run_datasets_concurrently_with_shared_session():
+    barrier = threading.Barrier(2)
+    first, first_handlers = fake_dataset("first", rows=3, barrier=barrier)
+    second, second_handlers = fake_dataset("second", rows=5, barrier=barrier)
+
+    results = run_datasets([first, second], jobs=2)
+
+    assert [(result.name, result.rows) for result in results] == [
+        ("first", 3),
+        ("second", 5),
+    ]
+    assert first_handlers[0].session is second_handlers[0].session
+    assert first_handlers[0].keep_session_open is True
+    first_handlers[0].export_tiles_if_changed.assert_called_once()
+    assert results[0].timings["load"] == 2.0
+    assert {"init", "tiles", "total"} <= set(results[0].timings)
+
+
+def test_run_datasets_records_failures():
+    failing, _ = fake_dataset("failing", error=RuntimeError("API down"))
+    working, _ = fake_dataset("working")
+
+    results = run_datasets([failing, working], jobs=1)
+
+    assert not results[0].succeeded
+    assert str(results[0].error) == "API down"
+    assert results[1].succeeded
+
+
+def test_format_report():
+    report = format_report(
+        [DatasetResult("tsunami", rows=12, timings={"fetch": 1.5, "total": 2.0})]
+    )
+
+    header, line = report.splitlines()
+    assert header.split()[:4] == ["dataset", "status", "rows", "init"]
+    assert line.split()[:5] == ["tsunami", "ok", "12", "0.00", "1.50"]
+
+
+def test_main_without_required_tables_runs_nothing():
+    with patch("backend.etl.__main__.run_datasets") as mock_run:
+        with patch("sys.stdin", io.StringIO("All required tables exist.\n")):
+            assert main(["run", "--required-from", "-"]) == 0
+
+    mock_run.assert_not_called()
+
+
+def test_main_runs_required_tables():
+    failed = DatasetResult("tsunami", error=RuntimeError())
+    with patch("backend.etl.__main__.run_datasets", return_value=[failed]) as mock_run:
+        with patch("sys.stdin", io.StringIO("ETL_REQUIRED:tsunami_zones\n")):
+            assert main(["run", "--required-from", "-", "--jobs", "2"]) == 1
+
+    datasets = mock_run.call_args.args[0]
+    assert [dataset.name for dataset in datasets] == ["tsunami"]
+    assert mock_run.call_args.kwargs == {"jobs": 2}
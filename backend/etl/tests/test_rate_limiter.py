@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import pytest
+from backend.etl.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    """Clock advanced by the sleeps of the rate limiter"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_first_request_is_not_delayed():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert clock.sleeps == []
+
+
+def test_requests_are_paced_at_the_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, clock=clock, sleep=clock.sleep)
+
+    for _ in range(5):
+        bucket.acquire()
+
+    assert clock.sleeps == [0.5, 0.5, 0.5, 0.5]
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_idle_time_refills_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=3, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+
+    clock.now += 10.0
+    # Only 3 tokens were refilled, the 4th request waits
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits == [0, 0, 0, pytest.approx(1.0)]
+
+
+def test_concurrent_callers_share_the_rate():
+    bucket = TokenBucket(rate=200.0)
+    waits = []
+    lock = threading.Lock()
+
+    def worker():
+        wait = bucket.acquire()
+        with lock:
+            waits.append(wait)
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One request goes through at once, the others queue 5ms apart
+    assert sorted(waits)[-1] == pytest.approx(9 / 200.0, abs=0.02)
+
+
+def test_async_acquire_waits_on_the_event_loop():
+    bucket = TokenBucket(rate=100.0)
+
+    async def acquire_twice():
+        return [await bucket.acquire_async() for _ in range(2)]
+
+    waits = asyncio.run(acquire_twice())
+
+    assert waits[0] == 0
+    assert waits[1] == pytest.approx(0.01, abs=0.005)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
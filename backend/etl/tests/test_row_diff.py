@@ -0,0 +1,49 @@
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Polygon
+from backend.etl.row_diff import RowDiff, diff_rows, normalized_wkb, row_hash
+
+
+def test_normalized_wkb_ignores_vertex_order_and_encoding():
+    square = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+    reversed_square = Polygon([(0, 1), (1, 1), (1, 0), (0, 0)])
+
+    assert normalized_wkb(from_shape(square, srid=4326)) == normalized_wkb(
+        reversed_square.wkt
+    )
+
+
+def test_row_hash_depends_on_content_only():
+    row = {"id": 1, "name": "a", "point": "Point(1 2)", "loaded_at": "2024-01-01"}
+
+    same = {"loaded_at": "2024-01-02", "point": "POINT (1 2)", "name": "a", "id": 1}
+    changed = {**row, "name": "b"}
+
+    assert row_hash(row, ["point"], ["loaded_at"]) == row_hash(
+        same, ["point"], ["loaded_at"]
+    )
+    assert row_hash(row, ["point"]) != row_hash(same, ["point"])
+    assert row_hash(row, ["point"]) != row_hash(changed, ["point"])
+
+
+def test_diff_rows_keeps_inserted_and_updated_rows():
+    unchanged = {"id": 1, "name": "same"}
+    updated = {"id": 2, "name": "new"}
+    inserted = {"id": 3, "name": "added"}
+    stored = {"1": row_hash(unchanged), "2": row_hash({"id": 2, "name": "old"})}
+    diff = RowDiff()
+
+    rows, hashes = diff_rows([unchanged, updated, inserted], "id", stored, diff)
+
+    assert rows == [updated, inserted]
+    assert hashes == {"2": row_hash(updated), "3": row_hash(inserted)}
+    assert (diff.inserted, diff.updated, diff.unchanged) == (1, 1, 1)
+
+
+def test_diff_rows_skips_duplicates_within_a_page():
+    row = {"id": 1, "name": "a"}
+    diff = RowDiff()
+
+    rows, _ = diff_rows([row, dict(row)], "id", {}, diff)
+
+    assert rows == [row]
+    assert diff.summary() == "1 inserted, 0 updated, 1 unchanged, 0 deleted"
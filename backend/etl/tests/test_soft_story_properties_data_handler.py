@@ -1,6 +1,7 @@
 import re
 import pytest
 from unittest.mock import patch, MagicMock
+from shapely.wkt import loads
 from backend.etl.soft_story_properties_data_handler import (
     _SoftStoryPropertiesDataHandler,
 )
@@ -403,3 +404,76 @@ def test_addresses_from_range():
     assert addresses[1] == "1235 Grove St."
     assert addresses[2] == "1236 Grove St."
     assert addresses[3] == "1237 Grove St."
+
+
+def soft_story_feature(address: str, coordinates=None) -> dict:
+    return {
+        "type": "Feature",
+        "properties": {"address": address, "status": "Complete"},
+        "geometry": (
+            {"type": "Point", "coordinates": coordinates} if coordinates else None
+        ),
+    }
+
+
+def test_parse_data_geocodes_range_ends_and_interpolates(handler, mock_mapbox_manager):
+    geocoded = {"1230 Grove St": (-122.43, 37.77), "1234 Grove St": (-122.42, 37.78)}
+    cached = {"1231 Grove St": (-122.5, 37.5)}
+    mock_mapbox_manager.is_address_in_geojson.side_effect = cached.__contains__
+    mock_mapbox_manager.batch_geocode_addresses.return_value = geocoded
+    mock_mapbox_manager.get_mapbox_coordinates.side_effect = lambda address: {
+        **cached,
+        **geocoded,
+    }.get(address)
+
+    parsed, _ = handler.parse_data(
+        {"features": [soft_story_feature("1230-1234 Grove St", [-122.4, 37.7])]}
+    )
+
+    # Only the ends of the range are sent to Mapbox
+    mock_mapbox_manager.batch_geocode_addresses.assert_called_once_with(
+        ["1230 Grove St", "1234 Grove St"]
+    )
+    assert [row["point_source"] for row in parsed] == [
+        "mapbox",
+        "mapbox",
+        "interpolated",
+        "interpolated",
+        "mapbox",
+    ]
+    assert parsed[1]["point"] == "Point(-122.5 37.5)"
+    point = loads(parsed[2]["point"])
+    assert (point.x, point.y) == pytest.approx((-122.425, 37.775))
+
+
+def test_parse_data_keeps_sfdata_points_when_range_ends_are_not_geocoded(
+    handler, mock_mapbox_manager
+):
+    mock_mapbox_manager.is_address_in_geojson.return_value = False
+    mock_mapbox_manager.batch_geocode_addresses.return_value = {}
+
+    parsed, _ = handler.parse_data(
+        {"features": [soft_story_feature("1-3 Grove St", [-122.4, 37.7])]}
+    )
+
+    assert [row["point_source"] for row in parsed] == ["sfdata"] * 3
+
+
+def test_parse_data_collapses_near_duplicate_addresses(handler, mock_mapbox_manager):
+    mock_mapbox_manager.is_address_in_geojson.return_value = False
+    mock_mapbox_manager.batch_geocode_addresses.return_value = {}
+
+    parsed, _ = handler.parse_data(
+        {
+            "features": [
+                soft_story_feature("1401 CHESTNUT ST, SAN FRANCISCO CA"),
+                soft_story_feature("1401 CHESTNUT  ST , SAN FRANCISCO CA"),
+                soft_story_feature("1402 CHESTNUT ST, SAN FRANCISCO CA"),
+            ]
+        }
+    )
+
+    assert [row["address"] for row in parsed] == [
+        "1401 CHESTNUT  ST , SAN FRANCISCO CA",
+        "1402 CHESTNUT ST, SAN FRANCISCO CA",
+    ]
@@ -0,0 +1,72 @@
+import gzip
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+from backend.api.vector_tiles import TILE_LAYERS
+from backend.etl.tile_archive import mbtiles_metadata, write_mbtiles
+
+SF_BOUNDS = (-122.52, 37.70, -122.35, 37.83)
+
+REPO_DIR = Path(__file__).parents[3]
+
+
+def test_write_mbtiles(tmp_path):
+    path = tmp_path / "TsunamiZone.mbtiles"
+    metadata = mbtiles_metadata("tsunami", TILE_LAYERS["tsunami"], SF_BOUNDS, 10, 12)
+    tiles = [(10, 163, 395, b"tile-a"), (12, 655, 1582, b"tile-b")]
+
+    assert write_mbtiles(path, tiles, metadata) == 2
+    assert not (tmp_path / "TsunamiZone.mbtiles.partial").exists()
+
+    connection = sqlite3.connect(path)
+    try:
+        rows = connection.execute(
+            "SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles "
+            "ORDER BY zoom_level"
+        ).fetchall()
+        stored_metadata = dict(connection.execute("SELECT name, value FROM metadata"))
+    finally:
+        connection.close()
+
+    # Rows are flipped to the TMS scheme and tiles are gzipped
+    assert [row[:3] for row in rows] == [(10, 163, 628), (12, 655, 2513)]
+    assert gzip.decompress(rows[1][3]) == b"tile-b"
+
+    assert stored_metadata["format"] == "pbf"
+    assert stored_metadata["minzoom"] == "10"
+    assert stored_metadata["maxzoom"] == "12"
+    vector_layer = json.loads(stored_metadata["json"])["vector_layers"][0]
+    assert vector_layer["id"] == "tsunami"
+    assert vector_layer["fields"] == {"identifier": "Number", "evacuate": "String"}
+
+
+def test_write_mbtiles_replaces_previous_archive(tmp_path):
+    path = tmp_path / "TsunamiZone.mbtiles"
+    metadata = mbtiles_metadata("tsunami", TILE_LAYERS["tsunami"], SF_BOUNDS, 10, 10)
+    write_mbtiles(path, [(10, 163, 395, b"old")], metadata)
+    write_mbtiles(path, [], metadata)
+
+    connection = sqlite3.connect(path)
+    try:
+        assert connection.execute("SELECT count(*) FROM tiles").fetchone() == (0,)
+    finally:
+        connection.close()
+
+
+def test_tile_archive_does_not_import_the_api():
+    code = (
+        "import sys, backend.etl.tile_archive\n"
+        "print([m for m in sys.modules if m.startswith('backend.api.routers')"
+        " or m == 'backend.api.cache'])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == "[]"
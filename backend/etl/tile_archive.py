@@ -0,0 +1,107 @@
+"""
+Writes pre-rendered vector tiles to MBTiles archives, single SQLite
+files that can be served statically or converted to PMTiles
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+from sqlalchemy import Float, Integer
+from backend.api.vector_tiles import TileLayer
+
+_MBTILES_SCHEMA = """
+CREATE TABLE metadata (name TEXT, value TEXT);
+CREATE TABLE tiles (
+    zoom_level INTEGER,
+    tile_column INTEGER,
+    tile_row INTEGER,
+    tile_data BLOB
+);
+CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+"""
+
+
+def mbtiles_metadata(
+    name: str,
+    layer: TileLayer,
+    bounds: tuple[float, float, float, float],
+    min_zoom: int,
+    max_zoom: int,
+) -> dict[str, str]:
+    """
+    Builds the metadata table of an MBTiles archive of vector tiles
+
+    Args:
+        name (str): Name of the layer inside the tiles
+        layer (TileLayer): The layer the tiles are rendered from
+        bounds: (min lon, min lat, max lon, max lat) covered by the tiles
+        min_zoom (int): Lowest zoom level of the archive
+        max_zoom (int): Highest zoom level of the archive
+    """
+    fields = {
+        property: ("Number" if isinstance(column.type, (Integer, Float)) else "String")
+        for property, column in layer.properties.items()
+    }
+    vector_layer = {
+        "id": name,
+        "fields": fields,
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+    }
+    return {
+        "name": name,
+        "format": "pbf",
+        "type": "overlay",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": ",".join(str(value) for value in bounds),
+        "json": json.dumps({"vector_layers": [vector_layer]}),
+    }
+
+
+def write_mbtiles(
+    path: Path,
+    tiles: Iterable[tuple[int, int, int, bytes]],
+    metadata: dict[str, str],
+) -> int:
+    """
+    Writes tiles to an MBTiles archive, replacing any previous archive
+
+    The archive is written next to `path` and moved into place once
+    complete, so that a reader never sees a partial archive.
+
+    Args:
+        path (Path): Path of the archive
+        tiles: (z, x, y, data) of each tile, with y counted from the
+            north as in XYZ tile URLs; data is the uncompressed MVT
+        metadata: Content of the metadata table
+
+    Returns:
+        The number of tiles written
+    """
+    partial_path = path.with_name(path.name + ".partial")
+    partial_path.unlink(missing_ok=True)
+
+    count = 0
+    connection = sqlite3.connect(partial_path)
+    try:
+        connection.executescript(_MBTILES_SCHEMA)
+        connection.executemany(
+            "INSERT INTO metadata (name, value) VALUES (?, ?)", metadata.items()
+        )
+        for z, x, y, data in tiles:
+            # MBTiles rows follow the TMS scheme, counted from the south
+            connection.execute(
+                "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+                (z, x, (1 << z) - 1 - y, gzip.compress(data)),
+            )
+            count += 1
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(partial_path, path)
+    return count
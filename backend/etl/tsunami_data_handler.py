@@ -1,10 +1,17 @@
 from http.client import HTTPException
-from backend.etl.data_handler import DataHandler
+from typing import Optional
+from backend.etl.data_handler import DataHandler, configure_logging
+from backend.etl.geometry import clip_to_boundary, multipolygons_from_rings
 from backend.api.models.tsunami import TsunamiZone
-from shapely.geometry import Polygon, MultiPolygon, mapping
+from shapely.geometry import mapping
 from geoalchemy2.shape import from_shape, to_shape
 
 TSUNAMI_URL = "https://services2.arcgis.com/zr3KAIbsRSUyARHG/ArcGIS/rest/services/CA_Tsunami_Hazard_Area/FeatureServer/0/query"
+TSUNAMI_PARAMS = {
+    "where": "County='San Francisco' AND Evacuate='Yes, Tsunami Hazard Area'",
+    "outFields": "*",
+    "f": "json",
+}
 
 
 class TsunamiDataHandler(DataHandler):
@@ -13,6 +20,27 @@ class TsunamiDataHandler(DataHandler):
     conservation.ca.gov
     """
 
+    tile_layer = "tsunami"
+
+    def _page_params(self, offset: int) -> dict:
+        """ArcGIS FeatureServer pagination parameters"""
+        return {"resultOffset": offset, "resultRecordCount": self.page_size}
+
+    def _fetch_total_count(self, params: Optional[dict] = None) -> Optional[int]:
+        """Number of matching records, from an ArcGIS `returnCountOnly` query"""
+        count_params = {**(params or {}), "returnCountOnly": "true", "f": "json"}
+        count_params.pop("outFields", None)
+        try:
+            return int(
+                self.request_handler.make_request(self.url, count_params)["count"]
+            )
+        except Exception as e:
+            self.logger.warning(
+                f"{self.table.__name__}: Could not get the total count, "
+                f"fetching pages sequentially: {e}"
+            )
+            return None
+
     def parse_data(self, data: dict) -> tuple[list[dict], dict]:
         """
         Extracts feature attributes and geometry data to construct:
@@ -26,21 +54,20 @@ class TsunamiDataHandler(DataHandler):
         parsed_data = []
         geojson_features = []
 
-        for feature in features:
+        # Each valid ring becomes a polygon; the whole page is built,
+        # transformed from SRID 3857 to 4326 and clipped to SF at once
+        multipolygons = multipolygons_from_rings(
+            feature["geometry"]["rings"] for feature in features
+        )
+        transformed_multipolygons = self.transform_geometry(
+            multipolygons, source_srid=3857, target_srid=4326
+        )
+        trimmed_multipolygons = clip_to_boundary(
+            transformed_multipolygons, self.boundary
+        )
+
+        for feature, trimmed_multipolygon in zip(features, trimmed_multipolygons):
             properties = feature.get("attributes", {})
-            rings = feature["geometry"]["rings"]
-            # Extract rings and create Polygons
-            rings = feature["geometry"]["rings"]
-            # Ensure valid polygons
-            polygons = [Polygon(ring) for ring in rings if len(ring) >= 4]
-            multi_polygon = MultiPolygon(polygons)
-            # Transform MultiPolygon from SRID 3857 to 4326
-            transformed_multipolygon = self.transform_geometry(
-                multi_polygon, source_srid=3857, target_srid=4326
-            )
-
-            trimmed_multipolygon = transformed_multipolygon.intersection(self.boundary)
-
             # Skip if completely outside boundary
             if trimmed_multipolygon.is_empty:
                 continue
@@ -71,8 +98,8 @@ class TsunamiDataHandler(DataHandler):
                 "properties": {"evacuate": tsunami_zone["evacuate"]},
             }
             geojson_features.append(geojson_feature)
-            geojson = {"type": "FeatureCollection", "features": geojson_features}
 
+        geojson = {"type": "FeatureCollection", "features": geojson_features}
         return parsed_data, geojson
 
     def insert_policy(self) -> dict:
@@ -90,16 +117,10 @@ class TsunamiDataHandler(DataHandler):
 
 
 if __name__ == "__main__":
+    configure_logging()
     handler = TsunamiDataHandler(TSUNAMI_URL, TsunamiZone)
     try:
-        params = {
-            "where": "County='San Francisco' AND Evacuate='Yes, Tsunami Hazard Area'",
-            "outFields": "*",
-            "f": "json",
-        }
-        tsunami_zones = handler.fetch_data(params)
-        tsunami_zones_objects, tsunami_zones_geojson = handler.parse_data(tsunami_zones)
-        handler.export_geojson_if_changed(tsunami_zones_geojson)
-        handler.bulk_insert_data(tsunami_zones_objects, "identifier")
+        handler.stream_data("identifier", TSUNAMI_PARAMS)
+        handler.export_tiles_if_changed()
     except HTTPException as e:
         print(f"Failed after retries: {e}")